@@ -11,6 +11,7 @@ import time
 import logging
 
 from src.lpb40b import LPB40B
+from src.poll_scheduler import PollScheduler
 
 
 def main():
@@ -34,17 +35,18 @@ def main():
     logging.info(f"Get Device Info Frame 2: {info_frame_2.hex(' ').upper()}")
 
 
-    # Go into a polling loop for measurements in millimeters
+    # Poll for measurements in millimeters at a steady 20 Hz
+    scheduler = PollScheduler({"lpb40b": lpb}, rate_hz=20)
     try:
-        while True:
-            measurement_mm = lpb.get_measurement_mm()
-
-            now = time.time()
-            logging.info(f"{now:.3f} \t- Measurement received: {measurement_mm} mm")
-            time.sleep(0.05)
+        for reading in scheduler.readings():
+            if reading.ok:
+                now = time.time()
+                logging.info(f"{now:.3f} \t- Measurement received: {reading.measurement.distance_mm} mm")
     except:
         logging.info(f"Exception or interrupt recieved")
 
+    logging.info(f"Polling stats: {scheduler.stats()['lpb40b']}")
+
     ser.close()
     logging.info("Quitting")
 
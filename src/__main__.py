@@ -0,0 +1,9 @@
+#
+#   LPB40B command line tool entry point - see cli.py
+#
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
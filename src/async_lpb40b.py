@@ -0,0 +1,201 @@
+#
+#   LPB40B LiDAR range finder (DFRobot) asyncio driver
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Same protocol as LPB40B, but built on an asyncio transport/protocol pair
+#  so many sensors can share one event loop without a thread each.
+#
+# Opening a real port needs the optional pyserial-asyncio package:
+#  pip install pyserial-asyncio
+#
+
+
+import time
+import asyncio
+import logging
+
+from .lpb40b import LPB40B
+from .frame_parser import FrameParser
+
+
+class LPB40BProtocol(asyncio.Protocol):
+    """Feeds received bytes through a FrameParser into a queue of frames."""
+
+    DEFAULT_MAX_QUEUED_FRAMES = 1024
+
+    def __init__(self, max_queued_frames: int = DEFAULT_MAX_QUEUED_FRAMES):
+        self.transport = None
+        self.parser = FrameParser()
+        self.frames = asyncio.Queue(maxsize=max_queued_frames)
+        self.frames_overwritten = 0
+        self.connection_error = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+        frames = self.frames
+        self.parser.feed(data)
+        while True:
+            frame = self.parser.next_frame()
+            if frame is None:
+                return
+            if frames.full():
+                # Nobody is keeping up - keep the newest frames
+                frames.get_nowait()
+                self.frames_overwritten += 1
+            frames.put_nowait((time.monotonic_ns(), frame))
+
+    def connection_lost(self, exc):
+        self.connection_error = exc
+        self.transport = None
+
+    def reset(self):
+        """Discard partially received bytes and any queued frames."""
+        self.parser.reset()
+        while not self.frames.empty():
+            self.frames.get_nowait()
+
+
+class AsyncLPB40B:
+    def __init__(self, protocol: LPB40BProtocol):
+        if protocol.transport is None:
+            raise ValueError("Protocol must be connected to a transport")
+        self.protocol = protocol
+        self.skipped_frames = 0
+        # Held for each request/reply round trip - replies to another command
+        #  would otherwise be skipped (and lost) by whichever call reads first
+        self.io_lock = asyncio.Lock()
+
+        self.log = logging.getLogger(name=__class__.__name__)
+
+    @classmethod
+    async def open(cls, port: str, baudrate: int = 115200) -> "AsyncLPB40B":
+        """Open a serial port with pyserial-asyncio and wrap it."""
+        try:
+            import serial_asyncio
+        except ImportError as e:
+            raise ImportError(
+                "AsyncLPB40B.open() needs pyserial-asyncio: pip install pyserial-asyncio"
+            ) from e
+
+        loop = asyncio.get_running_loop()
+        (transport, protocol) = await serial_asyncio.create_serial_connection(
+            loop, LPB40BProtocol, port, baudrate=baudrate
+        )
+        return cls(protocol)
+
+    def close(self):
+        if self.protocol.transport is not None:
+            self.protocol.transport.close()
+
+    # ---------- High-level commands ----------
+    async def begin(self):
+        async with self.io_lock:
+            self.protocol.reset()
+            await self._set_mode(LPB40B.FRAME_SET_SINGLE_MODE)
+
+    async def set_single_measurement_mode(self):
+        """Put sensor into single measurement mode."""
+        self.log.debug("Setting device into single measurement mode.")
+        async with self.io_lock:
+            await self._set_mode(LPB40B.FRAME_SET_SINGLE_MODE)
+
+    async def set_continuous_measurement_mode(self):
+        """Put sensor into continuous measurement mode."""
+        self.log.debug("Setting device into continuous measurement mode.")
+        async with self.io_lock:
+            await self._set_mode(LPB40B.FRAME_SET_CONTINUOUS_MODE)
+
+    async def get_measurement_mm(self, timeout=1.0) -> int:
+        """Take one measurement and return distance in mm."""
+        async with self.io_lock:
+            self._send_frame(LPB40B.FRAME_START_MEASUREMENT)
+            (_, measurement_frame) = await self._read_frame(timeout, LPB40B.CMD_MEASUREMENT_DATA)
+        return LPB40B.decode_measurement_frame(measurement_frame)
+
+    async def get_device_info(self, timeout=1.0) -> tuple:
+        """Fetch device info (2 frames). Returns a tuple of 2 raw frames."""
+        async with self.io_lock:
+            self._send_frame(LPB40B.FRAME_GET_DEVICE_INFO)
+
+            deadline = asyncio.get_running_loop().time() + timeout
+            (_, info_frame1) = await self._read_frame_until(deadline, LPB40B.CMD_GET_DEVICE_INFO)
+            (_, info_frame2) = await self._read_frame_until(deadline, LPB40B.CMD_GET_DEVICE_INFO)
+
+        return (info_frame1, info_frame2)
+
+    async def stream(self, timeout=1.0, filters=None):
+        """Async generator of Measurements in continuous mode.
+
+        filters (a RangeFilter or FilterChain) set filtered_mm on valid ones.
+
+        The stream holds io_lock until it is closed - other commands wait for
+        it. Stops the measurements and returns to single mode when closed, so use
+        contextlib.aclosing() if the loop may exit early:
+
+            async with aclosing(lpb.stream()) as measurements:
+                async for measurement in measurements:
+                    ...
+        """
+        async with self.io_lock:
+            await self._set_mode(LPB40B.FRAME_SET_CONTINUOUS_MODE)
+            self._send_frame(LPB40B.FRAME_START_MEASUREMENT)
+            try:
+                while True:
+                    (timestamp_ns, frame) = await self._read_frame(timeout, LPB40B.CMD_MEASUREMENT_DATA)
+                    measurement = LPB40B.decode_measurement(frame, timestamp_ns)
+                    if filters is not None and measurement.valid:
+                        measurement.filtered_mm = filters.update(measurement.distance_mm)
+                    yield measurement
+            finally:
+                self._send_frame(LPB40B.FRAME_STOP_MEASUREMENT)
+                self.protocol.reset()
+                await self._set_mode(LPB40B.FRAME_SET_SINGLE_MODE)
+
+    # ---------- Low-level I/O ----------
+    async def _set_mode(self, frame: bytes):
+        """Send a mode command - caller holds io_lock."""
+        self._send_frame(frame)
+        # Device hangs if flooded right after a mode change - see LPB40B
+        await asyncio.sleep(0.01)
+
+    def _send_frame(self, msg: bytes):
+        transport = self.protocol.transport
+        if transport is None:
+            raise ConnectionError("Serial transport is closed")
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug(f"Sending to serial: {msg.hex(' ').upper()}")
+        transport.write(msg)
+
+    async def _read_frame(self, timeout=1.0, expected_cmd=None) -> tuple:
+        deadline = asyncio.get_running_loop().time() + timeout
+        return await self._read_frame_until(deadline, expected_cmd)
+
+    async def _read_frame_until(self, deadline: float, expected_cmd=None) -> tuple:
+        """Next (timestamp_ns, frame) matching expected_cmd before the loop deadline."""
+        loop = asyncio.get_running_loop()
+        frames = self.protocol.frames
+
+        while True:
+            if not frames.empty():
+                (timestamp_ns, frame) = frames.get_nowait()
+            else:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise TimeoutError("Sensor did not return a frame before the deadline")
+                try:
+                    (timestamp_ns, frame) = await asyncio.wait_for(frames.get(), remaining)
+                except asyncio.TimeoutError:
+                    raise TimeoutError("Sensor did not return a frame before the deadline") from None
+
+            if expected_cmd is not None and frame[1] != expected_cmd:
+                self.skipped_frames += 1
+                if self.log.isEnabledFor(logging.DEBUG):
+                    self.log.debug(f"Skipping unexpected frame: {frame.hex(' ').upper()}")
+                continue
+
+            return (timestamp_ns, frame)
@@ -0,0 +1,271 @@
+#
+#   LPB40B wire capture and replay
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Capture file layout (little endian, append only):
+#
+#   header  16 bytes: magic "LPBCAP01" | u16 version | u16 record size | u32 reserved
+#   record  17 bytes: i64 host monotonic_ns | u8 direction | 8 byte frame
+#
+# Records are fixed size, so a capture of any length is opened by memory
+#  mapping it and computing the record count from the file size - nothing is
+#  read or indexed up front. A capture that was cut off mid record is read
+#  up to its last whole record, and cut back to it before anything is
+#  appended so later records stay aligned.
+#
+
+
+import os
+import mmap
+import time
+import struct
+import threading
+
+import numpy as np
+
+
+CAPTURE_MAGIC = b"LPBCAP01"
+CAPTURE_VERSION = 1
+HEADER_STRUCT = struct.Struct("<8sHHI")
+RECORD_STRUCT = struct.Struct("<qB8s")
+HEADER_SIZE = HEADER_STRUCT.size
+RECORD_SIZE = RECORD_STRUCT.size
+
+DIRECTION_TX = 0    # host -> sensor
+DIRECTION_RX = 1    # sensor -> host
+
+RECORD_DTYPE = np.dtype([
+    ("timestamp_ns", "<i8"),
+    ("direction", "u1"),
+    ("frame", "u1", (8,)),
+])
+
+
+class CaptureWriter:
+    def __init__(self, path, buffer_size: int = 1 << 16):
+        """Open a capture file for appending, writing the header if it's new.
+
+        A partial record at the end of an existing capture is truncated away first.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.records_written = 0
+
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not is_new:
+            _check_header(path)
+            partial = (os.path.getsize(path) - HEADER_SIZE) % RECORD_SIZE
+            if partial:
+                os.truncate(path, os.path.getsize(path) - partial)
+        self._file = open(path, "ab", buffering=buffer_size)
+        if is_new:
+            self._file.write(HEADER_STRUCT.pack(CAPTURE_MAGIC, CAPTURE_VERSION, RECORD_SIZE, 0))
+
+        self._attached = []
+
+    def record(self, direction: int, frame: bytes, timestamp_ns=None) -> None:
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        packed = RECORD_STRUCT.pack(timestamp_ns, direction, bytes(frame))
+        with self._lock:
+            self._file.write(packed)
+            self.records_written += 1
+
+    def attach(self, lpb) -> None:
+        """Record every frame an LPB40B sends or reads from now on.
+
+        Received frames are recorded by the parser as each one is consumed,
+        so frames the driver skips (unexpected commands, extra replies) are
+        captured too. Bytes that never form a valid frame aren't.
+        """
+        send_frame = lpb._send_frame
+
+        def captured_send_frame(msg, *args, **kwargs):
+            self.record(DIRECTION_TX, msg)
+            send_frame(msg, *args, **kwargs)
+
+        def captured_frame(frame):
+            self.record(DIRECTION_RX, frame)
+
+        lpb._send_frame = captured_send_frame
+        lpb.parser.frame_hook = captured_frame
+        self._attached.append(lpb)
+
+    def detach(self, lpb) -> None:
+        # Removing the instance attribute falls back to the class method
+        del lpb._send_frame
+        lpb.parser.frame_hook = None
+        self._attached.remove(lpb)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        for lpb in list(self._attached):
+            self.detach(lpb)
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CaptureReader:
+    def __init__(self, path):
+        """Memory map a capture file - O(1) regardless of its size."""
+        self.path = path
+        _check_header(path)
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+
+        # Ignore a trailing partial record from a capture that was cut off
+        self.record_count = (size - HEADER_SIZE) // RECORD_SIZE
+        if self.record_count:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.records = np.frombuffer(
+                self._mmap, dtype=RECORD_DTYPE, count=self.record_count, offset=HEADER_SIZE
+            )
+        else:
+            self._mmap = None
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return self.record_count
+
+    def __getitem__(self, index) -> tuple:
+        """(timestamp_ns, direction, frame) for one record."""
+        record = self.records[index]
+        return (int(record["timestamp_ns"]), int(record["direction"]), record["frame"].tobytes())
+
+    def close(self) -> None:
+        # Views onto the map must go before it can close
+        self.records = None
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ReplaySerial:
+    """Duck-typed serial.Serial that plays back the RX side of a capture.
+
+    With realtime=True frames become readable at their recorded spacing
+    (scaled by speed), otherwise everything is available immediately.
+    Writes are accepted and counted but don't affect playback.
+    """
+    FILL_CHUNK = 4096
+
+    def __init__(self, path, realtime: bool = False, speed: float = 1.0):
+        self.capture = CaptureReader(path)
+        self.realtime = realtime
+        self.speed = speed
+        self.timeout = None
+        self.is_open = True
+        self.frames_written = 0
+
+        self._records = self.capture.records
+        self._position = 0
+        self._pending = bytearray()
+        self._start_ns = None
+        self._first_record_ns = int(self._records[0]["timestamp_ns"]) if len(self._records) else 0
+
+    # ---------- serial.Serial interface ----------
+    def write(self, data: bytes) -> int:
+        self.frames_written += 1
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        if self._start_ns is None:
+            self._start_ns = time.monotonic_ns()
+        self._fill(size)
+
+        if len(self._pending) < size and self.realtime:
+            deadline = None if self.timeout is None else time.monotonic() + self.timeout
+            while len(self._pending) < size and self._position < len(self._records):
+                wait = self._seconds_until_next()
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        break
+                time.sleep(max(wait, 0))
+                self._fill(size)
+
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    @property
+    def in_waiting(self) -> int:
+        if self._start_ns is None:
+            self._start_ns = time.monotonic_ns()
+        self._fill(self.FILL_CHUNK)
+        return len(self._pending)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._position >= len(self._records) and not self._pending
+
+    def flush(self) -> None:
+        pass
+
+    def reset_input_buffer(self) -> None:
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.is_open = False
+        self._records = None
+        self.capture.close()
+
+    # ---------- Playback ----------
+    def _ready(self, record) -> bool:
+        if not self.realtime:
+            return True
+        elapsed_ns = (time.monotonic_ns() - self._start_ns) * self.speed
+        return record["timestamp_ns"] - self._first_record_ns <= elapsed_ns
+
+    def _seconds_until_next(self) -> float:
+        records = self._records
+        position = self._position
+        while position < len(records) and records[position]["direction"] != DIRECTION_RX:
+            position += 1
+        if position >= len(records):
+            return 0.0
+        due_ns = (int(records[position]["timestamp_ns"]) - self._first_record_ns) / self.speed
+        return max(0.0, (due_ns - (time.monotonic_ns() - self._start_ns)) / 1e9)
+
+    def _fill(self, want: int) -> None:
+        records = self._records
+        while len(self._pending) < want and self._position < len(records):
+            record = records[self._position]
+            if not self._ready(record):
+                return
+            self._position += 1
+            if record["direction"] == DIRECTION_RX:
+                self._pending += record["frame"].tobytes()
+
+
+def _check_header(path) -> None:
+    with open(path, "rb") as capture_file:
+        header = capture_file.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE:
+        raise ValueError(f"Capture file too short for a header: {path}")
+    (magic, version, record_size, _) = HEADER_STRUCT.unpack(header)
+    if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"Not a version {CAPTURE_VERSION} LPB40B capture file: {path}")
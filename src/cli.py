@@ -0,0 +1,239 @@
+#
+#   LPB40B command line tool
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Run with:  python -m src <command> --port /dev/ttyUSB0 ...
+#
+#   stream     samples to stdout (csv, ndjson or binary)
+#   record     samples to a file, format from its extension (.csv, .ndjson, .bin)
+#   info       decoded device info and temperature
+#   configure  measurement frequency and baud rate, optionally saved to flash
+#
+# Streaming uses continuous mode at the highest normal frame rate (500 Hz)
+#  unless told otherwise. The reader thread hands samples to a batching
+#  sink, so nothing is written per sample. A summary of the achieved rate
+#  and dropped samples (gaps in the sensor's timeline, see sensor_clock)
+#  goes to stderr on exit.
+#
+# The driver is only imported once a command runs, so --help is instant.
+#
+
+
+import os
+import sys
+import time
+import logging
+import argparse
+from typing import NamedTuple
+
+
+DEFAULT_PORT = os.environ.get("LPB40B_PORT", "/dev/ttyUSB0")
+DEFAULT_FREQUENCY_HZ = 500
+PIPELINED_CHUNK = 256
+# Longer than any host stall expected while recording, so a late burst isn't counted as lost frames
+DROP_LOOKAHEAD_SEC = 0.5
+
+
+class StreamReport(NamedTuple):
+    samples: int
+    elapsed_sec: float
+    achieved_hz: float
+    frequency_hz: int       # None for pipelined single measurements
+    dropped: int
+    crc_failures: int
+    unexpected_frames: int
+
+    def __str__(self) -> str:
+        requested = "pipelined" if self.frequency_hz is None else f"{self.frequency_hz} Hz set"
+        return (f"{self.samples} samples in {self.elapsed_sec:.2f} s - {self.achieved_hz:.1f}/s achieved "
+                f"({requested}), {self.dropped} dropped, {self.crc_failures} CRC failures, "
+                f"{self.unexpected_frames} unexpected frames")
+
+
+class _ClockedSink:
+    """Passes samples on to sink and feeds their arrival times to a SensorClock, which counts lost frames."""
+    def __init__(self, sink, clock):
+        self.sink = sink
+        self.clock = clock
+
+    def append(self, timestamp_ns: int, distance_mm: int, error_code: int = 0) -> None:
+        self.sink.append(timestamp_ns, distance_mm, error_code)
+        self.clock.push(timestamp_ns)
+
+
+def run_stream(lpb, sink, mode: str = "continuous", frequency_hz: int = DEFAULT_FREQUENCY_HZ,
+               duration_sec=None) -> StreamReport:
+    """Feed sink from lpb until it's full, duration_sec passes, or Ctrl-C."""
+    deadline = None if duration_sec is None else time.monotonic() + duration_sec
+    start = time.monotonic()
+    clock = None
+    try:
+        if mode == "continuous":
+            from .sensor_clock import SensorClock
+
+            lpb.set_measurement_frequency(frequency_hz)
+            clock = SensorClock(frequency_hz, lookahead_sec=DROP_LOOKAHEAD_SEC)
+            lpb.start_streaming(buffer_size=0, sample_buffer=_ClockedSink(sink, clock))
+            try:
+                while not sink.done.wait(0.1):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+            finally:
+                lpb.stop_streaming()
+        elif mode == "pipelined":
+            frequency_hz = None
+            while not sink.done.is_set():
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                chunk = PIPELINED_CHUNK
+                if sink.max_samples is not None:
+                    chunk = min(chunk, sink.max_samples - sink.sample_count)
+                sink.write_batch(lpb.get_measurements(chunk))
+        else:
+            raise ValueError(f"Unknown measurement mode: {mode}")
+    except KeyboardInterrupt:
+        pass
+    elapsed_sec = time.monotonic() - start
+    sink.flush()
+
+    dropped = 0
+    if clock is not None:
+        clock.flush()
+        dropped = clock.frames_lost
+
+    samples = sink.sample_count
+    achieved_hz = 0.0
+    if samples > 1:
+        span_ns = sink.last_timestamp_ns - sink.first_timestamp_ns
+        if span_ns > 0:
+            achieved_hz = (samples - 1) * 1e9 / span_ns
+    stats = lpb.stats()
+    return StreamReport(samples, elapsed_sec, achieved_hz, frequency_hz, dropped,
+                        stats.crc_failures, stats.unexpected_commands)
+
+
+# ---------- Commands ----------
+def _open_lpb(args):
+    import serial
+    from .lpb40b import LPB40B
+
+    ser = serial.Serial(args.port, baudrate=args.baudrate, timeout=1.0)
+    lpb = LPB40B(ser)
+    lpb.begin(probe_baud_rate=args.probe)
+    return lpb
+
+
+def cmd_stream(args) -> int:
+    from .sinks import open_sink
+
+    sink = open_sink(args.output, args.format, batch_size=args.batch_size, max_samples=args.count)
+    lpb = _open_lpb(args)
+    try:
+        report = run_stream(lpb, sink, args.mode, args.frequency_hz, args.duration)
+    finally:
+        sink.close()
+        lpb.ser.close()
+    print(report, file=sys.stderr)
+
+    if isinstance(sink.error, BrokenPipeError):
+        # Reader went away (e.g. | head) - not an error, but stdout can't be flushed at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    return 1 if sink.error is not None else 0
+
+
+def cmd_info(args) -> int:
+    lpb = _open_lpb(args)
+    try:
+        info = lpb.get_device_info(decode=True)
+        temperature_c = lpb.get_temperature_c()
+    finally:
+        lpb.ser.close()
+    print(f"port:                  {args.port} @ {lpb.ser.baudrate} baud")
+    print(f"device model:          {info.device_model:#04x}")
+    print(f"firmware version:      {info.firmware_version}")
+    print(f"data format:           {info.data_format:#04x}")
+    print(f"measurement mode:      {info.mode_name}")
+    print(f"measurement frequency: {info.measurement_frequency_hz} Hz")
+    print(f"temperature:           {temperature_c:.1f} C")
+    return 0
+
+
+def cmd_configure(args) -> int:
+    if args.frequency_hz is None and args.baud_rate is None and not args.save:
+        print("Nothing to configure - give --frequency-hz, --baud-rate and/or --save", file=sys.stderr)
+        return 2
+    lpb = _open_lpb(args)
+    try:
+        if args.frequency_hz is not None:
+            lpb.set_measurement_frequency(args.frequency_hz)
+            print(f"measurement frequency set to {args.frequency_hz} Hz")
+        if args.baud_rate is not None:
+            lpb.set_baud_rate(args.baud_rate)
+            print(f"baud rate set to {args.baud_rate}")
+        if args.save:
+            lpb.save_settings()
+            print("settings saved to device flash (baud rate is not saved)")
+    finally:
+        lpb.ser.close()
+    return 0
+
+
+# ---------- Argument parsing ----------
+def _add_port_arguments(parser) -> None:
+    parser.add_argument("--port", default=DEFAULT_PORT, help=f"serial port (default {DEFAULT_PORT}, or $LPB40B_PORT)")
+    parser.add_argument("--baudrate", type=int, default=115200, help="host baud rate to open the port at")
+    parser.add_argument("--probe", action="store_true", help="find the device's baud rate first")
+
+
+def _add_stream_arguments(parser) -> None:
+    parser.add_argument("--format", choices=("csv", "ndjson", "binary"), default=None)
+    parser.add_argument("--count", type=int, default=None, help="stop after this many samples")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--mode", choices=("continuous", "pipelined"), default="continuous",
+                        help="continuous streaming (default) or pipelined single measurements")
+    parser.add_argument("--frequency-hz", type=int, default=DEFAULT_FREQUENCY_HZ,
+                        help=f"continuous mode measurement frequency (default {DEFAULT_FREQUENCY_HZ})")
+    parser.add_argument("--batch-size", type=int, default=4096, help="samples per output write")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src", description="LPB40B LiDAR range finder tool")
+    parser.add_argument("-v", "--verbose", action="store_true", help="debug logging")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stream = commands.add_parser("stream", help="stream samples to stdout")
+    _add_port_arguments(stream)
+    _add_stream_arguments(stream)
+    stream.set_defaults(handler=cmd_stream, output="-")
+
+    record = commands.add_parser("record", help="record samples to a file")
+    record.add_argument("output", help="file to write - .csv, .ndjson/.jsonl or .bin picks the format")
+    _add_port_arguments(record)
+    _add_stream_arguments(record)
+    record.set_defaults(handler=cmd_stream)
+
+    info = commands.add_parser("info", help="show device info and temperature")
+    _add_port_arguments(info)
+    info.set_defaults(handler=cmd_info)
+
+    configure = commands.add_parser("configure", help="change device settings")
+    _add_port_arguments(configure)
+    configure.add_argument("--frequency-hz", type=int, default=None)
+    configure.add_argument("--baud-rate", type=int, default=None, help="switch device and host to this rate (lost on power off, --save doesn't keep it)")
+    configure.add_argument("--save", action="store_true", help="store settings in device flash")
+    configure.set_defaults(handler=cmd_configure)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+#
+#   LPB40B command pacing
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# The device hangs if another command lands too soon after a configuration
+#  command (mode, frequency). Rather than sleeping after every one of them,
+#  the scheduler remembers when the last such write happened and only waits
+#  if the next write would actually come too soon.
+#
+
+
+import time
+
+
+class CommandScheduler:
+    # 0.01 sec after a mode change has been enough on real hardware
+    DEFAULT_SETTLE_SEC = 0.01
+
+    def __init__(self):
+        self.last_write_ns = 0
+        self.not_before_ns = 0      # 0 when nothing is settling - keeps the hot path to one check
+        self.waits = 0
+        self.waited_ns = 0
+
+    def wait_to_send(self) -> None:
+        """Block until the device can take another command."""
+        remaining_ns = self.not_before_ns - time.monotonic_ns()
+        if remaining_ns > 0:
+            self.waits += 1
+            self.waited_ns += remaining_ns
+            time.sleep(remaining_ns / 1e9)
+        self.not_before_ns = 0
+
+    def mark_sent(self, settle_sec: float = 0.0) -> None:
+        """Record a write, and hold the next one off for settle_sec after it."""
+        self.last_write_ns = time.monotonic_ns()
+        if settle_sec:
+            self.not_before_ns = self.last_write_ns + int(settle_sec * 1e9)
@@ -0,0 +1,109 @@
+#
+#   LPB40B protocol CRC and frame building
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# CRC-8, polynomial 0x31 (x8+x5+x4+1), start value 0, high bit first.
+#  Covers the CMD and 4 value bytes (bytes 2-6 of the 8 byte frame).
+#
+# The bitwise version in the protocol PDF walks 8 shifts per byte - here the
+#  256 possible results are computed once and each byte is a single lookup.
+#
+
+
+from functools import lru_cache
+
+CRC_POLYNOMIAL = 0x31
+CRC_START_VALUE = 0
+
+FRAME_LENGTH = 8
+START_BYTE = 0x55
+STOP_BYTE = 0xAA
+EMPTY_VALUE = bytes(4)
+
+
+def _build_crc_table() -> bytes:
+    table = bytearray(256)
+    for index in range(256):
+        crc = index
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ CRC_POLYNOMIAL) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+        table[index] = crc
+    return bytes(table)
+
+
+CRC_TABLE = _build_crc_table()
+
+
+def crc8(msg_bytes) -> int:
+    """CRC of the CMD + value bytes of a frame."""
+    crc = CRC_START_VALUE
+    table = CRC_TABLE
+    for current_byte in msg_bytes:
+        crc = table[crc ^ current_byte]
+    return crc
+
+
+def crc_many(payloads) -> list:
+    """CRC for each 5 byte CMD + value payload in an iterable."""
+    table = CRC_TABLE
+    crcs = []
+    for payload in payloads:
+        crc = CRC_START_VALUE
+        for current_byte in payload:
+            crc = table[crc ^ current_byte]
+        crcs.append(crc)
+    return crcs
+
+
+def validate_frame(frame) -> bool:
+    """True if frame has start/stop bytes and a matching CRC."""
+    return (
+        len(frame) == FRAME_LENGTH
+        and frame[0] == START_BYTE
+        and frame[7] == STOP_BYTE
+        and crc8(frame[1:6]) == frame[6]
+    )
+
+
+def validate_frames(frames_buffer) -> list:
+    """Validate a contiguous run of 8 byte frames, one bool per frame.
+
+    A trailing partial frame is ignored.
+    """
+    table = CRC_TABLE
+    results = []
+    for start in range(0, len(frames_buffer) - FRAME_LENGTH + 1, FRAME_LENGTH):
+        if frames_buffer[start] != START_BYTE or frames_buffer[start + 7] != STOP_BYTE:
+            results.append(False)
+            continue
+        crc = CRC_START_VALUE
+        for offset in range(start + 1, start + 6):
+            crc = table[crc ^ frames_buffer[offset]]
+        results.append(crc == frames_buffer[start + 6])
+    return results
+
+
+def add_protocol_bytes(msg_bytes: bytes) -> bytes:
+    """Wrap a 5 byte CMD + value payload into a full 8 byte frame."""
+    if len(msg_bytes) != 5:
+        raise ValueError("Payload must be exactly 5 bytes")
+    frame = bytearray(FRAME_LENGTH)
+    frame[0] = START_BYTE
+    frame[1:6] = msg_bytes
+    frame[6] = crc8(msg_bytes)
+    frame[7] = STOP_BYTE
+    return bytes(frame)
+
+
+@lru_cache(maxsize=64)
+def build_frame(command: int, value: bytes = EMPTY_VALUE) -> bytes:
+    """Full frame for a command, cached - constant commands are only built once."""
+    if len(value) != 4:
+        raise ValueError("Value must be exactly 4 bytes")
+    return add_protocol_bytes(bytes([command]) + value)
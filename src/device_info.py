@@ -0,0 +1,57 @@
+#
+#   LPB40B device info decoding
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Get device info (0x01) returns two frames:
+#   55 01 AA BB BB BB JY AA   - AA: device model, BB: firmware version
+#   55 01 AA BB CC CC JY AA   - AA: data format, BB: measurement mode,
+#                               CC: measurement frequency (2 bytes, big endian -
+#                                   manual says 1 byte, device sends 2)
+#
+
+
+from typing import NamedTuple
+
+DATA_FORMAT_BYTE = 0x01
+DATA_FORMAT_PIXHAWK = 0x02
+
+MODE_CONTINUOUS_POWER_ON = 0x00
+MODE_SINGLE = 0x01
+MODE_CONTINUOUS_ON_START = 0x02
+
+MODE_NAMES = {
+    MODE_CONTINUOUS_POWER_ON: "continuous (power on)",
+    MODE_SINGLE: "single",
+    MODE_CONTINUOUS_ON_START: "continuous (on start)",
+}
+
+
+class DeviceInfo(NamedTuple):
+    device_model: int
+    firmware_version: str
+    data_format: int
+    measurement_mode: int
+    measurement_frequency_hz: int
+
+    @property
+    def mode_name(self) -> str:
+        return MODE_NAMES.get(self.measurement_mode, f"unknown ({self.measurement_mode:#04x})")
+
+
+def decode_device_info(info_frame_1: bytes, info_frame_2: bytes) -> DeviceInfo:
+    """Decode the two raw get info frames."""
+    if info_frame_1[1] != 0x01 or info_frame_2[1] != 0x01:
+        raise ValueError(
+            f"Not get info frames: {bytes(info_frame_1).hex(' ').upper()} / "
+            f"{bytes(info_frame_2).hex(' ').upper()}"
+        )
+    return DeviceInfo(
+        device_model=info_frame_1[2],
+        firmware_version=".".join(str(part) for part in info_frame_1[3:6]),
+        data_format=info_frame_2[2],
+        measurement_mode=info_frame_2[3],
+        measurement_frequency_hz=int.from_bytes(info_frame_2[4:6], byteorder="big"),
+    )
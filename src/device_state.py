@@ -0,0 +1,116 @@
+#
+#   LPB40B cached device state
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Device info (0x01) and temperature (0x02) both need a round trip that
+#  would otherwise steal time from measurements. The cache hands back the
+#  last decoded value until its TTL runs out.
+#
+# The driver invalidates the device info whenever a mode, frequency, data
+#  format or baud rate command goes out, so a stale mode is never served.
+#  Temperature can also be refreshed by a low rate background thread. Its
+#  round trip holds the driver's io_lock, so it lands between single
+#  measurements, and while streaming the reply comes back through the
+#  dispatcher in between measurement frames.
+#
+
+
+import time
+import logging
+import threading
+
+
+class DeviceStateCache:
+    DEFAULT_INFO_TTL_SEC = 60.0
+    DEFAULT_TEMPERATURE_TTL_SEC = 5.0
+
+    def __init__(self, lpb, info_ttl_sec: float = DEFAULT_INFO_TTL_SEC,
+                 temperature_ttl_sec: float = DEFAULT_TEMPERATURE_TTL_SEC):
+        self.lpb = lpb
+        self.info_ttl_sec = info_ttl_sec
+        self.temperature_ttl_sec = temperature_ttl_sec
+
+        self._lock = threading.Lock()
+        self._info = None
+        self._info_expires_ns = 0
+        self._temperature_c = None
+        self._temperature_expires_ns = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._refresh_stop = threading.Event()
+        self._refresh_thread = None
+        self.log = logging.getLogger(name=__class__.__name__)
+
+    # ---------- Cached reads ----------
+    def device_info(self, timeout: float = 1.0):
+        """DeviceInfo, from the cache while fresh or else read from the device."""
+        with self._lock:
+            if self._info is not None and time.monotonic_ns() < self._info_expires_ns:
+                self.hits += 1
+                return self._info
+            self.misses += 1
+        # get_device_info() stores what it reads via store_info()
+        return self.lpb.get_device_info(timeout, decode=True)
+
+    def temperature_c(self, timeout: float = 1.0) -> float:
+        """Sensor temperature in degrees C, from the cache while fresh."""
+        with self._lock:
+            if self._temperature_c is not None and time.monotonic_ns() < self._temperature_expires_ns:
+                self.hits += 1
+                return self._temperature_c
+            self.misses += 1
+        return self.lpb.get_temperature_c(timeout)
+
+    # ---------- Updates from the driver ----------
+    def store_info(self, device_info) -> None:
+        with self._lock:
+            self._info = device_info
+            self._info_expires_ns = time.monotonic_ns() + int(self.info_ttl_sec * 1e9)
+
+    def store_temperature(self, temperature_c: float) -> None:
+        with self._lock:
+            self._temperature_c = temperature_c
+            self._temperature_expires_ns = time.monotonic_ns() + int(self.temperature_ttl_sec * 1e9)
+
+    def invalidate(self) -> None:
+        """Drop the cached device info - called when a configuration command is sent."""
+        with self._lock:
+            if self._info is not None:
+                self.invalidations += 1
+            self._info = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._info = None
+            self._temperature_c = None
+
+    # ---------- Background temperature refresh ----------
+    def start_temperature_refresh(self, interval_sec: float = 10.0) -> None:
+        """Re-read the temperature every interval_sec on a daemon thread."""
+        if self._refresh_thread is not None:
+            raise RuntimeError("Temperature refresh already running")
+        self._refresh_stop.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, args=(interval_sec,), name="LPB40B-temperature", daemon=True
+        )
+        self._refresh_thread.start()
+
+    def stop_temperature_refresh(self, timeout: float = 1.0) -> None:
+        self._refresh_stop.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout)
+            self._refresh_thread = None
+
+    def _refresh_loop(self, interval_sec: float) -> None:
+        lpb = self.lpb
+        while not self._refresh_stop.wait(interval_sec):
+            try:
+                lpb.get_temperature_c()
+            except (TimeoutError, ValueError, ConnectionError) as e:
+                self.log.warning(f"Temperature refresh failed: {e}")
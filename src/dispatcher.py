@@ -0,0 +1,87 @@
+#
+#   LPB40B response dispatcher
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# In continuous mode the stream's reader thread owns the port, so a query
+#  can't just read the next frame - it will almost always be measurement
+#  data. Instead the reader routes every frame by command byte. Measurement
+#  data (0x07) goes to the stream buffer, and anything else completes the
+#  oldest pending request waiting on that command.
+#
+# Requests register before they send, so a fast reply can't beat them to
+#  the dispatcher. Replies for one command come back in request order.
+#
+
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+
+class _PendingRequest:
+    __slots__ = ("future", "frames_needed", "frames")
+
+    def __init__(self, frames_needed: int):
+        self.future = Future()
+        self.frames_needed = frames_needed
+        self.frames = []
+
+
+class ResponseDispatcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}          # command -> deque of _PendingRequest, oldest first
+        self.frames_dispatched = 0
+        self.frames_unmatched = 0
+
+    def expect(self, command: int, frame_count: int = 1) -> Future:
+        """Register for the next frame_count frames with this command.
+
+        The future's result is a tuple of the raw frames.
+        """
+        request = _PendingRequest(frame_count)
+        with self._lock:
+            self._pending.setdefault(command, deque()).append(request)
+        return request.future
+
+    def dispatch(self, frame: bytes) -> bool:
+        """Hand a received frame to whoever is waiting for its command. False if nobody is."""
+        with self._lock:
+            waiting = self._pending.get(frame[1])
+            if not waiting:
+                self.frames_unmatched += 1
+                return False
+            request = waiting[0]
+            request.frames.append(frame)
+            if len(request.frames) < request.frames_needed:
+                self.frames_dispatched += 1
+                return True
+            waiting.popleft()
+            self.frames_dispatched += 1
+        request.future.set_result(tuple(request.frames))
+        return True
+
+    def discard(self, future: Future) -> None:
+        """Stop waiting on a request, e.g. after a timeout."""
+        with self._lock:
+            for waiting in self._pending.values():
+                for request in waiting:
+                    if request.future is future:
+                        waiting.remove(request)
+                        return
+
+    def fail_all(self, exc: Exception) -> None:
+        """Fail every pending request - the reader is going away."""
+        with self._lock:
+            requests = [request for waiting in self._pending.values() for request in waiting]
+            self._pending.clear()
+        for request in requests:
+            request.future.set_exception(exc)
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(waiting) for waiting in self._pending.values())
@@ -0,0 +1,300 @@
+#
+#   LPB40B streaming range filters
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Incremental filters for distance readings. Each one has:
+#
+#   update(value)  - feed one sample, get the filtered value back. Bounded
+#                    time and memory per sample, for use inline on a stream.
+#   apply(values)  - NumPy batch form over a whole array, giving the same
+#                    output as reset() followed by update() on every value.
+#                    Doesn't touch the streaming state.
+#   reset()        - forget all history.
+#
+# FilterChain runs several filters in order. Keep one chain per sensor -
+#  filters hold state, so sharing an instance mixes their histories.
+#
+
+
+import heapq
+from abc import ABC, abstractmethod
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class RangeFilter(ABC):
+    @abstractmethod
+    def update(self, value: float) -> float:
+        ...
+
+    @abstractmethod
+    def apply(self, values) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def reset(self) -> None:
+        ...
+
+
+class RunningMedian(RangeFilter):
+    """Median of the last `window` samples.
+
+    Two heaps split the window into a low and high half, so each sample is
+    O(log window). Samples leaving the window are deleted lazily - they're
+    only popped once they reach the top of their heap - and the heaps are
+    rebuilt whenever the dead entries outnumber the live ones, which keeps
+    memory bounded at an amortized O(log window) per sample.
+    """
+    def __init__(self, window: int = 5):
+        if window < 1:
+            raise ValueError("Median window must be at least 1")
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        self._values = deque()
+        self._low = []          # max heap of the low half, stored negated
+        self._high = []         # min heap of the high half
+        self._low_size = 0      # live (not lazily deleted) entries per heap
+        self._high_size = 0
+        self._delayed = {}      # value -> pending lazy deletions
+
+    def update(self, value: float) -> float:
+        if len(self._values) == self.window:
+            self._remove(self._values.popleft())
+        self._values.append(value)
+        self._insert(value)
+        if len(self._low) + len(self._high) > 2 * self.window:
+            self._rebuild()
+        return self.median()
+
+    def median(self) -> float:
+        if not self._values:
+            raise ValueError("Median of an empty window")
+        if self._low_size > self._high_size:
+            return -self._low[0]
+        return (self._high[0] - self._low[0]) / 2
+
+    def apply(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        out = np.empty(len(values))
+        # Windows are still filling for the first window - 1 samples
+        head = min(len(values), self.window - 1)
+        for i in range(head):
+            out[i] = np.median(values[:i + 1])
+        if len(values) >= self.window:
+            out[head:] = np.median(sliding_window_view(values, self.window), axis=1)
+        return out
+
+    # ---------- Heap upkeep ----------
+    def _rebuild(self) -> None:
+        ordered = sorted(self._values)
+        split = (len(ordered) + 1) // 2
+        self._low = [-value for value in reversed(ordered[:split])]
+        self._high = ordered[split:]
+        self._low_size = split
+        self._high_size = len(ordered) - split
+        self._delayed = {}
+
+    def _insert(self, value) -> None:
+        if not self._low or value <= -self._low[0]:
+            heapq.heappush(self._low, -value)
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, value)
+            self._high_size += 1
+        self._balance()
+
+    def _remove(self, value) -> None:
+        self._delayed[value] = self._delayed.get(value, 0) + 1
+        if value <= -self._low[0]:
+            self._low_size -= 1
+            if value == -self._low[0]:
+                self._prune(self._low, -1)
+        else:
+            self._high_size -= 1
+            if value == self._high[0]:
+                self._prune(self._high, 1)
+        self._balance()
+
+    def _balance(self) -> None:
+        # Low half holds the extra sample when the window is odd
+        if self._low_size > self._high_size + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(self._low, -1)
+        elif self._low_size < self._high_size:
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+            self._high_size -= 1
+            self._low_size += 1
+            self._prune(self._high, 1)
+
+    def _prune(self, heap: list, sign: int) -> None:
+        delayed = self._delayed
+        while heap:
+            value = sign * heap[0]
+            pending = delayed.get(value)
+            if not pending:
+                return
+            if pending == 1:
+                del delayed[value]
+            else:
+                delayed[value] = pending - 1
+            heapq.heappop(heap)
+
+
+class OutlierRejector(RangeFilter):
+    """Replace samples more than max_deviation_mm from the running median with that median.
+
+    The median covers the last `window` raw samples including the current
+    one, so a real step change is accepted once it makes up over half the
+    window.
+    """
+    def __init__(self, max_deviation_mm: float = 100.0, window: int = 5):
+        self.max_deviation_mm = max_deviation_mm
+        self._median = RunningMedian(window)
+        self.rejected = 0
+
+    def reset(self) -> None:
+        self._median.reset()
+        self.rejected = 0
+
+    def update(self, value: float) -> float:
+        median = self._median.update(value)
+        if abs(value - median) > self.max_deviation_mm:
+            self.rejected += 1
+            return median
+        return value
+
+    def apply(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        medians = self._median.apply(values)
+        return np.where(np.abs(values - medians) > self.max_deviation_mm, medians, values)
+
+
+class ExponentialSmoothing(RangeFilter):
+    """Exponential moving average, y += alpha * (x - y). The first sample passes through."""
+    def __init__(self, alpha: float = 0.2):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("Smoothing alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.value = None
+
+    def reset(self) -> None:
+        self.value = None
+
+    def update(self, value: float) -> float:
+        if self.value is None:
+            self.value = float(value)
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+    def apply(self, values) -> np.ndarray:
+        return _ema(np.asarray(values, dtype=np.float64), self.alpha)
+
+
+class KalmanFilter1D(RangeFilter):
+    """Scalar Kalman filter for a slowly moving target (random walk model).
+
+    process_variance is how far the true distance may wander between samples
+    and measurement_variance is the sensor noise, both in mm^2.
+    """
+    def __init__(self, process_variance: float = 1.0, measurement_variance: float = 100.0):
+        if process_variance < 0 or measurement_variance <= 0:
+            raise ValueError("Kalman variances must be positive")
+        self.process_variance = process_variance
+        self.measurement_variance = measurement_variance
+        self.reset()
+
+    def reset(self) -> None:
+        self.estimate = None
+        self.variance = None
+
+    def update(self, value: float) -> float:
+        if self.estimate is None:
+            self.estimate = float(value)
+            self.variance = self.measurement_variance
+            return self.estimate
+        variance = self.variance + self.process_variance
+        gain = variance / (variance + self.measurement_variance)
+        self.estimate += gain * (value - self.estimate)
+        self.variance = variance * (1.0 - gain)
+        return self.estimate
+
+    def apply(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        out = np.empty(len(values))
+        if not len(values):
+            return out
+
+        # The gain doesn't depend on the data and settles quickly. Step until
+        #  it stops changing, after which the filter is just an EMA.
+        out[0] = values[0]
+        variance = self.measurement_variance
+        gain = None
+        i = 1
+        while i < len(values):
+            predicted = variance + self.process_variance
+            next_gain = predicted / (predicted + self.measurement_variance)
+            out[i] = out[i - 1] + next_gain * (values[i] - out[i - 1])
+            variance = predicted * (1.0 - next_gain)
+            i += 1
+            if gain is not None and abs(next_gain - gain) < 1e-12:
+                break
+            gain = next_gain
+        if i < len(values):
+            out[i:] = _ema(values[i:], next_gain, initial=out[i - 1])
+        return out
+
+
+class FilterChain(RangeFilter):
+    """Run filters in order, each one feeding the next."""
+    def __init__(self, *filters: RangeFilter):
+        self.filters = list(filters)
+
+    def reset(self) -> None:
+        for range_filter in self.filters:
+            range_filter.reset()
+
+    def update(self, value: float) -> float:
+        for range_filter in self.filters:
+            value = range_filter.update(value)
+        return value
+
+    def apply(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        for range_filter in self.filters:
+            values = range_filter.apply(values)
+        return values
+
+
+def _ema(values: np.ndarray, alpha: float, initial=None) -> np.ndarray:
+    """Vectorized y[k] = y[k-1] + alpha * (x[k] - y[k-1]), seeded with initial or x[0].
+
+    Uses the closed form y[k] = d^(k+1) * y0 + alpha * sum(d^(k-j) * x[j]) with
+    d = 1 - alpha, in blocks short enough that d^-k can't overflow.
+    """
+    out = np.empty(len(values))
+    if not len(values):
+        return out
+    if alpha == 1.0:
+        out[:] = values
+        return out
+
+    decay = 1.0 - alpha
+    block = max(1, int(150 / -np.log10(decay)))
+    state = values[0] if initial is None else initial
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        powers = decay ** np.arange(len(chunk))
+        out_chunk = out[start:start + len(chunk)]
+        out_chunk[:] = powers * (decay * state + alpha * np.cumsum(chunk / powers))
+        state = out_chunk[-1]
+    return out
@@ -0,0 +1,151 @@
+#
+#   LPB40B incremental frame parser
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Frames on the wire are always 8 bytes:
+#   55 | CMD | 4 byte value | CRC8(CMD + value) | AA
+#
+# Bytes are fed in whatever chunks the serial port hands back. The parser
+#  hunts for a start byte, checks the stop byte and CRC, and slides forward
+#  one byte at a time past anything that doesn't line up (resync).
+#
+
+
+from .crc import CRC_TABLE
+
+
+class FrameParser:
+    FRAME_LENGTH = 8
+    START_BYTE = 0x55
+    STOP_BYTE = 0xAA
+    DEFAULT_CAPACITY = 4096
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        # Preallocated - bytes live in buffer[_start:_end], the buffer isn't reallocated per frame
+        self.buffer = bytearray(capacity)
+        self._view = memoryview(self.buffer)
+        self._start = 0
+        self._end = 0
+
+        # Called with each frame as it's consumed, e.g. by a wire capture - None when unused
+        self.frame_hook = None
+
+        # Counters - read directly, reset with reset_counters()
+        self.frames_parsed = 0
+        self.dropped_bytes = 0
+        self.resync_count = 0
+        self.crc_failures = 0
+
+    # ---------- Filling ----------
+    def feed(self, data: bytes) -> None:
+        """Append raw bytes received from the serial port."""
+        size = len(data)
+        self._make_room(size)
+        self.buffer[self._end:self._end + size] = data
+        self._end += size
+
+    def fill_from(self, ser, size: int) -> int:
+        """readinto() up to size bytes straight from the port, returns the count read."""
+        self._make_room(size)
+        end = self._end
+        count = ser.readinto(self._view[end:end + size])
+        self._end = end + count
+        return count
+
+    def _make_room(self, size: int) -> None:
+        if self._end + size <= len(self.buffer):
+            return
+        held = self._end - self._start
+        if held + size > len(self.buffer):
+            # Bigger burst than ever before - grow once, then keep the larger buffer
+            self._view.release()
+            grown = bytearray(max(2 * len(self.buffer), held + size))
+            grown[:held] = self.buffer[self._start:self._end]
+            self.buffer = grown
+            self._view = memoryview(self.buffer)
+        else:
+            # Rare - only a partial frame is ever left behind, copy it to the front
+            self.buffer[:held] = bytes(self._view[self._start:self._end])
+        self._start = 0
+        self._end = held
+
+    # ---------- Parsing ----------
+    def find_frame(self) -> int:
+        """Offset in self.buffer of the next valid frame, or -1 if none is buffered yet.
+
+        The frame stays in the buffer until consume_frame(), so callers can
+        decode it in place.
+        """
+        buf = self.buffer
+        table = CRC_TABLE
+        end_of_data = self._end
+        pos = self._start
+        found = -1
+
+        while True:
+            pos = buf.find(self.START_BYTE, pos, end_of_data)
+            if pos < 0:
+                # No start byte anywhere - nothing here can become a frame
+                pos = end_of_data
+                break
+            if end_of_data - pos < self.FRAME_LENGTH:
+                break
+
+            if buf[pos + 7] == self.STOP_BYTE:
+                crc = table[buf[pos + 1]]
+                crc = table[crc ^ buf[pos + 2]]
+                crc = table[crc ^ buf[pos + 3]]
+                crc = table[crc ^ buf[pos + 4]]
+                crc = table[crc ^ buf[pos + 5]]
+                if crc == buf[pos + 6]:
+                    found = pos
+                    break
+                self.crc_failures += 1
+
+            # Misaligned or corrupt - slide past this start byte
+            pos += 1
+
+        dropped = pos - self._start
+        if dropped:
+            self.dropped_bytes += dropped
+            self.resync_count += 1
+        self._start = pos
+        if pos == end_of_data:
+            self._start = self._end = 0
+        return found
+
+    def consume_frame(self) -> None:
+        """Drop the frame find_frame() just located."""
+        if self.frame_hook is not None:
+            self.frame_hook(self._view[self._start:self._start + self.FRAME_LENGTH])
+        self.frames_parsed += 1
+        self._start += self.FRAME_LENGTH
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def next_frame(self):
+        """Return the next valid frame as bytes, or None if one isn't buffered yet."""
+        offset = self.find_frame()
+        if offset < 0:
+            return None
+        frame = bytes(self._view[offset:offset + self.FRAME_LENGTH])
+        self.consume_frame()
+        return frame
+
+    @property
+    def buffered(self) -> int:
+        """Number of bytes held waiting for the rest of a frame."""
+        return self._end - self._start
+
+    def reset(self) -> None:
+        """Discard any partially received bytes."""
+        self._start = self._end = 0
+
+    def reset_counters(self) -> None:
+        self.frames_parsed = 0
+        self.dropped_bytes = 0
+        self.resync_count = 0
+        self.crc_failures = 0
@@ -0,0 +1,218 @@
+#
+#   LPB40B driver instrumentation
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Counters and a request -> response latency histogram for one LPB40B.
+#  The driver holds None instead of an Instrumentation when it's turned off,
+#  so the disabled cost is one `is not None` check per frame sent or read.
+#
+# Latency is the time from writing a request to parsing the first frame that
+#  answers it. Replies come back in request order, so send times are queued
+#  per command and each reply takes the oldest one.
+#
+# Prometheus text output is written for the node_exporter textfile
+#  collector - to a temporary file, then renamed over the target so the
+#  collector never sees a half written file.
+#
+
+
+import os
+import time
+import bisect
+import logging
+import threading
+from collections import deque
+from typing import NamedTuple
+
+
+# Histogram bucket upper bounds in microseconds (+Inf is implied)
+LATENCY_BUCKETS_US = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+# Reply command -> the request command it answers, where they differ
+REPLY_TO_REQUEST = {
+    0x07: 0x05,     # measurement data answers start measurement
+}
+
+
+class LatencySnapshot(NamedTuple):
+    bucket_bounds_us: tuple
+    bucket_counts: tuple        # per bucket, last one is +Inf - not cumulative
+    count: int
+    sum_ns: int
+
+    @property
+    def mean_us(self) -> float:
+        return self.sum_ns / self.count / 1e3 if self.count else 0.0
+
+    def percentile_us(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of samples (inf past the last)."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for (bound, bucket_count) in zip(self.bucket_bounds_us + (float("inf"),), self.bucket_counts):
+            seen += bucket_count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class LatencyHistogram:
+    """Fixed bucket histogram - O(log buckets) per sample, no per sample storage."""
+    def __init__(self, bucket_bounds_us=LATENCY_BUCKETS_US):
+        self.bucket_bounds_us = tuple(bucket_bounds_us)
+        self._bounds_ns = [bound * 1000 for bound in self.bucket_bounds_us]
+        self.reset()
+
+    def reset(self) -> None:
+        self.bucket_counts = [0] * (len(self.bucket_bounds_us) + 1)
+        self.count = 0
+        self.sum_ns = 0
+
+    def observe(self, latency_ns: int) -> None:
+        self.bucket_counts[bisect.bisect_left(self._bounds_ns, latency_ns)] += 1
+        self.count += 1
+        self.sum_ns += latency_ns
+
+    def snapshot(self) -> LatencySnapshot:
+        return LatencySnapshot(self.bucket_bounds_us, tuple(self.bucket_counts), self.count, self.sum_ns)
+
+
+class Instrumentation:
+    # Requests with no reply (stop, mode) would otherwise queue send times forever
+    MAX_PENDING = 16
+
+    def __init__(self, bucket_bounds_us=LATENCY_BUCKETS_US):
+        self.latency = LatencyHistogram(bucket_bounds_us)
+        self._pending = {}      # request command -> deque of send perf_counter_ns
+        self.reset()
+
+    def reset(self) -> None:
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.timeouts = 0
+        self.latency.reset()
+        self._pending.clear()
+
+    def sent(self, command: int) -> None:
+        self.frames_sent += 1
+        pending = self._pending.get(command)
+        if pending is None:
+            pending = self._pending[command] = deque(maxlen=self.MAX_PENDING)
+        pending.append(time.perf_counter_ns())
+
+    def received(self, command: int) -> None:
+        self.frames_received += 1
+        pending = self._pending.get(REPLY_TO_REQUEST.get(command, command))
+        if pending:
+            self.latency.observe(time.perf_counter_ns() - pending.popleft())
+
+    def clear_pending(self) -> None:
+        """Forget outstanding requests - their replies were thrown away."""
+        self._pending.clear()
+
+
+class DriverStats(NamedTuple):
+    instrumented: bool
+    frames_sent: int
+    frames_received: int
+    timeouts: int
+    unexpected_commands: int
+    crc_failures: int
+    resyncs: int
+    dropped_bytes: int
+    settle_waits: int
+    latency: LatencySnapshot
+
+
+# ---------- Prometheus text exporter ----------
+METRIC_PREFIX = "lpb40b"
+
+_COUNTERS = (
+    ("frames_sent", "Frames written to the sensor"),
+    ("frames_received", "Valid frames parsed from the sensor"),
+    ("timeouts", "Request/reply round trips that timed out"),
+    ("unexpected_commands", "Frames skipped for an unexpected command"),
+    ("crc_failures", "Candidate frames that failed the CRC check"),
+    ("resyncs", "Times the parser slid past misaligned bytes"),
+    ("dropped_bytes", "Bytes discarded while resynchronizing"),
+    ("settle_waits", "Commands held back for a settle time"),
+)
+
+
+def format_prometheus(stats_by_sensor: dict) -> str:
+    """Prometheus text exposition for {sensor name: DriverStats}."""
+    lines = []
+    for (field, help_text) in _COUNTERS:
+        name = f"{METRIC_PREFIX}_{field}_total"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (sensor, stats) in stats_by_sensor.items():
+            lines.append(f'{name}{{sensor="{_escape(sensor)}"}} {getattr(stats, field)}')
+
+    name = f"{METRIC_PREFIX}_request_latency_seconds"
+    lines.append(f"# HELP {name} Request to response latency")
+    lines.append(f"# TYPE {name} histogram")
+    for (sensor, stats) in stats_by_sensor.items():
+        label = f'sensor="{_escape(sensor)}"'
+        latency = stats.latency
+        cumulative = 0
+        for (bound_us, bucket_count) in zip(latency.bucket_bounds_us, latency.bucket_counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{label},le="{bound_us / 1e6:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label},le="+Inf"}} {latency.count}')
+        lines.append(f"{name}_sum{{{label}}} {latency.sum_ns / 1e9:.9f}")
+        lines.append(f"{name}_count{{{label}}} {latency.count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_file(path, sensors: dict) -> None:
+    """Write stats for {sensor name: LPB40B} to path, replacing it atomically."""
+    text = format_prometheus({name: lpb.stats() for (name, lpb) in sensors.items()})
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as prom_file:
+        prom_file.write(text)
+    os.replace(temp_path, path)
+
+
+class PrometheusFileExporter:
+    """Background thread rewriting a Prometheus textfile every interval_sec."""
+    def __init__(self, path, sensors: dict, interval_sec: float = 10.0):
+        self.path = path
+        self.sensors = dict(sensors)
+        self.interval_sec = interval_sec
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.log = logging.getLogger(name=__class__.__name__)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            raise RuntimeError("Exporter already running")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="LPB40B-prometheus", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # One last write so the file reflects the final counts
+        self.export()
+
+    def export(self) -> None:
+        try:
+            write_prometheus_file(self.path, self.sensors)
+        except OSError as e:
+            self.log.warning(f"Could not write Prometheus file {self.path}: {e}")
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval_sec):
+            self.export()
+
+
+def _escape(label_value: str) -> str:
+    return str(label_value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,214 @@
+#
+#   LPB40B offline raw log decoder
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Decodes raw serial byte logs (exactly what came off the port, no
+#  framing or timestamps added) into columns, using NumPy instead of a
+#  byte at a time loop:
+#
+#   1. Every offset with 0x55 and 0xAA seven bytes later is a candidate.
+#   2. The CRC of all candidates is computed at once with table lookups.
+#   3. Valid frames are taken first come first served, skipping any that
+#      overlap the one before - the same choice FrameParser makes when it
+#      resyncs. Candidates that fail the CRC and don't overlap a valid
+#      frame are kept too, flagged in the crc_valid mask.
+#
+# Big logs are split into chunks that decode in a process pool. Each chunk
+#  boundary is moved forward to the next valid frame, so no frame is split.
+#  Each worker also reads 7 bytes past its end, so a frame that starts
+#  just before the boundary is still seen whole. Workers memory map the
+#  file themselves - only offsets cross the process boundary.
+#
+# Run with:  python -m src.log_decoder raw.log --output decoded.npz
+#
+
+
+import os
+import sys
+import mmap
+import argparse
+from typing import NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .crc import CRC_TABLE, FRAME_LENGTH, START_BYTE, STOP_BYTE
+
+
+MEASUREMENT_DATA_CMD = 0x07
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+# How far past a nominal chunk boundary to look for a frame to align to
+BOUNDARY_SEARCH_BYTES = 64 * 1024
+
+_CRC_TABLE = np.frombuffer(CRC_TABLE, dtype=np.uint8)
+
+
+class DecodedLog(NamedTuple):
+    byte_offsets: np.ndarray    # int64, frame start in the log
+    commands: np.ndarray        # uint8
+    distances_mm: np.ndarray    # uint32, only meaningful for measurement data (0x07)
+    error_codes: np.ndarray     # uint8
+    crc_valid: np.ndarray       # bool - False for frame shaped runs that failed the CRC
+    timestamps_ns: np.ndarray   # int64, estimated - see decode_log()
+
+    def measurements(self) -> "DecodedLog":
+        """Only the CRC valid measurement data frames."""
+        keep = self.crc_valid & (self.commands == MEASUREMENT_DATA_CMD)
+        return DecodedLog(*(column[keep] for column in self))
+
+
+def _empty_columns() -> tuple:
+    return (np.zeros(0, np.int64), np.zeros(0, np.uint8), np.zeros(0, np.uint32),
+            np.zeros(0, np.uint8), np.zeros(0, bool))
+
+
+def _frame_crc(data: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    crc = _CRC_TABLE[data[starts + 1]]
+    for index in range(2, 6):
+        crc = _CRC_TABLE[crc ^ data[starts + index]]
+    return crc
+
+
+def _non_overlapping(starts: np.ndarray) -> np.ndarray:
+    """First come first served subset of sorted frame starts that don't overlap."""
+    if len(starts) < 2 or np.all(np.diff(starts) >= FRAME_LENGTH):
+        return starts
+    keep = np.ones(len(starts), dtype=bool)
+    next_free = -1
+    # Only reached for the rare overlapping runs - plain loop is fine
+    for (index, start) in enumerate(starts.tolist()):
+        if start < next_free:
+            keep[index] = False
+        else:
+            next_free = start + FRAME_LENGTH
+    return starts[keep]
+
+
+def locate_frames(data: np.ndarray, limit=None) -> tuple:
+    """(valid starts, CRC failed starts) of frames in a uint8 array.
+
+    Only frames starting before limit (default: anywhere) are returned.
+    """
+    if len(data) < FRAME_LENGTH:
+        return (np.zeros(0, np.int64), np.zeros(0, np.int64))
+    candidates = np.flatnonzero(
+        (data[:-(FRAME_LENGTH - 1)] == START_BYTE) & (data[FRAME_LENGTH - 1:] == STOP_BYTE)
+    )
+    if limit is not None:
+        candidates = candidates[candidates < limit]
+    crc_ok = _frame_crc(data, candidates) == data[candidates + 6]
+
+    valid = _non_overlapping(candidates[crc_ok])
+
+    # Failed candidates only count as corrupt frames where no valid frame is
+    failed = candidates[~crc_ok]
+    if len(failed) and len(valid):
+        nearest = np.searchsorted(valid, failed - (FRAME_LENGTH - 1))
+        overlaps = nearest < len(valid)
+        overlaps[overlaps] = valid[nearest[overlaps]] <= failed[overlaps] + (FRAME_LENGTH - 1)
+        failed = failed[~overlaps]
+    failed = _non_overlapping(failed)
+    return (valid.astype(np.int64), failed.astype(np.int64))
+
+
+def decode_array(data: np.ndarray, base_offset: int = 0, limit=None) -> tuple:
+    """Columns (offsets, commands, distances, error codes, crc valid) for a uint8 array."""
+    (valid, failed) = locate_frames(data, limit)
+    starts = np.concatenate((valid, failed))
+    crc_valid = np.concatenate((np.ones(len(valid), bool), np.zeros(len(failed), bool)))
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    crc_valid = crc_valid[order]
+
+    distances = ((data[starts + 3].astype(np.uint32) << 16)
+                 | (data[starts + 4].astype(np.uint32) << 8)
+                 | data[starts + 5])
+    return (starts + base_offset, data[starts + 1], distances, data[starts + 2], crc_valid)
+
+
+def _decode_chunk(path, start: int, end: int) -> tuple:
+    """Worker: decode frames starting in [start, end) of the file at path."""
+    with open(path, "rb") as log_file:
+        size = os.fstat(log_file.fileno()).st_size
+        if start >= size:
+            return _empty_columns()
+        with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as log_map:
+            stop = min(size, end + FRAME_LENGTH - 1)
+            data = np.frombuffer(log_map, dtype=np.uint8, count=stop - start, offset=start)
+            # Copy the results out - the map closes when this returns
+            columns = tuple(np.array(column) for column in decode_array(data, start, limit=end - start))
+            del data
+    return columns
+
+
+def chunk_bounds(path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list:
+    """[(start, end)] chunks covering the file, each starting on a valid frame where one is near."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    bounds = [0]
+    with open(path, "rb") as log_file:
+        for nominal in range(chunk_size, size, chunk_size):
+            log_file.seek(nominal)
+            window = np.frombuffer(log_file.read(BOUNDARY_SEARCH_BYTES + FRAME_LENGTH - 1), np.uint8)
+            (valid, _) = locate_frames(window, limit=BOUNDARY_SEARCH_BYTES)
+            boundary = nominal + int(valid[0]) if len(valid) else nominal
+            if boundary > bounds[-1]:
+                bounds.append(boundary)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def decode_log(path, workers=None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+               start_ns: int = 0, measurement_frequency_hz=None) -> DecodedLog:
+    """Decode a raw serial log, in parallel across chunks.
+
+    Raw logs carry no timestamps. With measurement_frequency_hz set (a
+    continuous mode log), each frame gets start_ns plus the period times
+    the number of measurement frames before it. Otherwise timestamps_ns is
+    all start_ns.
+    workers=1 decodes in this process; None uses one worker per CPU.
+    """
+    bounds = chunk_bounds(path, chunk_size)
+    if workers == 1 or len(bounds) <= 1:
+        parts = [_decode_chunk(path, start, end) for (start, end) in bounds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_decode_chunk, *zip(*((path, start, end) for (start, end) in bounds))))
+
+    if parts:
+        columns = tuple(np.concatenate(column) for column in zip(*parts))
+    else:
+        columns = _empty_columns()
+    (offsets, commands, distances, error_codes, crc_valid) = columns
+
+    timestamps = np.full(len(offsets), start_ns, dtype=np.int64)
+    if measurement_frequency_hz:
+        is_measurement = crc_valid & (commands == MEASUREMENT_DATA_CMD)
+        index = np.maximum(np.cumsum(is_measurement) - 1, 0)
+        timestamps += index * (1_000_000_000 // measurement_frequency_hz)
+    return DecodedLog(offsets, commands, distances, error_codes, crc_valid, timestamps)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Decode a raw LPB40B serial log")
+    parser.add_argument("log", help="raw serial byte log")
+    parser.add_argument("--output", required=True, help="columns are written to this .npz file")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per CPU)")
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_SIZE / (1024 * 1024))
+    parser.add_argument("--frequency-hz", type=int, default=None,
+                        help="measurement frequency of a continuous mode log, for timestamps")
+    args = parser.parse_args(argv)
+
+    decoded = decode_log(args.log, workers=args.workers, chunk_size=int(args.chunk_mb * 1024 * 1024),
+                         measurement_frequency_hz=args.frequency_hz)
+    np.savez(args.output, **decoded._asdict())
+    print(f"{len(decoded.byte_offsets)} frames, {int(decoded.crc_valid.sum())} CRC valid -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
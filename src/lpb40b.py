@@ -15,8 +15,52 @@
 
 
 import time
+import struct
 import serial
+import contextlib
 import logging
+import functools
+import threading
+import concurrent.futures
+from typing import NamedTuple
+
+from .stream import MeasurementStream
+from .frame_parser import FrameParser
+from .crc import crc8, add_protocol_bytes, build_frame
+from .device_info import decode_device_info
+from .device_state import DeviceStateCache
+from .dispatcher import ResponseDispatcher
+from .command_scheduler import CommandScheduler
+from .measurement import Measurement, MeasurementBatch
+from .instrumentation import Instrumentation, DriverStats, LatencyHistogram
+
+
+# Error code byte + 3 byte big endian distance, read as one int
+MEASUREMENT_STRUCT = struct.Struct(">I")
+DISTANCE_MASK = 0xFFFFFF
+# Get temperature (0x02) value is a big endian float32 in degrees C
+TEMPERATURE_STRUCT = struct.Struct(">f")
+
+
+def _exclusive(method):
+    """Hold the driver's io_lock for the whole call, so another thread's round trip can't interleave."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.io_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class AchievedRate(NamedTuple):
+    requested_hz: int
+    achieved_hz: float
+    frames: int
+    window_sec: float
+
+    @property
+    def ratio(self) -> float:
+        """Achieved over requested - 1.0 means the device kept up exactly."""
+        return self.achieved_hz / self.requested_hz if self.requested_hz else 0.0
 
 
 class LPB40B:
@@ -27,103 +71,568 @@ class LPB40B:
 
     # commands from SEN058 communications protocol
     CMD_GET_DEVICE_INFO = 0x01
+    CMD_GET_TEMPERATURE = 0x02
+    CMD_SET_MEASUREMENT_FREQUENCY = 0x03
+    CMD_SET_DATA_FORMAT = 0x04
     CMD_START_MEASUREMENT = 0x05
+    CMD_STOP_MEASUREMENT = 0x06
     CMD_MEASUREMENT_DATA = 0x07
+    CMD_SAVE_SETTINGS = 0x08
     CMD_SET_MEASUREMENT_MODE = 0x0D
+    CMD_SET_BAUD_RATE = 0x12
+
+    # Set baud rate (0x12) value codes - 0x00 is adaptive
+    BAUD_RATE_CODES = {
+        300: 0x01, 600: 0x02, 1200: 0x03, 2400: 0x04, 4800: 0x05, 9600: 0x06,
+        14400: 0x07, 19200: 0x08, 38400: 0x09, 56000: 0x0A, 57600: 0x0B,
+        115200: 0x0C, 230400: 0x0D, 256000: 0x0E, 460800: 0x0F, 921600: 0x10,
+    }
+    BAUD_RATE_FAILED = 0xFF
+
+    # Commands that change what get device info reports - sending one invalidates the cache
+    CONFIG_COMMANDS = frozenset({
+        CMD_SET_MEASUREMENT_FREQUENCY, CMD_SET_DATA_FORMAT, CMD_SET_MEASUREMENT_MODE, CMD_SET_BAUD_RATE,
+    })
 
-    def __init__(self, ser: serial.Serial):
+    # Measurement requests kept in flight by iter_measurements_pipelined()
+    DEFAULT_PIPELINE_DEPTH = 4
+
+    # Above 500 Hz the device switches to high speed (0x0E) frames - not supported
+    MIN_MEASUREMENT_FREQUENCY_HZ = 1
+    MAX_MEASUREMENT_FREQUENCY_HZ = 500
+    # Order tried by probe_baud_rate() after the port's current rate
+    PROBE_BAUD_RATES = (115200, 921600, 460800, 230400, 256000, 57600, 38400, 19200, 9600)
+
+    # Prebuilt frames for commands that never change
+    FRAME_GET_DEVICE_INFO = build_frame(CMD_GET_DEVICE_INFO)
+    FRAME_GET_TEMPERATURE = build_frame(CMD_GET_TEMPERATURE)
+    FRAME_START_MEASUREMENT = build_frame(CMD_START_MEASUREMENT)
+    FRAME_STOP_MEASUREMENT = build_frame(CMD_STOP_MEASUREMENT)
+    FRAME_SET_CONTINUOUS_MODE = build_frame(CMD_SET_MEASUREMENT_MODE, bytes([0x00, 0x00, 0x00, 0x00]))
+    FRAME_SET_SINGLE_MODE = build_frame(CMD_SET_MEASUREMENT_MODE, bytes([0x00, 0x00, 0x00, 0x01]))
+    FRAME_SAVE_SETTINGS = build_frame(CMD_SAVE_SETTINGS)
+
+    def __init__(self, ser: serial.Serial, instrument=False):
+        """instrument=True keeps frame counters and a latency histogram - see stats()."""
         if not ser.is_open:
             raise ValueError("Serial port must be open")
         self.ser = ser
+        self.stream = None
+        self.measurement_frequency_hz = None   # Last rate set or read back, None until known
+
+        self.parser = FrameParser()
+        self.scheduler = CommandScheduler()
+        self.skipped_frames = 0
+        self._ser_timeout = None
+        # None when off - the I/O paths only pay for an `is not None` check
+        self.instrumentation = Instrumentation() if instrument else None
+
+        # Held for each public round trip - lets background work (temperature refresh) share the port
+        self.io_lock = threading.RLock()
+        self.device_state = DeviceStateCache(self)
+        # Routes query replies to their callers while the stream's reader owns the port
+        self.dispatcher = ResponseDispatcher()
 
         self.log = logging.getLogger(name=__class__.__name__)
 
     # ---------- CRC Per documentation spec ----------
     @staticmethod
     def gen_crc(msg_bytes: bytes) -> int:
-        crc = LPB40B.CRC_START_VALUE
-        bits_per_byte = 8
-        for current_byte in msg_bytes:
-            crc ^= current_byte
-            for _ in range(bits_per_byte):
-                if crc & 0x80:
-                    crc = ((crc << 1) ^ LPB40B.CRC_POLYNOMIAL) & 0xFF
-                else:
-                    crc = (crc << 1) & 0xFF
-        return crc
+        return crc8(msg_bytes)
 
     def _add_protocol_bytes(self, msg_bytes: bytes) -> bytes:
-        if len(msg_bytes) != 5:
-            raise ValueError("Payload must be exactly 5 bytes")
-        crc = LPB40B.gen_crc(msg_bytes)
-        return bytes([LPB40B.START_BYTE]) + msg_bytes + bytes([crc, LPB40B.STOP_BYTE])
+        return add_protocol_bytes(msg_bytes)
 
     # ---------- High-level commands ----------
-    def begin(self):
+    @_exclusive
+    def begin(self, probe_baud_rate=False):
         self.ser.flush()
+        self.parser.reset()
+        if probe_baud_rate:
+            self.probe_baud_rate()
         self.set_single_measurement_mode()
 
+    @_exclusive
+    def set_baud_rate(self, baud_rate: int, timeout=1.0):
+        """Switch device and host port to a new baud rate, verified with a get info.
+
+        The device replies at the old rate and then switches, so the host port
+        is only changed once that reply is in. If get info fails at the new
+        rate the host goes back to the old one and ConnectionError is raised.
+        The rate is lost on power off - save settings (0x08) doesn't store it.
+        """
+        if baud_rate not in self.BAUD_RATE_CODES:
+            raise ValueError(f"Unsupported baud rate: {baud_rate}")
+        if self.stream is not None:
+            raise RuntimeError("Stop streaming before changing the baud rate")
+        rate_code = self.BAUD_RATE_CODES[baud_rate]
+        old_baud_rate = self.ser.baudrate
+
+        self.log.debug(f"Setting baud rate from {old_baud_rate} to {baud_rate}.")
+        self._send(bytes([self.CMD_SET_BAUD_RATE, 0x00, 0x00, 0x00, rate_code]))
+        reply = self._read_frame(timeout, expected_cmd=self.CMD_SET_BAUD_RATE)
+        if reply[5] != rate_code:
+            raise ValueError(f"Device rejected baud rate {baud_rate}: {reply.hex(' ').upper()}")
+
+        self.ser.baudrate = baud_rate
+        self._discard_input()
+        if not self._link_ok(timeout):
+            self.ser.baudrate = old_baud_rate
+            self._discard_input()
+            raise ConnectionError(
+                f"No response at {baud_rate} baud - host port back at {old_baud_rate}"
+            )
+
+    @_exclusive
+    def probe_baud_rate(self, candidates=None, timeout=0.1) -> int:
+        """Find the device's current baud rate with get info, leaving the port set to it."""
+        if candidates is None:
+            candidates = (self.ser.baudrate,) + tuple(
+                rate for rate in self.PROBE_BAUD_RATES if rate != self.ser.baudrate
+            )
+        for baud_rate in candidates:
+            self.ser.baudrate = baud_rate
+            self._discard_input()
+            if self._link_ok(timeout):
+                self.log.debug(f"Device found at {baud_rate} baud.")
+                return baud_rate
+        raise ConnectionError(f"Device did not answer at any of {list(candidates)} baud")
+
+    @_exclusive
+    def save_settings(self, timeout=1.0):
+        """Store data format, mode and frequency in device flash (0x08). Baud rate isn't saved."""
+        (reply,) = self._request(self.FRAME_SAVE_SETTINGS, self.CMD_SAVE_SETTINGS, timeout=timeout)
+        if any(reply[2:6]):
+            raise ValueError(f"Device failed to save settings: {reply.hex(' ').upper()}")
+
+    @_exclusive
     def set_single_measurement_mode(self):
         """Put sensor into single measurement mode."""
         self.log.debug("Setting device into single measurement mode.")
-        payload = bytes([self.CMD_SET_MEASUREMENT_MODE, 0x00, 0x00, 0x00, 0x01])
-        self._send(payload)
+        # Yes, the settle time is needed - device hangs if you flood serial here.
+        #  The scheduler only waits if the next command would come too soon.
+        self._send_frame(self.FRAME_SET_SINGLE_MODE, settle_sec=self.scheduler.DEFAULT_SETTLE_SEC)
+
+    @_exclusive
+    def set_continuous_measurement_mode(self):
+        """Put sensor into continuous measurement mode."""
+        self.log.debug("Setting device into continuous measurement mode.")
+        # Same flooding concern as single measurement mode
+        self._send_frame(self.FRAME_SET_CONTINUOUS_MODE, settle_sec=self.scheduler.DEFAULT_SETTLE_SEC)
+
+    @_exclusive
+    def set_measurement_frequency(self, frequency_hz: int):
+        """Set the measurement frequency (0x03), 1-500 Hz. Lost on power off unless saved."""
+        if not (self.MIN_MEASUREMENT_FREQUENCY_HZ <= frequency_hz <= self.MAX_MEASUREMENT_FREQUENCY_HZ):
+            raise ValueError(
+                f"Measurement frequency must be {self.MIN_MEASUREMENT_FREQUENCY_HZ}-"
+                f"{self.MAX_MEASUREMENT_FREQUENCY_HZ} Hz, got {frequency_hz}"
+            )
+        self.log.debug(f"Setting measurement frequency to {frequency_hz} Hz.")
+        # Configuration command - same flooding concern as the mode commands
+        self._send(
+            bytes([self.CMD_SET_MEASUREMENT_FREQUENCY]) + frequency_hz.to_bytes(4, byteorder="big"),
+            settle_sec=self.scheduler.DEFAULT_SETTLE_SEC,
+        )
+        self.measurement_frequency_hz = frequency_hz
+
+    @_exclusive
+    def measure_achieved_rate(self, window_sec=1.0) -> "AchievedRate":
+        """Stream for window_sec and compare the frame rate seen with the rate requested.
+
+        Leaves the device in single measurement mode afterwards.
+        """
+        if self.stream is not None:
+            raise RuntimeError("Stop streaming before measuring the achieved rate")
+        if self.measurement_frequency_hz is None:
+            self.get_device_info(decode=True)
+
+        stream = self.start_streaming(buffer_size=max(16, int(window_sec * self.MAX_MEASUREMENT_FREQUENCY_HZ * 2)))
+        try:
+            time.sleep(window_sec)
+        finally:
+            self.stop_streaming()
+        entries = stream.drain()
+
+        achieved_hz = 0.0
+        if len(entries) > 1:
+            span_ns = entries[-1].timestamp_ns - entries[0].timestamp_ns
+            if span_ns > 0:
+                achieved_hz = (len(entries) - 1) * 1e9 / span_ns
+        return AchievedRate(self.measurement_frequency_hz, achieved_hz, len(entries), window_sec)
+
+    @_exclusive
+    def start_streaming(self, buffer_size=MeasurementStream.DEFAULT_BUFFER_SIZE,
+                        sample_buffer=None, filters=None) -> MeasurementStream:
+        """Switch to continuous mode and decode frames in a background reader.
+
+        If a SampleBuffer is given the reader fills it as well. If filters
+        (a RangeFilter or FilterChain) are given, each valid Measurement
+        gets its filtered_mm set. buffer_size=0 only fills the SampleBuffer -
+        no Measurement records are built or queued.
+        """
+        if self.stream is not None:
+            raise RuntimeError("Streaming already started")
+        # Built first so bad arguments fail before the device changes mode
+        stream = MeasurementStream(
+            self, buffer_size=buffer_size, sample_buffer=sample_buffer, filters=filters
+        )
+        self.set_continuous_measurement_mode()
+
+        self.stream = stream
+        self._send_frame(self.FRAME_START_MEASUREMENT)
+        self.stream.start()
+        return self.stream
+
+    @_exclusive
+    def stop_streaming(self):
+        """Stop continuous measurements and return to single measurement mode."""
+        if self.stream is None:
+            return
+        stream = self.stream
+        try:
+            self._send_frame(self.FRAME_STOP_MEASUREMENT)
+        finally:
+            self.stream = None
+            self.dispatcher.fail_all(ConnectionError("Streaming stopped before the reply arrived"))
+            # Raises the reader's error if it died - the port is in an unknown state then
+            stream.stop()
+
+        # Throw away any frames that were in flight when the stop was sent
+        self._discard_input()
+        self.set_single_measurement_mode()
+
+    def latest(self):
+        """Most recent streamed Measurement, or None."""
+        if self.stream is None:
+            raise RuntimeError("Streaming not started")
+        return self.stream.latest()
 
-        # Yes, this is needed - device hangs if you flood serial here
-        #  Value of 0.01 seems to be sufficient
-        time.sleep(0.01)
+    def drain(self) -> list:
+        """All buffered streamed Measurements, oldest first."""
+        if self.stream is None:
+            raise RuntimeError("Streaming not started")
+        return self.stream.drain()
 
+    @_exclusive
     def get_measurement_mm(self) -> int:
         """Take one measurement and return distance in mm."""
-        payload = bytes([self.CMD_START_MEASUREMENT, 0x00, 0x00, 0x00, 0x00])
-        self._send(payload)
+        if self.stream is not None:
+            raise RuntimeError("Stop streaming before taking single measurements")
+        self._send_frame(self.FRAME_START_MEASUREMENT)
 
-        measurement_frame = self._read_frame()
+        # Decoded straight from the parser's buffer - the frame isn't copied out to bytes
+        offset = self._read_frame_offset(1.0, self.CMD_MEASUREMENT_DATA)
+        parser = self.parser
+        dist_mm = MEASUREMENT_STRUCT.unpack_from(parser.buffer, offset + 2)[0] & DISTANCE_MASK
+        parser.consume_frame()
+        return dist_mm
+
+    @_exclusive
+    def get_measurement(self, timeout=1.0) -> Measurement:
+        """Take one measurement and return it with its error code, raw frame and timestamp."""
+        if self.stream is not None:
+            raise RuntimeError("Stop streaming before taking single measurements")
+        self._send_frame(self.FRAME_START_MEASUREMENT)
+        frame = self._read_frame(timeout, expected_cmd=self.CMD_MEASUREMENT_DATA)
+        return Measurement.from_frame(frame, time.monotonic_ns())
+
+    @_exclusive
+    def measure_into(self, sample_buffer, count: int) -> None:
+        """Take `count` single measurements straight into a SampleBuffer."""
+        parser = self.parser
+        for offset in self._pipeline_offsets(count, depth=1, timeout=1.0):
+            value = MEASUREMENT_STRUCT.unpack_from(parser.buffer, offset + 2)[0]
+            sample_buffer.append(time.monotonic_ns(), value & DISTANCE_MASK, value >> 24)
+
+    def iter_measurements_pipelined(self, count: int, depth=DEFAULT_PIPELINE_DEPTH, timeout=1.0):
+        """Yield `count` distances in mm, keeping up to `depth` requests in flight.
+
+        Holds io_lock until exhausted or closed. Closing early waits out the
+        replies still in flight and drops them.
+        """
+        parser = self.parser
+        with contextlib.closing(self._pipeline_offsets(count, depth, timeout)) as offsets:
+            for offset in offsets:
+                yield MEASUREMENT_STRUCT.unpack_from(parser.buffer, offset + 2)[0] & DISTANCE_MASK
+
+    def get_measurements_mm(self, count: int, depth=DEFAULT_PIPELINE_DEPTH, timeout=1.0) -> list:
+        """List of `count` distances in mm taken with pipelined requests."""
+        return list(self.iter_measurements_pipelined(count, depth, timeout))
+
+    def get_measurements(self, count: int, depth=DEFAULT_PIPELINE_DEPTH, timeout=1.0) -> MeasurementBatch:
+        """`count` pipelined measurements as parallel timestamp, distance and error code arrays."""
+        batch = MeasurementBatch.empty()
+        (timestamps_ns, distances_mm, error_codes) = batch
+        parser = self.parser
+        for offset in self._pipeline_offsets(count, depth, timeout):
+            value = MEASUREMENT_STRUCT.unpack_from(parser.buffer, offset + 2)[0]
+            timestamps_ns.append(time.monotonic_ns())
+            distances_mm.append(value & DISTANCE_MASK)
+            error_codes.append(value >> 24)
+        return batch
+
+    def _pipeline_offsets(self, count: int, depth: int, timeout: float):
+        """Yield parser offsets of `count` measurement replies, keeping `depth` requests in flight.
+
+        Replies come back in request order, so each one answers the oldest
+        outstanding request. Overlapping the next request with the current
+        reply hides most of the round trip. Each frame is consumed when the
+        caller asks for the next one. On a timeout the rest of the pipeline
+        is thrown away before TimeoutError is raised. If the generator is
+        closed early, replies to the requests still in flight are waited for
+        and thrown away, so they can't answer a later request.
+        """
+        if depth < 1:
+            raise ValueError("Pipeline depth must be at least 1")
+        if self.stream is not None:
+            raise RuntimeError("Stop streaming before taking single measurements")
+        frame_start = self.FRAME_START_MEASUREMENT
+        parser = self.parser
+        in_flight = 0
+        sent = 0
+        holding_frame = False
+
+        # Held across yields - the caller has to finish or close the generator
+        with self.io_lock:
+            try:
+                while sent < count and in_flight < depth:
+                    self._send_frame(frame_start)
+                    sent += 1
+                    in_flight += 1
 
-        frame_payload = measurement_frame[1:6]
+                while in_flight:
+                    offset = self._read_frame_offset(timeout, self.CMD_MEASUREMENT_DATA)
+                    in_flight -= 1
+                    if sent < count:
+                        self._send_frame(frame_start)
+                        sent += 1
+                        in_flight += 1
+                    holding_frame = True
+                    yield offset
+                    parser.consume_frame()
+                    holding_frame = False
+            except TimeoutError:
+                self._discard_input()
+                in_flight = 0
+                holding_frame = False
+                raise
+            finally:
+                if in_flight or holding_frame:
+                    self._abandon_pipeline(in_flight, timeout)
 
-        return_cmd = frame_payload[0]
+    def _abandon_pipeline(self, in_flight: int, timeout: float) -> None:
+        """Wait out the replies to requests still in flight, then drop everything received."""
+        try:
+            for _ in range(in_flight):
+                self._read_frame_offset(timeout, self.CMD_MEASUREMENT_DATA)
+                self.parser.consume_frame()
+        except TimeoutError:
+            pass
+        self._discard_input()
 
-        if return_cmd != self.CMD_MEASUREMENT_DATA:
+    @staticmethod
+    def decode_measurement(measurement_frame: bytes, timestamp_ns: int) -> Measurement:
+        """Measurement record from a measurement data (0x07) frame."""
+        if measurement_frame[1] != LPB40B.CMD_MEASUREMENT_DATA:
             raise ValueError(
                 f"Measurement read invalid return data frame: {measurement_frame}"
             )
+        return Measurement.from_frame(measurement_frame, timestamp_ns)
 
-        error_code = frame_payload[1:2]
-        measurement_bytes = frame_payload[
-            -3:
-        ]  # 3 bytes at end of payload (yes, 3 byte bigendian int)
-        dist_mm = int.from_bytes(measurement_bytes, byteorder="big")
-        return dist_mm
+    @staticmethod
+    def decode_measurement_frame(measurement_frame: bytes) -> int:
+        """Distance in mm from a measurement data (0x07) frame."""
+        if measurement_frame[1] != LPB40B.CMD_MEASUREMENT_DATA:
+            raise ValueError(
+                f"Measurement read invalid return data frame: {measurement_frame}"
+            )
+
+        # Error code byte, then 3 byte big endian distance (yes, a 3 byte int)
+        return MEASUREMENT_STRUCT.unpack_from(measurement_frame, 2)[0] & DISTANCE_MASK
+
+    @_exclusive
+    def get_device_info(self, timeout=1.0, decode=False):
+        """Fetch device info (2 frames). Returns a tuple of 2 raw frames, or a DeviceInfo if decode."""
+        (info_frame1, info_frame2) = self._request(
+            self.FRAME_GET_DEVICE_INFO, self.CMD_GET_DEVICE_INFO, frame_count=2, timeout=timeout
+        )
+
+        # Decoding is cheap - keep the cache fresh whichever form the caller wants
+        device_info = decode_device_info(info_frame1, info_frame2)
+        self.measurement_frequency_hz = device_info.measurement_frequency_hz
+        self.device_state.store_info(device_info)
+        if not decode:
+            return (info_frame1, info_frame2)
+        return device_info
 
-    def get_device_info(self, timeout=1.0) -> tuple:
-        """Fetch device info (2 frames). Returns a list of 2 raw frames."""
-        payload = bytes([self.CMD_GET_DEVICE_INFO, 0x00, 0x00, 0x00, 0x00])
-        self._send(payload)
+    @_exclusive
+    def get_temperature_c(self, timeout=1.0) -> float:
+        """Read the sensor temperature (0x02) in degrees C. See device_state for a cached copy."""
+        (reply,) = self._request(self.FRAME_GET_TEMPERATURE, self.CMD_GET_TEMPERATURE, timeout=timeout)
+        temperature_c = TEMPERATURE_STRUCT.unpack_from(reply, 2)[0]
+        self.device_state.store_temperature(temperature_c)
+        return temperature_c
 
-        info_frame1 = self._read_frame()
-        info_frame2 = self._read_frame()
+    # ---------- Diagnostics ----------
+    def stats(self) -> DriverStats:
+        """Snapshot of driver counters.
 
-        return (info_frame1, info_frame2)
+        Parser, skip and settle counters are always kept. Frames sent and
+        received, timeouts and latency stay at zero unless instrumented.
+        """
+        parser = self.parser
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            (sent, received, timeouts) = (0, 0, 0)
+            latency = LatencyHistogram().snapshot()
+        else:
+            sent = instrumentation.frames_sent
+            received = instrumentation.frames_received
+            timeouts = instrumentation.timeouts
+            latency = instrumentation.latency.snapshot()
+        return DriverStats(
+            instrumented=instrumentation is not None,
+            frames_sent=sent,
+            frames_received=received,
+            timeouts=timeouts,
+            unexpected_commands=self.skipped_frames,
+            crc_failures=parser.crc_failures,
+            resyncs=parser.resync_count,
+            dropped_bytes=parser.dropped_bytes,
+            settle_waits=self.scheduler.waits,
+            latency=latency,
+        )
+
+    def reset_stats(self) -> None:
+        self.skipped_frames = 0
+        self.parser.reset_counters()
+        if self.instrumentation is not None:
+            self.instrumentation.reset()
 
     # ---------- Low-level I/O ----------
-    def _send(self, payload: bytes):
-        msg = self._add_protocol_bytes(payload)
-        self.log.debug(f"Sending to serial: {msg.hex(' ').upper()}")
+    def _discard_input(self):
+        self.ser.reset_input_buffer()
+        self.parser.reset()
+        if self.instrumentation is not None:
+            self.instrumentation.clear_pending()
+
+    def _link_ok(self, timeout) -> bool:
+        """True if a get info round trip works at the port's current settings."""
+        try:
+            self.get_device_info(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def _request(self, msg: bytes, reply_cmd: int, frame_count=1, timeout=1.0) -> tuple:
+        """Send a query and return its frame_count reply frames.
+
+        While streaming, the reader thread owns the port, so the reply comes
+        back through the dispatcher instead. The stream keeps running and
+        no measurement frames are lost.
+        """
+        if self.stream is None:
+            self._send_frame(msg)
+            return tuple(self._read_frame(timeout, expected_cmd=reply_cmd) for _ in range(frame_count))
+
+        future = self.dispatcher.expect(reply_cmd, frame_count)
+        self._send_frame(msg)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self.dispatcher.discard(future)
+            self._count_timeout()
+            raise TimeoutError(f"No reply to command {reply_cmd:#04x} while streaming") from None
+
+    def _send(self, payload: bytes, settle_sec=0.0):
+        self._send_frame(self._add_protocol_bytes(payload), settle_sec)
+
+    def _send_frame(self, msg: bytes, settle_sec=0.0):
+        """Write an already built frame - no CRC work on this path.
+
+        settle_sec holds off the next command for that long after this one.
+        """
+        scheduler = self.scheduler
+        if scheduler.not_before_ns:
+            scheduler.wait_to_send()
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug(f"Sending to serial: {msg.hex(' ').upper()}")
         self.ser.write(msg)
+        if msg[1] in self.CONFIG_COMMANDS:
+            self.device_state.invalidate()
+        if self.instrumentation is not None:
+            self.instrumentation.sent(msg[1])
+        if settle_sec:
+            scheduler.mark_sent(settle_sec)
+
+    def _read_frame(self, timeout=1.0, expected_cmd=None, count_timeout=True) -> bytes:
+        """Read one valid frame as bytes, skipping any whose command isn't expected_cmd.
+
+        Raises TimeoutError if no matching frame arrives within timeout.
+        """
+        offset = self._read_frame_offset(timeout, expected_cmd, count_timeout)
+        parser = self.parser
+        frame = bytes(parser.buffer[offset:offset + parser.FRAME_LENGTH])
+        parser.consume_frame()
+        return frame
+
+    def _read_frame_offset(self, timeout=1.0, expected_cmd=None, count_timeout=True) -> int:
+        """Receive the next matching frame, returning its offset in self.parser.buffer.
+
+        Bytes are read from the port in bulk (everything in in_waiting) with
+        readinto() straight into the parser's preallocated buffer, and run
+        through the resynchronizing FrameParser, so corrupt or partial frames
+        are dropped instead of misaligning every frame after them. The frame
+        stays in the buffer until parser.consume_frame().
+
+        count_timeout=False keeps idle polls (the stream reader's) out of the
+        instrumentation timeout count, which is for request/reply round trips.
+        """
+        # Changing ser.timeout reconfigures the port - only do it when needed
+        if self._ser_timeout != timeout:
+            self.ser.timeout = timeout
+            self._ser_timeout = timeout
+
+        parser = self.parser
+        ser = self.ser
+        instrumentation = self.instrumentation
+        deadline = None
+
+        while True:
+            offset = parser.find_frame()
+            if offset < 0:
+                if deadline is None:
+                    deadline = time.monotonic() + timeout
+                elif time.monotonic() > deadline:
+                    if count_timeout:
+                        self._count_timeout()
+                    raise TimeoutError(
+                        f"Sensor did not return full frame. Bytes buffered: {parser.buffered}"
+                    )
+                # Block for at least one byte, then grab whatever else has arrived
+                if not parser.fill_from(ser, max(1, ser.in_waiting)):
+                    if count_timeout:
+                        self._count_timeout()
+                    raise TimeoutError(
+                        f"Sensor did not return full frame. Bytes buffered: {parser.buffered}"
+                    )
+                continue
+
+            if instrumentation is not None:
+                instrumentation.received(parser.buffer[offset + 1])
+
+            if expected_cmd is not None and parser.buffer[offset + 1] != expected_cmd:
+                self.skipped_frames += 1
+                if self.log.isEnabledFor(logging.DEBUG):
+                    self.log.debug(
+                        f"Skipping unexpected frame: {parser.buffer[offset:offset + 8].hex(' ').upper()}"
+                    )
+                parser.consume_frame()
+                continue
+
+            return offset
 
-    def _read_frame(self, timeout=1.0) -> bytes:
-        """Read one frame, return as bytes, or None on timeout."""
-        self.ser.timeout = timeout
-        frame_bytes = bytearray()
-
-        while len(frame_bytes) < 8:
-            curr_byte = self.ser.read(1)
-            if not curr_byte:
-                raise TimeoutError(
-                    f"Sensor did not return full frame. Bytes read: {frame_bytes}"
-                )
-            else:
-                frame_bytes.extend(curr_byte)
-
-        return frame_bytes
+    def _count_timeout(self):
+        if self.instrumentation is not None:
+            self.instrumentation.timeouts += 1
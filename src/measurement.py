@@ -0,0 +1,90 @@
+#
+#   LPB40B measurement records
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Measurement data return (0x07) value field:
+#   1 byte error code | 3 byte big endian distance (mm)
+#
+# On any error the device still sends a frame at the set rate, with a
+#  distance of 0 - the error code is the only way to tell it apart from a
+#  real zero reading.
+#
+
+
+from array import array
+from enum import IntEnum
+from typing import NamedTuple
+
+
+class ErrorCode(IntEnum):
+    OK = 0x00
+    SIGNAL_TOO_WEAK = 0x01
+    SIGNAL_TOO_STRONG = 0x02
+    OUT_OF_RANGE = 0x03
+    SYSTEM_ERROR = 0x04
+
+
+# Indexed lookup - cheaper than ErrorCode(code) on every frame
+_ERROR_CODES = tuple(ErrorCode)
+
+
+def error_code_from_byte(code: int):
+    """ErrorCode for a known code byte, or the raw int for one the manual doesn't list."""
+    if code < len(_ERROR_CODES):
+        return _ERROR_CODES[code]
+    return code
+
+
+class Measurement:
+    """One decoded measurement frame."""
+    __slots__ = ("distance_mm", "error_code", "frame", "timestamp_ns", "filtered_mm")
+
+    def __init__(self, distance_mm: int, error_code, frame: bytes, timestamp_ns: int,
+                 filtered_mm=None):
+        self.distance_mm = distance_mm
+        self.error_code = error_code       # ErrorCode, or int if not a documented code
+        self.frame = frame                 # raw 8 byte frame as received
+        self.timestamp_ns = timestamp_ns   # host monotonic_ns when the frame was parsed
+        self.filtered_mm = filtered_mm     # set by a stream filter stage, None otherwise
+
+    @classmethod
+    def from_frame(cls, frame: bytes, timestamp_ns: int) -> "Measurement":
+        distance_mm = (frame[3] << 16) | (frame[4] << 8) | frame[5]
+        return cls(distance_mm, error_code_from_byte(frame[2]), frame, timestamp_ns)
+
+    @property
+    def valid(self) -> bool:
+        return self.error_code == ErrorCode.OK
+
+    def __eq__(self, other):
+        if not isinstance(other, Measurement):
+            return NotImplemented
+        return (self.distance_mm == other.distance_mm and self.error_code == other.error_code
+                and self.frame == other.frame and self.timestamp_ns == other.timestamp_ns)
+
+    def __repr__(self):
+        error = self.error_code.name if isinstance(self.error_code, ErrorCode) else hex(self.error_code)
+        return f"<Measurement {self.distance_mm}mm {error} t={self.timestamp_ns}>"
+
+
+class MeasurementBatch(NamedTuple):
+    """Parallel arrays for a run of measurements - wrap with numpy.frombuffer() for zero-copy use."""
+    timestamps_ns: array    # 'q'
+    distances_mm: array     # 'L'
+    error_codes: array      # 'B'
+
+    @classmethod
+    def empty(cls) -> "MeasurementBatch":
+        return cls(array("q"), array("L"), array("B"))
+
+    def append(self, timestamp_ns: int, distance_mm: int, error_code: int) -> None:
+        self.timestamps_ns.append(timestamp_ns)
+        self.distances_mm.append(distance_mm)
+        self.error_codes.append(error_code)
+
+    def valid_distances(self) -> list:
+        """Distances whose error code is OK."""
+        return [dist for (dist, code) in zip(self.distances_mm, self.error_codes) if code == ErrorCode.OK]
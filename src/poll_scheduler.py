@@ -0,0 +1,220 @@
+#
+#   Deadline based single measurement polling
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Sleeping a fixed time after each measurement makes the real period the
+#  sleep plus the round trip, and any delay pushes every later sample back.
+#  PollScheduler instead runs single measurements at absolute
+#  perf_counter_ns deadlines:
+#
+#   slot k of a sensor is due at  epoch + phase + k * period
+#
+# Lateness is never carried forward. The next deadline comes from the slot
+#  number, not from when the last measurement finished. If a slot can't
+#  start within max_lateness of its deadline it is skipped and counted,
+#  rather than run late with the slots after it bunched up behind it.
+#
+# Several sensors can share one scheduler. Each gets a phase inside the
+#  period (spread evenly by default), so their round trips take turns
+#  instead of landing on top of each other.
+#
+# Waiting sleeps until spin_sec before the deadline and then spins on
+#  perf_counter_ns, because sleep() alone tends to overshoot by ~0.1 ms.
+#
+
+
+import time
+import math
+import logging
+import threading
+from typing import NamedTuple, Optional
+
+import serial
+
+from .measurement import Measurement
+from .instrumentation import LatencyHistogram, LatencySnapshot
+
+
+# Lateness histogram buckets, microseconds
+LATENESS_BUCKETS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+
+
+class ScheduledReading(NamedTuple):
+    name: str
+    slot: int                           # slot number since the scheduler started
+    deadline_ns: int                    # perf_counter_ns the slot was due
+    lateness_ns: int                    # how far after the deadline the request went out
+    measurement: Optional[Measurement]  # None if the sensor failed this slot
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class SlotStats(NamedTuple):
+    slots_run: int
+    slots_skipped: int
+    failures: int
+    max_lateness_us: float
+    lateness: LatencySnapshot
+
+
+class _SensorSlots:
+    __slots__ = ("name", "lpb", "phase_ns", "next_slot", "next_deadline_ns",
+                 "slots_run", "slots_skipped", "failures", "max_lateness_ns", "lateness")
+
+    def __init__(self, name: str, lpb, phase_ns: int):
+        self.name = name
+        self.lpb = lpb
+        self.phase_ns = phase_ns
+        self.next_slot = 0
+        self.next_deadline_ns = 0
+        self.lateness = LatencyHistogram(LATENESS_BUCKETS_US)
+        self.reset()
+
+    def reset(self) -> None:
+        self.slots_run = 0
+        self.slots_skipped = 0
+        self.failures = 0
+        self.max_lateness_ns = 0
+        self.lateness.reset()
+
+
+class PollScheduler:
+    DEFAULT_SPIN_SEC = 0.0002
+
+    def __init__(self, sensors: dict, rate_hz: float, phases: Optional[dict] = None,
+                 max_lateness_sec: Optional[float] = None, timeout: float = 1.0,
+                 spin_sec: float = DEFAULT_SPIN_SEC):
+        """Poll each LPB40B in sensors (name -> LPB40B) at rate_hz.
+
+        phases maps a name to its offset as a fraction of the period, by
+        default sensor i of n gets i / n. A slot more than max_lateness_sec
+        (default half a period) past its deadline is skipped.
+        """
+        if not sensors:
+            raise ValueError("PollScheduler needs at least one sensor")
+        if rate_hz <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate_hz = rate_hz
+        self.period_ns = int(1e9 / rate_hz)
+        if max_lateness_sec is None:
+            self.max_lateness_ns = self.period_ns // 2
+        else:
+            self.max_lateness_ns = int(max_lateness_sec * 1e9)
+        self.timeout = timeout
+        self.spin_ns = int(spin_sec * 1e9)
+
+        self._sensors = []
+        for (index, (name, lpb)) in enumerate(sensors.items()):
+            fraction = index / len(sensors) if phases is None else phases.get(name, 0.0)
+            if not 0.0 <= fraction < 1.0:
+                raise ValueError(f"Phase of {name} must be in [0, 1), got {fraction}")
+            self._sensors.append(_SensorSlots(name, lpb, int(fraction * self.period_ns)))
+
+        self.epoch_ns = None
+        self._stop_event = threading.Event()
+        self.log = logging.getLogger(name=__class__.__name__)
+
+    # ---------- Running ----------
+    def stop(self) -> None:
+        """Make a running readings() loop return after its current slot."""
+        self._stop_event.set()
+
+    def readings(self, duration_sec: Optional[float] = None, count: Optional[int] = None):
+        """Yield a ScheduledReading per slot run, across all sensors in deadline order.
+
+        Runs until duration_sec has passed, count readings were yielded, or stop().
+        Time the caller spends between readings counts against the next deadline.
+        """
+        self._stop_event.clear()
+        sensors = self._sensors
+        period_ns = self.period_ns
+        now_ns = time.perf_counter_ns()
+        # First slots start one period out, so setup doesn't make slot 0 late
+        self.epoch_ns = now_ns + period_ns
+        end_ns = None if duration_sec is None else now_ns + int(duration_sec * 1e9)
+        for sensor in sensors:
+            sensor.next_slot = 0
+            sensor.next_deadline_ns = self.epoch_ns + sensor.phase_ns
+
+        yielded = 0
+        while not self._stop_event.is_set() and (count is None or yielded < count):
+            sensor = min(sensors, key=_next_deadline)
+            deadline_ns = sensor.next_deadline_ns
+            if end_ns is not None and deadline_ns >= end_ns:
+                return
+
+            now_ns = self._wait_until(deadline_ns)
+            lateness_ns = now_ns - deadline_ns
+            if lateness_ns > self.max_lateness_ns:
+                self._skip_missed(sensor, now_ns)
+                continue
+
+            reading = self._measure(sensor, deadline_ns, lateness_ns)
+            self._advance(sensor, sensor.next_slot + 1)
+            yielded += 1
+            yield reading
+
+    def run(self, callback, duration_sec: Optional[float] = None, count: Optional[int] = None) -> None:
+        """Call callback(reading) for each slot - see readings()."""
+        for reading in self.readings(duration_sec, count):
+            callback(reading)
+
+    def _wait_until(self, deadline_ns: int) -> int:
+        remaining_ns = deadline_ns - time.perf_counter_ns() - self.spin_ns
+        if remaining_ns > 0:
+            time.sleep(remaining_ns / 1e9)
+        now_ns = time.perf_counter_ns()
+        while now_ns < deadline_ns:
+            now_ns = time.perf_counter_ns()
+        return now_ns
+
+    def _measure(self, sensor: _SensorSlots, deadline_ns: int, lateness_ns: int) -> ScheduledReading:
+        sensor.slots_run += 1
+        sensor.lateness.observe(lateness_ns)
+        if lateness_ns > sensor.max_lateness_ns:
+            sensor.max_lateness_ns = lateness_ns
+        try:
+            measurement = sensor.lpb.get_measurement(self.timeout)
+            return ScheduledReading(sensor.name, sensor.next_slot, deadline_ns, lateness_ns, measurement)
+        except (TimeoutError, ValueError, serial.SerialException) as e:
+            sensor.failures += 1
+            self.log.warning(f"Sensor {sensor.name} failed slot {sensor.next_slot}: {e}")
+            # A late reply would otherwise be taken as the next slot's answer
+            sensor.lpb._discard_input()
+            return ScheduledReading(sensor.name, sensor.next_slot, deadline_ns, lateness_ns, None, e)
+
+    def _skip_missed(self, sensor: _SensorSlots, now_ns: int) -> None:
+        """Move a sensor on to its first slot that can still start on time."""
+        behind_ns = now_ns - sensor.next_deadline_ns - self.max_lateness_ns
+        next_slot = sensor.next_slot + max(1, math.ceil(behind_ns / self.period_ns))
+        sensor.slots_skipped += next_slot - sensor.next_slot
+        self._advance(sensor, next_slot)
+
+    def _advance(self, sensor: _SensorSlots, slot: int) -> None:
+        sensor.next_slot = slot
+        sensor.next_deadline_ns = self.epoch_ns + sensor.phase_ns + slot * self.period_ns
+
+    # ---------- Statistics ----------
+    def stats(self) -> dict:
+        """SlotStats per sensor name."""
+        return {
+            sensor.name: SlotStats(
+                sensor.slots_run, sensor.slots_skipped, sensor.failures,
+                sensor.max_lateness_ns / 1e3, sensor.lateness.snapshot(),
+            )
+            for sensor in self._sensors
+        }
+
+    def reset_stats(self) -> None:
+        for sensor in self._sensors:
+            sensor.reset()
+
+
+def _next_deadline(sensor: _SensorSlots) -> int:
+    return sensor.next_deadline_ns
@@ -0,0 +1,119 @@
+#
+#   LPB40B timestamped sample ring buffer (NumPy)
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Preallocated storage for (monotonic_ns, distance_mm, error_code) samples.
+#
+# The array is twice the capacity and every sample is written to both halves
+#  (slot i and slot i + capacity). That way the most recent `capacity` samples
+#  are always one contiguous run, so readers get plain NumPy views - no copy
+#  and no stitching when the ring wraps around.
+#
+
+
+import numpy as np
+
+
+SAMPLE_DTYPE = np.dtype([
+    ("timestamp_ns", np.int64),
+    ("distance_mm", np.uint32),
+    ("error_code", np.uint8),
+])
+
+
+class SampleBuffer:
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=SAMPLE_DTYPE)
+        self._head = 0          # next slot to write, 0 <= head < capacity
+        self.total_written = 0
+
+    def __len__(self):
+        return min(self.total_written, self.capacity)
+
+    # ---------- Writers ----------
+    def append(self, timestamp_ns: int, distance_mm: int, error_code: int = 0) -> None:
+        """Store one sample, overwriting the oldest once full."""
+        data = self._data
+        head = self._head
+        sample = (timestamp_ns, distance_mm, error_code)
+        data[head] = sample
+        data[head + self.capacity] = sample
+
+        head += 1
+        self._head = 0 if head == self.capacity else head
+        self.total_written += 1
+
+    def extend(self, timestamps_ns, distances_mm, error_codes=None) -> None:
+        """Store a batch of samples given as parallel arrays."""
+        timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+        distances_mm = np.asarray(distances_mm, dtype=np.uint32)
+        if error_codes is None:
+            error_codes = np.zeros(len(timestamps_ns), dtype=np.uint8)
+        else:
+            error_codes = np.asarray(error_codes, dtype=np.uint8)
+        count = len(timestamps_ns)
+        if not (len(distances_mm) == len(error_codes) == count):
+            raise ValueError("Sample arrays must all be the same length")
+
+        # Only the newest `capacity` samples can survive anyway
+        skip = max(0, count - self.capacity)
+        self.total_written += skip
+        self._head = (self._head + skip) % self.capacity
+
+        pos = skip
+        while pos < count:
+            head = self._head
+            run = min(count - pos, self.capacity - head)
+            for half in (head, head + self.capacity):
+                block = self._data[half:half + run]
+                block["timestamp_ns"] = timestamps_ns[pos:pos + run]
+                block["distance_mm"] = distances_mm[pos:pos + run]
+                block["error_code"] = error_codes[pos:pos + run]
+            pos += run
+            self.total_written += run
+            self._head = (head + run) % self.capacity
+
+    def clear(self) -> None:
+        self._head = 0
+        self.total_written = 0
+
+    # ---------- Zero-copy readers ----------
+    def latest(self, count=None) -> np.ndarray:
+        """View of the most recent `count` samples (all held if None), oldest first.
+
+        This is a view onto live storage - while a writer is still appending,
+        copy() it if a stable snapshot is needed.
+        """
+        held = len(self)
+        if count is None or count > held:
+            count = held
+        end = self._head + self.capacity
+        return self._data[end - count:end]
+
+    def window(self, start_ns: int, end_ns=None) -> np.ndarray:
+        """View of held samples with start_ns <= timestamp_ns < end_ns."""
+        samples = self.latest()
+        timestamps = samples["timestamp_ns"]
+        first = np.searchsorted(timestamps, start_ns, side="left")
+        if end_ns is None:
+            return samples[first:]
+        last = np.searchsorted(timestamps, end_ns, side="left")
+        return samples[first:last]
+
+    @property
+    def timestamps_ns(self) -> np.ndarray:
+        return self.latest()["timestamp_ns"]
+
+    @property
+    def distances_mm(self) -> np.ndarray:
+        return self.latest()["distance_mm"]
+
+    @property
+    def error_codes(self) -> np.ndarray:
+        return self.latest()["error_code"]
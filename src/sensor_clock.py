@@ -0,0 +1,246 @@
+#
+#   LPB40B sensor clock reconstruction
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# In continuous mode the sensor measures on its own clock at a fixed period,
+#  but USB serial adapters hand bytes over in bursts. A frame's host arrival
+#  time is when it was measured plus a delay - never less than the adapter's
+#  fixed latency, often a lot more, and many frames share one arrival.
+#
+# SensorClock recovers the sensor's timeline from arrival times. Sample n
+#  was measured at  offset + n * period  on the host clock. Delays only ever
+#  make frames late, so that line runs along the lower envelope of the
+#  arrivals:
+#
+#   - A sample that arrives earlier than the line predicts pulls the offset
+#     down to it at once.
+#   - Otherwise the offset creeps up by at most `leak` per sample, so the
+#     line follows slow drift but not burst delays.
+#   - The slope is a least squares fit of arrival against sample index,
+#     forgetting exponentially over about period_horizon_sec. It tracks
+#     the sensor's crystal error and drift. The envelope alone can't
+#     separate those from a slow sweep of the adapter's delay (a
+#     phase/frequency loop with a one sided phase detector).
+#
+# Lost frames show up as every later sample sitting whole periods above
+#  the line. A burst delay only lifts some samples, and lasts less than
+#  the lookahead. So each sample is held for `lookahead` samples. When it
+#  leaves, the lowest sample in the window (a monotonic deque, O(1)
+#  amortized) says how many periods the line has to skip. Those frames
+#  are flagged as lost before that sample. Inside one burst the host can't
+#  tell which frame went missing, so the flag lands on the earliest sample
+#  the timing allows.
+#
+# Everything is a few float operations per sample, about 5 us in CPython.
+#
+# Corrected timestamps are on the host's monotonic clock (the same clock as
+#  arrivals). They include the adapter's minimum latency, which can't be
+#  seen from the host side.
+#
+
+
+import math
+from collections import deque
+from typing import NamedTuple, Any
+
+
+class ClockedSample(NamedTuple):
+    item: Any               # whatever was pushed with the arrival time
+    timestamp_ns: int       # reconstructed measurement time, host monotonic clock
+    sample_index: int       # sensor sample number since the first one, counting lost frames
+    lost_before: int        # frames lost between the previous sample and this one
+    arrival_ns: int         # host arrival time as pushed
+
+
+class SensorClock:
+    DEFAULT_LOOKAHEAD_SEC = 0.1
+    DEFAULT_PERIOD_HORIZON_SEC = 60.0
+    # Upward drift of the line followed per sample once the period fit has
+    #  settled, as a fraction of the period
+    DEFAULT_LEAK_FRACTION = 1e-5
+    # Until the period fit is trusted - covers a sensor clock a couple of percent off nominal
+    ACQUIRE_LEAK_FRACTION = 2e-2
+    # Lookaheads worth of samples before the fitted period replaces the nominal one
+    FIT_MIN_LOOKAHEADS = 4
+    # Window minimum this far above the line (in periods) means frames were lost
+    GAP_THRESHOLD_PERIODS = 0.75
+
+    def __init__(self, measurement_frequency_hz: float, lookahead_sec: float = DEFAULT_LOOKAHEAD_SEC,
+                 period_horizon_sec: float = DEFAULT_PERIOD_HORIZON_SEC,
+                 leak_fraction: float = DEFAULT_LEAK_FRACTION):
+        """lookahead_sec must be longer than the worst burst delay the adapter adds.
+
+        The period is fitted over roughly the last period_horizon_sec of samples.
+        """
+        if measurement_frequency_hz <= 0:
+            raise ValueError("Measurement frequency must be positive")
+        self.nominal_period_ns = 1e9 / measurement_frequency_hz
+        self.lookahead = max(2, math.ceil(lookahead_sec * measurement_frequency_hz))
+        self.leak_fraction = leak_fraction
+        # Exponential forgetting factor of the period fit
+        self._decay = 1.0 - 1.0 / max(2.0, period_horizon_sec * measurement_frequency_hz)
+        self._fit_min_weight = self.FIT_MIN_LOOKAHEADS * self.lookahead
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the timeline - call when the stream restarts."""
+        self.period_ns = self.nominal_period_ns
+        self.offset_ns = None           # line: measured_ns = offset_ns + index * period_ns
+        self._leak_ns = self.ACQUIRE_LEAK_FRACTION * self.period_ns
+        self._pending = deque()         # (item, arrival_ns, arrival_count) held for the lookahead
+        self._window_min = deque()      # (arrival_count, arrival_ns) with rising intercepts
+        self._arrivals = 0
+        self._lost_total = 0            # sample index = arrival count + frames lost before it
+
+        # Weighted least squares of arrival vs index. x is the index relative to
+        #  _fit_origin, y the arrival relative to the nominal line from the first one.
+        self._first_arrival_ns = None
+        self._fit_origin = 0
+        self._sum_w = self._sum_x = self._sum_y = self._sum_xx = self._sum_xy = 0.0
+
+        self.samples = 0
+        self.frames_lost = 0
+        self.gaps = 0
+
+    # ---------- Feeding ----------
+    def push(self, arrival_ns: int, item=None):
+        """Add the next sample's arrival time. Returns the ClockedSample leaving the lookahead, or None."""
+        count = self._arrivals
+        self._arrivals = count + 1
+        self._pending.append((item, arrival_ns, count))
+
+        # Sliding window minimum of the line offset each sample implies
+        #  (arrival - index * period). Only differences matter for the ordering.
+        period_ns = self.period_ns
+        window_min = self._window_min
+        while window_min and (window_min[-1][1] - arrival_ns) >= (window_min[-1][0] - count) * period_ns:
+            window_min.pop()
+        window_min.append((count, arrival_ns))
+
+        if self.offset_ns is None:
+            self.offset_ns = float(arrival_ns)
+            self._first_arrival_ns = arrival_ns
+        if len(self._pending) > self.lookahead:
+            return self._emit()
+        return None
+
+    def flush(self) -> list:
+        """ClockedSamples still held in the lookahead, e.g. when the stream stops.
+
+        Gaps are only flagged while half a lookahead of samples is still
+        held. Past that, no later samples show whether the tail was delayed
+        or frames were lost, and a late final burst isn't a loss.
+        """
+        samples = []
+        min_window = self.lookahead // 2
+        while self._pending:
+            samples.append(self._emit(detect_gaps=len(self._pending) > min_window))
+        return samples
+
+    # ---------- Line tracking ----------
+    def _emit(self, detect_gaps=True) -> ClockedSample:
+        (item, arrival_ns, count) = self._pending.popleft()
+        period_ns = self.period_ns
+
+        # Lowest implied offset over this sample and the lookahead after it
+        (low_count, low_arrival_ns) = self._window_min[0]
+        low_ns = low_arrival_ns - (low_count + self._lost_total) * period_ns
+
+        # Whole periods above the line for the entire window - frames went missing
+        lost = 0
+        if detect_gaps and low_ns - self.offset_ns > self.GAP_THRESHOLD_PERIODS * period_ns:
+            lost = round((low_ns - self.offset_ns) / period_ns)
+            self._lost_total += lost
+            self.frames_lost += lost
+            self.gaps += 1
+            low_ns -= lost * period_ns
+
+        # Lower envelope: drop to an early sample at once, rise slowly
+        if low_ns < self.offset_ns:
+            self.offset_ns = low_ns
+        else:
+            self.offset_ns += min(low_ns - self.offset_ns, self._leak_ns)
+
+        if low_count == count:
+            self._window_min.popleft()
+
+        index = count + self._lost_total
+        timestamp_ns = int(self.offset_ns + index * period_ns)
+        self._fit_period(index, arrival_ns)
+        self.samples += 1
+        return ClockedSample(item, timestamp_ns, index, lost, arrival_ns)
+
+    def _fit_period(self, index: int, arrival_ns: int) -> None:
+        """Fold a sample into the period fit and move the line onto the fitted slope.
+
+        The envelope only sees the earliest arrivals, and its slope can lock
+        onto a slow sweep of the adapter's delay. The fit uses every arrival,
+        so over a long horizon the delays average out of the slope.
+        """
+        decay = self._decay
+        x = index - self._fit_origin
+        y = arrival_ns - self._first_arrival_ns - index * self.nominal_period_ns
+        self._sum_w = self._sum_w * decay + 1.0
+        self._sum_x = self._sum_x * decay + x
+        self._sum_y = self._sum_y * decay + y
+        self._sum_xx = self._sum_xx * decay + x * x
+        self._sum_xy = self._sum_xy * decay + x * y
+
+        # Keep x small so the sums don't lose precision on long runs
+        if x > 4 * self.lookahead:
+            self._shift_fit_origin(index)
+        if self._sum_w < self._fit_min_weight:
+            return
+
+        denominator = self._sum_w * self._sum_xx - self._sum_x * self._sum_x
+        if denominator <= 0:
+            return
+        slope = (self._sum_w * self._sum_xy - self._sum_x * self._sum_y) / denominator
+        period_ns = self.nominal_period_ns + slope
+        # Same point on the line, new slope
+        self.offset_ns += index * (self.period_ns - period_ns)
+        self.period_ns = period_ns
+        # The fit's slope error shrinks as samples ** -1.5 - the leak only has to cover that
+        uncertainty = self.ACQUIRE_LEAK_FRACTION * (self._fit_min_weight / self._sum_w) ** 1.5
+        self._leak_ns = max(self.leak_fraction, uncertainty) * period_ns
+
+    def _shift_fit_origin(self, origin: int) -> None:
+        delta = origin - self._fit_origin
+        self._sum_xx += delta * (delta * self._sum_w - 2.0 * self._sum_x)
+        self._sum_xy -= delta * self._sum_y
+        self._sum_x -= delta * self._sum_w
+        self._fit_origin = origin
+
+
+class ClockCorrectedBuffer:
+    """Sample buffer stand-in that re-times samples through a SensorClock.
+
+    Hand it to LPB40B.start_streaming(sample_buffer=...) in place of the
+    target buffer. Samples reach the target with reconstructed timestamps,
+    one lookahead behind. Call flush() after the stream stops for the rest.
+    """
+    MAX_GAPS_KEPT = 1024
+
+    def __init__(self, target, clock: SensorClock):
+        self.target = target
+        self.clock = clock
+        # (sample_index, frames lost just before it), most recent last
+        self.gaps = deque(maxlen=self.MAX_GAPS_KEPT)
+
+    def append(self, timestamp_ns: int, distance_mm: int, error_code: int = 0) -> None:
+        sample = self.clock.push(timestamp_ns, (distance_mm, error_code))
+        if sample is not None:
+            self._forward(sample)
+
+    def flush(self) -> None:
+        for sample in self.clock.flush():
+            self._forward(sample)
+
+    def _forward(self, sample: ClockedSample) -> None:
+        if sample.lost_before:
+            self.gaps.append((sample.sample_index, sample.lost_before))
+        (distance_mm, error_code) = sample.item
+        self.target.append(sample.timestamp_ns, distance_mm, error_code)
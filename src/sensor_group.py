@@ -0,0 +1,145 @@
+#
+#   Poll many LPB40B sensors together
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Each cycle writes the start measurement frame to every sensor back to back,
+#  then waits on all of the replies at once with a small thread pool (serial
+#  reads release the GIL). Cycle time tracks the slowest sensor instead of
+#  the sum of every round trip.
+#
+# The group holds every sensor's io_lock for the cycle, so other threads'
+#  round trips on those drivers wait their turn. A sensor that fails to
+#  write or answer is reported in that cycle's readings, the others carry on.
+#
+
+
+import time
+import logging
+from contextlib import ExitStack
+from typing import NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+from .lpb40b import LPB40B
+from .measurement import error_code_from_byte
+
+
+class SensorReading(NamedTuple):
+    name: str
+    timestamp_ns: int                  # host monotonic_ns when the reply was parsed
+    distance_mm: Optional[int]         # None if the sensor failed this cycle
+    error_code: Optional[int]         # ErrorCode (or raw int if undocumented)
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class GroupCycle(NamedTuple):
+    cycle: int
+    start_ns: int                      # host monotonic_ns before the first request
+    end_ns: int                        # host monotonic_ns once every sensor answered or failed
+    readings: tuple                    # SensorReading per sensor, in group order
+
+    @property
+    def failures(self) -> tuple:
+        return tuple(reading for reading in self.readings if not reading.ok)
+
+
+class SensorGroup:
+    def __init__(self, sensors: dict, timeout: float = 1.0):
+        """sensors maps a name to an LPB40B instance."""
+        if not sensors:
+            raise ValueError("SensorGroup needs at least one sensor")
+        self.sensors = dict(sensors)
+        self.timeout = timeout
+        self.cycle_count = 0
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=len(self.sensors), thread_name_prefix="LPB40B-group"
+        )
+        self.log = logging.getLogger(name=__class__.__name__)
+
+    @classmethod
+    def open(cls, ports: dict, baudrate: int = 115200, timeout: float = 1.0) -> "SensorGroup":
+        """Open a serial port per sensor. ports maps a name to a device path."""
+        sensors = {}
+        try:
+            for (name, port) in ports.items():
+                sensors[name] = LPB40B(serial.Serial(port, baudrate=baudrate, timeout=timeout))
+        except Exception:
+            for lpb in sensors.values():
+                lpb.ser.close()
+            raise
+        return cls(sensors, timeout=timeout)
+
+    def begin(self):
+        for lpb in self.sensors.values():
+            lpb.begin()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        for lpb in self.sensors.values():
+            lpb.ser.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---------- Polling ----------
+    def poll(self) -> GroupCycle:
+        """Run one measurement cycle across every sensor."""
+        streaming = [name for (name, lpb) in self.sensors.items() if lpb.stream is not None]
+        if streaming:
+            raise RuntimeError(f"Stop streaming before polling the group: {', '.join(streaming)}")
+        with ExitStack() as locks:
+            # Always taken in group order, so two groups sharing sensors can't deadlock
+            for lpb in self.sensors.values():
+                locks.enter_context(lpb.io_lock)
+
+            start_ns = time.monotonic_ns()
+            results = {}
+            for (name, lpb) in self.sensors.items():
+                try:
+                    lpb._send_frame(LPB40B.FRAME_START_MEASUREMENT)
+                except (serial.SerialException, OSError) as e:
+                    results[name] = self._failed(name, lpb, e)
+                    continue
+                results[name] = self._pool.submit(self._collect, name, lpb)
+
+            readings = tuple(
+                result if isinstance(result, SensorReading) else result.result()
+                for result in results.values()
+            )
+            end_ns = time.monotonic_ns()
+
+        cycle = GroupCycle(self.cycle_count, start_ns, end_ns, readings)
+        self.cycle_count += 1
+        return cycle
+
+    def _collect(self, name: str, lpb: LPB40B) -> SensorReading:
+        try:
+            frame = lpb._read_frame(self.timeout, expected_cmd=LPB40B.CMD_MEASUREMENT_DATA)
+            timestamp_ns = time.monotonic_ns()
+            return SensorReading(
+                name, timestamp_ns, LPB40B.decode_measurement_frame(frame),
+                error_code_from_byte(frame[2]),
+            )
+        except (TimeoutError, ValueError, serial.SerialException, OSError) as e:
+            return self._failed(name, lpb, e)
+
+    def _failed(self, name: str, lpb: LPB40B, exc: Exception) -> SensorReading:
+        self.log.warning(f"Sensor {name} failed measurement: {exc}")
+        try:
+            # A late reply would otherwise be taken as next cycle's answer
+            lpb._discard_input()
+        except (serial.SerialException, OSError):
+            pass
+        return SensorReading(name, time.monotonic_ns(), None, None, exc)
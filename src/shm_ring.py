@@ -0,0 +1,273 @@
+#
+#   LPB40B shared memory sample ring
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# One process owns the serial port and publishes samples into a
+#  multiprocessing.shared_memory block. Any number of local processes
+#  attach and read them without locks, pipes or pickling.
+#
+# Layout (native byte order, 8 byte aligned):
+#
+#   header  32 bytes: magic "LPBSHM01" | u32 version | u32 capacity
+#                     | u64 write count | i64 publisher pid
+#   slots   capacity x 24 bytes: u64 seq | i64 timestamp_ns | u32 distance_mm
+#                                | u8 error_code | 3 pad
+#
+# Each slot is a seqlock. Sample n goes in slot n % capacity. The writer
+#  sets seq to 2n + 1 (odd = being written), fills the fields, sets seq to
+#  2n + 2 and then bumps the write count. A reader copies a batch of slots,
+#  reads their seqs again afterwards, and keeps only those whose seq was
+#  exactly 2n + 2 both times for the sample it wanted. A slot the writer
+#  lapped or was writing during the copy fails that check and is counted
+#  as an overrun. There's one writer and no memory barriers - plain
+#  aligned stores. That relies on x86 (TSO) keeping stores and loads in
+#  program order. ARM64 keeps the 8 byte stores whole but may reorder
+#  them, so a reader there can accept a torn sample - not supported.
+#
+# Run a publisher with:  python -m src.shm_ring --port /dev/ttyUSB0 --name lpb40b
+#
+
+
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import threading
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+import serial
+
+from .lpb40b import LPB40B
+from .sample_buffer import SAMPLE_DTYPE
+
+
+SHM_MAGIC = b"LPBSHM01"
+SHM_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", np.uint32),
+    ("capacity", np.uint32),
+    ("write_count", np.uint64),
+    ("publisher_pid", np.int64),
+], align=True)
+
+SLOT_DTYPE = np.dtype([
+    ("seq", np.uint64),
+    ("timestamp_ns", np.int64),
+    ("distance_mm", np.uint32),
+    ("error_code", np.uint8),
+], align=True)
+
+
+def _views(buf, capacity: int) -> tuple:
+    header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=buf)
+    slots = np.ndarray((capacity,), dtype=SLOT_DTYPE, buffer=buf, offset=HEADER_DTYPE.itemsize)
+    return (header, slots)
+
+
+class ShmPublisher:
+    """Single writer side of the ring.
+
+    append() has the same signature as SampleBuffer.append(), so a publisher
+    can be handed to LPB40B.start_streaming(sample_buffer=...) directly.
+    """
+    DEFAULT_CAPACITY = 65536
+
+    def __init__(self, name=None, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        size = HEADER_DTYPE.itemsize + capacity * SLOT_DTYPE.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+
+        (self._header, self._slots) = _views(self.shm.buf, capacity)
+        self._slots[:] = 0
+        header = self._header[0]
+        header["magic"] = SHM_MAGIC
+        header["version"] = SHM_VERSION
+        header["capacity"] = capacity
+        header["write_count"] = 0
+        header["publisher_pid"] = os.getpid()
+
+        # Field views - writes go straight to shared memory
+        self._write_count = self._header["write_count"]
+        self._seq = self._slots["seq"]
+        self._timestamps = self._slots["timestamp_ns"]
+        self._distances = self._slots["distance_mm"]
+        self._error_codes = self._slots["error_code"]
+        self.total_written = 0
+
+    def append(self, timestamp_ns: int, distance_mm: int, error_code: int = 0) -> None:
+        index = self.total_written
+        slot = index % self.capacity
+        self._seq[slot] = 2 * index + 1
+        self._timestamps[slot] = timestamp_ns
+        self._distances[slot] = distance_mm
+        self._error_codes[slot] = error_code
+        self._seq[slot] = 2 * index + 2
+        self.total_written = index + 1
+        self._write_count[0] = index + 1
+
+    def close(self, unlink: bool = True) -> None:
+        # Views onto the block must go before it can close
+        self._header = self._slots = None
+        self._write_count = self._seq = self._timestamps = self._distances = self._error_codes = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ShmSubscriber:
+    """Lock-free reader of a ShmPublisher ring, from any local process."""
+
+    def __init__(self, name: str, from_oldest: bool = False):
+        """Attach to a ring. Reads start at the next sample written, or at the
+        oldest one still held if from_oldest."""
+        self.shm = shared_memory.SharedMemory(name=name, create=False)
+        # Before 3.13 attaching registers the block too, and the tracker would
+        #  unlink it when this process exits - the publisher owns it
+        if sys.version_info < (3, 13):
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=self.shm.buf)[0]
+        if header["magic"] != SHM_MAGIC or header["version"] != SHM_VERSION:
+            self.shm.close()
+            raise ValueError(f"Not a version {SHM_VERSION} LPB40B shared memory ring: {name}")
+        self.capacity = int(header["capacity"])
+        self.publisher_pid = int(header["publisher_pid"])
+        del header
+        (self._header, self._slots) = _views(self.shm.buf, self.capacity)
+        self._write_count = self._header["write_count"]
+
+        write_count = self.write_count
+        self.next_index = max(0, write_count - self.capacity) if from_oldest else write_count
+        self.overruns = 0
+
+    @property
+    def write_count(self) -> int:
+        return int(self._write_count[0])
+
+    @property
+    def available(self) -> int:
+        return self.write_count - self.next_index
+
+    def read(self, max_count=None) -> np.ndarray:
+        """Every new sample since the last read (up to max_count) as a SAMPLE_DTYPE array.
+
+        Samples the writer lapped before they could be read are skipped and
+        added to self.overruns.
+        """
+        write_count = self.write_count
+        oldest = write_count - self.capacity
+        if self.next_index < oldest:
+            self.overruns += oldest - self.next_index
+            self.next_index = oldest
+        count = write_count - self.next_index
+        if max_count is not None:
+            count = min(count, max_count)
+        if count <= 0:
+            return np.zeros(0, dtype=SAMPLE_DTYPE)
+
+        indices = np.arange(self.next_index, self.next_index + count, dtype=np.uint64)
+        slots = indices % np.uint64(self.capacity)
+        expected_seq = 2 * indices + 2
+        copied = self._slots[slots]
+        # Second look at seq catches slots rewritten while they were being copied
+        complete = (copied["seq"] == expected_seq) & (self._slots["seq"][slots] == expected_seq)
+        self.next_index += count
+
+        if not complete.all():
+            self.overruns += int(count - complete.sum())
+            copied = copied[complete]
+        samples = np.empty(len(copied), dtype=SAMPLE_DTYPE)
+        for field in SAMPLE_DTYPE.names:
+            samples[field] = copied[field]
+        return samples
+
+    def latest(self):
+        """Most recent sample as (timestamp_ns, distance_mm, error_code), or None if none yet."""
+        while True:
+            write_count = self.write_count
+            if write_count == 0:
+                return None
+            index = write_count - 1
+            slot = self._slots[index % self.capacity]
+            seq_before = int(slot["seq"])
+            values = (int(slot["timestamp_ns"]), int(slot["distance_mm"]), int(slot["error_code"]))
+            # Torn or already lapped - try again with the newer sample
+            if seq_before == int(slot["seq"]) == 2 * index + 2:
+                return values
+
+    def wait(self, timeout=None, poll_sec: float = 0.0005) -> bool:
+        """Sleep until a new sample is available. False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.write_count <= self.next_index:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_sec)
+        return True
+
+    def close(self) -> None:
+        self._header = self._slots = self._write_count = None
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def publish(lpb, name=None, capacity: int = ShmPublisher.DEFAULT_CAPACITY, stop_event=None) -> None:
+    """Stream from an LPB40B into a shared memory ring until stop_event is set."""
+    log = logging.getLogger(name="ShmPublisher")
+    if stop_event is None:
+        stop_event = threading.Event()
+    with ShmPublisher(name, capacity) as publisher:
+        log.info(f"Publishing to shared memory {publisher.name}")
+        lpb.start_streaming(buffer_size=0, sample_buffer=publisher)
+        try:
+            stop_event.wait()
+        finally:
+            lpb.stop_streaming()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Publish LPB40B measurements to shared memory")
+    parser.add_argument("--port", required=True)
+    parser.add_argument("--name", default="lpb40b", help="shared memory block name")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--capacity", type=int, default=ShmPublisher.DEFAULT_CAPACITY)
+    parser.add_argument("--measurement-frequency-hz", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+
+    with serial.Serial(args.port, baudrate=args.baudrate, timeout=1.0) as ser:
+        lpb = LPB40B(ser)
+        lpb.begin()
+        if args.measurement_frequency_hz:
+            lpb.set_measurement_frequency(args.measurement_frequency_hz)
+        publish(lpb, args.name, args.capacity, stop_event)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#
+#   LPB40B sample output sinks
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Sinks write (timestamp_ns, distance_mm, error_code) samples to a file or
+#  stdout. Samples are collected into a MeasurementBatch and formatted and
+#  written a whole batch at a time through a large buffer, so the stream
+#  thread doesn't make a write call per sample.
+#
+# append() has the SampleBuffer signature, so a sink can be handed straight
+#  to LPB40B.start_streaming(sample_buffer=...).
+#
+# Formats:
+#   csv     header line, then timestamp_ns,distance_mm,error_code
+#   ndjson  one {"timestamp_ns": ..., "distance_mm": ..., "error_code": ...} per line
+#   binary  packed little endian i64 timestamp_ns | u32 distance_mm | u8 error_code,
+#           13 bytes per sample - numpy.fromfile(path, dtype=SAMPLE_DTYPE) reads it
+#
+
+
+import sys
+import struct
+import logging
+import threading
+from abc import ABC, abstractmethod
+
+from .measurement import MeasurementBatch
+
+
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_FILE_BUFFER_BYTES = 1 << 20
+BINARY_SAMPLE_STRUCT = struct.Struct("<qIB")
+
+
+class SampleSink(ABC):
+    """Base sink - subclasses implement _format() for one batch."""
+    binary = False
+
+    def __init__(self, path="-", batch_size: int = DEFAULT_BATCH_SIZE, max_samples=None,
+                 buffer_bytes: int = DEFAULT_FILE_BUFFER_BYTES):
+        """Write to path, or stdout for "-". Stops taking samples after max_samples if set."""
+        self.path = path
+        self.batch_size = batch_size
+        self.max_samples = max_samples
+
+        if path == "-":
+            self._file = sys.stdout.buffer if self.binary else sys.stdout
+            self._owns_file = False
+        else:
+            if self.binary:
+                self._file = open(path, "wb", buffering=buffer_bytes)
+            else:
+                self._file = open(path, "w", buffering=buffer_bytes, encoding="ascii", newline="")
+            self._owns_file = True
+
+        self._lock = threading.Lock()
+        self._batch = MeasurementBatch.empty()
+        # Set once max_samples are in, or when writing fails
+        self.done = threading.Event()
+        self.error = None
+
+        self.samples_written = 0
+        self.first_timestamp_ns = None
+        self.last_timestamp_ns = None
+
+        self.log = logging.getLogger(name=__class__.__name__)
+        self._write(self._header())
+
+    @property
+    def sample_count(self) -> int:
+        """Samples taken so far, written or still batched."""
+        return self.samples_written + len(self._batch.timestamps_ns)
+
+    # ---------- Writers ----------
+    def append(self, timestamp_ns: int, distance_mm: int, error_code: int = 0) -> None:
+        if self.done.is_set():
+            return
+        with self._lock:
+            if self.first_timestamp_ns is None:
+                self.first_timestamp_ns = timestamp_ns
+            self.last_timestamp_ns = timestamp_ns
+            self._batch.append(timestamp_ns, distance_mm, error_code)
+            count = self.sample_count
+            if len(self._batch.timestamps_ns) >= self.batch_size:
+                self._flush_batch()
+        if self.max_samples is not None and count >= self.max_samples:
+            self.done.set()
+
+    def write_batch(self, batch: MeasurementBatch) -> None:
+        """Add a whole MeasurementBatch, e.g. from LPB40B.get_measurements()."""
+        for sample in zip(*batch):
+            self.append(*sample)
+            if self.done.is_set():
+                return
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_batch()
+        if self.error is None:
+            try:
+                self._file.flush()
+            except OSError as e:
+                self._failed(e)
+
+    def close(self) -> None:
+        self.flush()
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---------- Formatting ----------
+    def _header(self):
+        return b"" if self.binary else ""
+
+    @abstractmethod
+    def _format(self, batch: MeasurementBatch):
+        ...
+
+    def _flush_batch(self) -> None:
+        batch = self._batch
+        count = len(batch.timestamps_ns)
+        if count == 0:
+            return
+        self._batch = MeasurementBatch.empty()
+        if self._write(self._format(batch)):
+            self.samples_written += count
+
+    def _write(self, data) -> bool:
+        if self.error is not None or not data:
+            return False
+        try:
+            self._file.write(data)
+        except OSError as e:
+            # e.g. a closed pipe - stop taking samples rather than kill the stream thread
+            self._failed(e)
+            return False
+        return True
+
+    def _failed(self, exc: Exception) -> None:
+        self.error = exc
+        self.done.set()
+        self.log.error(f"Writing to {self.path} failed: {exc}")
+
+
+class CsvSink(SampleSink):
+    def _header(self):
+        return "timestamp_ns,distance_mm,error_code\n"
+
+    def _format(self, batch: MeasurementBatch):
+        return "".join([f"{ts},{dist},{err}\n" for (ts, dist, err) in zip(*batch)])
+
+
+class NdjsonSink(SampleSink):
+    def _format(self, batch: MeasurementBatch):
+        return "".join([
+            f'{{"timestamp_ns": {ts}, "distance_mm": {dist}, "error_code": {err}}}\n'
+            for (ts, dist, err) in zip(*batch)
+        ])
+
+
+class BinarySink(SampleSink):
+    binary = True
+
+    def _format(self, batch: MeasurementBatch):
+        return b"".join(map(BINARY_SAMPLE_STRUCT.pack, *batch))
+
+
+SINKS = {
+    "csv": CsvSink,
+    "ndjson": NdjsonSink,
+    "binary": BinarySink,
+}
+
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".bin": "binary",
+}
+
+
+def format_for_path(path, default: str = "csv") -> str:
+    """Sink format implied by a file extension."""
+    for (extension, sink_format) in _EXTENSIONS.items():
+        if str(path).lower().endswith(extension):
+            return sink_format
+    return default
+
+
+def open_sink(path="-", sink_format=None, **kwargs) -> SampleSink:
+    """Sink for path ("-" is stdout) in sink_format, or the one its extension implies."""
+    if sink_format is None:
+        sink_format = format_for_path(path)
+    if sink_format not in SINKS:
+        raise ValueError(f"Unknown output format {sink_format!r}, expected one of {', '.join(SINKS)}")
+    return SINKS[sink_format](path, **kwargs)
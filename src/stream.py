@@ -0,0 +1,199 @@
+#
+#   LPB40B continuous measurement stream
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Background reader thread that decodes measurement data frames (0x07)
+#  coming off a device in continuous mode into a bounded ring buffer. Any
+#  other frame is a reply to a query and goes to the driver's dispatcher.
+#
+# With buffer_size=0 the stream is sink-only: frames are decoded straight
+#  into the sample_buffer and no Measurement records are built or queued.
+#
+# If reading fails (e.g. the device was unplugged) the reader stops and
+#  keeps the exception. get(), iteration and stop() raise it, so consumers
+#  don't block on a stream that will never deliver again.
+#
+
+
+import time
+import logging
+import threading
+from collections import deque
+
+from .measurement import Measurement
+
+
+class MeasurementStream:
+    DEFAULT_BUFFER_SIZE = 1024
+    DEFAULT_READ_TIMEOUT = 0.1
+
+    def __init__(self, lpb, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT, sample_buffer=None, filters=None):
+        if buffer_size < 0:
+            raise ValueError("Buffer size can't be negative")
+        # Sink-only - nothing is queued, so there is nothing to filter either
+        self.sink_only = buffer_size == 0
+        if self.sink_only and (sample_buffer is None or filters is not None):
+            raise ValueError("A sink-only stream (buffer_size=0) needs a sample_buffer and no filters")
+        self.lpb = lpb
+        self.read_timeout = read_timeout
+
+        # Optional SampleBuffer also filled by the reader (array backed, for bulk readers)
+        self.sample_buffer = sample_buffer
+
+        # Optional RangeFilter (or FilterChain) run on every valid measurement.
+        #  Invalid ones skip it so error frames' zero distances don't pollute its state.
+        self.filters = filters
+
+        # Ring buffer of Measurement records - oldest entries fall off
+        self._buffer = deque(maxlen=buffer_size)
+        self._ready = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # Exception that stopped the reader, if one did
+        self.error = None
+
+        self.frames_received = 0
+        self.frames_overwritten = 0
+
+        self.log = logging.getLogger(name=__class__.__name__)
+
+    # ---------- Lifecycle ----------
+    def start(self):
+        if self._thread is not None:
+            raise RuntimeError("Stream reader already running")
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="LPB40B-stream", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        """Stop the reader. Raises the exception that killed it, if one did."""
+        self._stop_event.set()
+        with self._ready:
+            self._ready.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._stop_event.is_set()
+
+    # ---------- Consumer interface ----------
+    def latest(self):
+        """Most recent Measurement, or None if empty."""
+        with self._ready:
+            if not self._buffer:
+                return None
+            return self._buffer[-1]
+
+    def drain(self) -> list:
+        """Remove and return every buffered entry, oldest first."""
+        with self._ready:
+            entries = list(self._buffer)
+            self._buffer.clear()
+        return entries
+
+    def get(self, timeout=None):
+        """Pop the oldest entry, blocking until one arrives or the stream stops.
+
+        Returns None once stopped and empty, or raises the reader's error if it failed.
+        """
+        if self.sink_only:
+            raise RuntimeError("Sink-only stream - read the sample_buffer instead")
+        with self._ready:
+            if not self._ready.wait_for(
+                lambda: self._buffer or self._stop_event.is_set(), timeout
+            ):
+                raise TimeoutError("No measurement received from stream")
+            if not self._buffer:
+                if self.error is not None:
+                    raise self.error
+                return None
+            return self._buffer.popleft()
+
+    def __iter__(self):
+        """Blocking iterator over measurements until the stream is stopped."""
+        while True:
+            entry = self.get()
+            if entry is None:
+                return
+            yield entry
+
+    def __len__(self):
+        with self._ready:
+            return len(self._buffer)
+
+    # ---------- Reader thread ----------
+    def _run(self):
+        try:
+            if self.sink_only:
+                self._sink_loop()
+            else:
+                self._read_loop()
+        except Exception as e:
+            self.log.error(f"Stream reader failed: {e!r}")
+            self.error = e
+            self.lpb.dispatcher.fail_all(e)
+            self._stop_event.set()
+            with self._ready:
+                self._ready.notify_all()
+
+    def _read_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                frame = self.lpb._read_frame(timeout=self.read_timeout, count_timeout=False)
+            except TimeoutError:
+                continue
+
+            if frame[1] != self.lpb.CMD_MEASUREMENT_DATA:
+                # A reply to a query made while streaming
+                if not self.lpb.dispatcher.dispatch(frame):
+                    self.lpb.skipped_frames += 1
+                continue
+
+            entry = Measurement.from_frame(frame, time.monotonic_ns())
+            if self.filters is not None and entry.valid:
+                entry.filtered_mm = self.filters.update(entry.distance_mm)
+            if self.sample_buffer is not None:
+                self.sample_buffer.append(entry.timestamp_ns, entry.distance_mm, entry.error_code)
+            with self._ready:
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.frames_overwritten += 1
+                self._buffer.append(entry)
+                self.frames_received += 1
+                self._ready.notify()
+
+    def _sink_loop(self):
+        lpb = self.lpb
+        parser = lpb.parser
+        sample_buffer = self.sample_buffer
+        cmd_measurement_data = lpb.CMD_MEASUREMENT_DATA
+        while not self._stop_event.is_set():
+            try:
+                offset = lpb._read_frame_offset(self.read_timeout, count_timeout=False)
+            except TimeoutError:
+                continue
+
+            buf = parser.buffer
+            if buf[offset + 1] != cmd_measurement_data:
+                frame = bytes(buf[offset:offset + parser.FRAME_LENGTH])
+                parser.consume_frame()
+                if not lpb.dispatcher.dispatch(frame):
+                    lpb.skipped_frames += 1
+                continue
+
+            sample_buffer.append(
+                time.monotonic_ns(),
+                (buf[offset + 3] << 16) | (buf[offset + 4] << 8) | buf[offset + 5],
+                buf[offset + 2],
+            )
+            parser.consume_frame()
+            self.frames_received += 1
@@ -0,0 +1,336 @@
+#
+#   LPB40B measurement fan-out server
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# One process owns the serial port and streams measurements out over TCP to
+#  any number of subscribers (dashboards, recorders). The driver's stream
+#  thread appends samples to the server, and once per tick the asyncio loop
+#  packs what arrived into binary packets and writes them to every client.
+#
+# Packet (little endian):
+#
+#   header  24 bytes: magic "LB" | u8 version | u8 flags (0) | u16 sample count
+#                     | u16 decimation | u64 first sample index | i64 base timestamp_ns
+#   samples count x 9 bytes: u32 ns after base | u32 distance_mm | u8 error_code
+#
+# Sample indexes count every measurement the server published. A client
+#  with decimation N only gets samples whose index is a multiple of N, so it
+#  can spot lost packets from a jump in first sample index. Clients with the
+#  same decimation share the same packet bytes.
+#
+# Clients pick their decimation by sending a line "DECIMATE <n>\n" at any
+#  time (default 1). A client that doesn't keep up is never waited on: once
+#  more than max_buffered_bytes are queued for it, its packets are dropped
+#  until it catches up.
+#
+# Run with:  python -m src.stream_server --port /dev/ttyUSB0 --listen-port 4040
+#
+
+
+import sys
+import struct
+import asyncio
+import logging
+import argparse
+import threading
+from typing import NamedTuple
+
+import numpy as np
+import serial
+
+from .lpb40b import LPB40B
+from .measurement import MeasurementBatch
+
+
+PACKET_MAGIC = b"LB"
+PACKET_VERSION = 1
+PACKET_HEADER = struct.Struct("<2sBBHHQq")
+PACKET_SAMPLE_DTYPE = np.dtype([
+    ("offset_ns", "<u4"),
+    ("distance_mm", "<u4"),
+    ("error_code", "u1"),
+])
+MAX_PACKET_SAMPLES = 4096
+# Largest span one packet's u32 offsets can hold
+MAX_PACKET_SPAN_NS = 2**32 - 1
+MAX_DECIMATION = 2**16 - 1
+
+
+class PacketHeader(NamedTuple):
+    count: int
+    decimation: int
+    first_sample_index: int
+    base_timestamp_ns: int
+
+
+def decode_packet(data: bytes) -> tuple:
+    """(PacketHeader, samples) of one packet, samples as a SAMPLE_DTYPE like array with timestamp_ns."""
+    (magic, version, _, count, decimation, first_index, base_ns) = PACKET_HEADER.unpack_from(data)
+    if magic != PACKET_MAGIC or version != PACKET_VERSION:
+        raise ValueError(f"Not a version {PACKET_VERSION} LPB40B stream packet")
+    raw = np.frombuffer(data, dtype=PACKET_SAMPLE_DTYPE, count=count, offset=PACKET_HEADER.size)
+    samples = np.empty(count, dtype=[("timestamp_ns", np.int64), ("distance_mm", np.uint32),
+                                     ("error_code", np.uint8)])
+    samples["timestamp_ns"] = raw["offset_ns"].astype(np.int64) + base_ns
+    samples["distance_mm"] = raw["distance_mm"]
+    samples["error_code"] = raw["error_code"]
+    return (PacketHeader(count, decimation, first_index, base_ns), samples)
+
+
+async def read_packet(reader: asyncio.StreamReader) -> tuple:
+    """Read and decode the next packet from a server connection."""
+    header = await reader.readexactly(PACKET_HEADER.size)
+    count = PACKET_HEADER.unpack(header)[3]
+    body = await reader.readexactly(count * PACKET_SAMPLE_DTYPE.itemsize)
+    return decode_packet(header + body)
+
+
+async def subscribe(host: str, port: int, decimation: int = 1) -> tuple:
+    """Connect to a StreamServer, returns the (reader, writer) pair."""
+    (reader, writer) = await asyncio.open_connection(host, port)
+    if decimation != 1:
+        writer.write(f"DECIMATE {decimation}\n".encode())
+        await writer.drain()
+    return (reader, writer)
+
+
+def build_packets(first_index: int, timestamps_ns: np.ndarray, distances_mm: np.ndarray,
+                  error_codes: np.ndarray, decimation: int = 1) -> list:
+    """Packets for a run of samples starting at sample index first_index, keeping every decimation-th."""
+    start = -first_index % decimation
+    timestamps_ns = timestamps_ns[start::decimation]
+    distances_mm = distances_mm[start::decimation]
+    error_codes = error_codes[start::decimation]
+    index = first_index + start
+
+    packets = []
+    pos = 0
+    while pos < len(timestamps_ns):
+        end = min(len(timestamps_ns), pos + MAX_PACKET_SAMPLES)
+        base_ns = int(timestamps_ns[pos])
+        # Only after a long stall can a tick's samples outgrow the offsets
+        if int(timestamps_ns[end - 1]) - base_ns > MAX_PACKET_SPAN_NS:
+            end = pos + int(np.searchsorted(timestamps_ns[pos:end], base_ns + MAX_PACKET_SPAN_NS, "right"))
+        samples = np.empty(end - pos, dtype=PACKET_SAMPLE_DTYPE)
+        samples["offset_ns"] = timestamps_ns[pos:end] - base_ns
+        samples["distance_mm"] = distances_mm[pos:end]
+        samples["error_code"] = error_codes[pos:end]
+        header = PACKET_HEADER.pack(PACKET_MAGIC, PACKET_VERSION, 0, end - pos, decimation,
+                                    index + (pos * decimation), base_ns)
+        packets.append(header + samples.tobytes())
+        pos = end
+    return packets
+
+
+class _Client:
+    __slots__ = ("writer", "decimation", "packets_sent", "packets_dropped")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.decimation = 1
+        self.packets_sent = 0
+        self.packets_dropped = 0
+
+
+class StreamServer:
+    DEFAULT_TICK_SEC = 0.02
+    DEFAULT_MAX_BUFFERED_BYTES = 256 * 1024
+    # asyncio's default of 100 turns a burst of dashboards connecting into SYN retries
+    LISTEN_BACKLOG = 1024
+
+    def __init__(self, lpb=None, host: str = "127.0.0.1", port: int = 0,
+                 tick_sec: float = DEFAULT_TICK_SEC, max_buffered_bytes: int = DEFAULT_MAX_BUFFERED_BYTES):
+        """Serve lpb's measurement stream, or whatever is passed to append() if lpb is None."""
+        self.lpb = lpb
+        self.host = host
+        self.port = port
+        self.tick_sec = tick_sec
+        self.max_buffered_bytes = max_buffered_bytes
+
+        # Filled by the driver's stream thread, swapped out by the tick
+        self._pending_lock = threading.Lock()
+        self._pending = MeasurementBatch.empty()
+
+        self._clients = set()
+        self._closing = False
+        self._server = None
+        self._tick_task = None
+
+        self.samples_published = 0
+        self.packets_sent = 0
+        self.packets_dropped = 0
+        self.clients_served = 0
+
+        self.log = logging.getLogger(name=__class__.__name__)
+
+    # ---------- Lifecycle ----------
+    async def start(self) -> "StreamServer":
+        self._closing = False
+        self._server = await asyncio.start_server(
+            self._serve_client, self.host, self.port, backlog=self.LISTEN_BACKLOG
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.lpb is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: self.lpb.start_streaming(buffer_size=0, sample_buffer=self)
+            )
+        self._tick_task = asyncio.create_task(self._tick_loop())
+        self.log.info(f"Serving measurements on {self.host}:{self.port}")
+        return self
+
+    async def close(self) -> None:
+        self._closing = True
+        if self.lpb is not None and self.lpb.stream is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.lpb.stop_streaming)
+        if self._tick_task is not None:
+            self._tick_task.cancel()
+            try:
+                await self._tick_task
+            except asyncio.CancelledError:
+                pass
+            self._tick_task = None
+        # Last samples the stream thread handed over
+        self.flush()
+        if self._server is not None:
+            self._server.close()
+            for client in list(self._clients):
+                client.writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    # ---------- Producer side (any thread) ----------
+    def append(self, timestamp_ns: int, distance_mm: int, error_code: int = 0) -> None:
+        """Queue one sample for the next tick - same signature as SampleBuffer.append()."""
+        with self._pending_lock:
+            self._pending.append(timestamp_ns, distance_mm, error_code)
+
+    # ---------- Fan-out ----------
+    async def _tick_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick_sec)
+            self.flush()
+
+    def flush(self) -> int:
+        """Pack everything appended since the last flush and write it to every client.
+
+        Returns the number of samples published.
+        """
+        with self._pending_lock:
+            (batch, self._pending) = (self._pending, MeasurementBatch.empty())
+        count = len(batch.timestamps_ns)
+        if count == 0:
+            return 0
+        first_index = self.samples_published
+        self.samples_published += count
+        if not self._clients:
+            return count
+
+        (timestamps_ns, distances_mm, error_codes) = (
+            np.frombuffer(column, dtype=column.typecode) for column in batch
+        )
+
+        packets_by_decimation = {}
+        for client in self._clients:
+            packets = packets_by_decimation.get(client.decimation)
+            if packets is None:
+                packets = build_packets(first_index, timestamps_ns, distances_mm, error_codes, client.decimation)
+                packets_by_decimation[client.decimation] = packets
+            self._send(client, packets)
+        return count
+
+    def _send(self, client: _Client, packets: list) -> None:
+        transport = client.writer.transport
+        if transport.is_closing():
+            return
+        for packet in packets:
+            # Never wait on a slow client - drop until its backlog drains
+            if transport.get_write_buffer_size() > self.max_buffered_bytes:
+                client.packets_dropped += 1
+                self.packets_dropped += 1
+                continue
+            transport.write(packet)
+            client.packets_sent += 1
+            self.packets_sent += 1
+
+    # ---------- Client connections ----------
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self._closing:
+            # Accepted just before close() - its handler only runs now
+            writer.close()
+            return
+        client = _Client(writer)
+        peer = writer.get_extra_info("peername")
+        self._clients.add(client)
+        self.clients_served += 1
+        self.log.debug(f"Client connected: {peer}")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._handle_control(client, line)
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(client)
+            writer.close()
+            self.log.debug(f"Client {peer} left: {client.packets_sent} packets sent, "
+                           f"{client.packets_dropped} dropped")
+
+    def _handle_control(self, client: _Client, line: bytes) -> None:
+        parts = line.split()
+        if len(parts) == 2 and parts[0].upper() == b"DECIMATE":
+            try:
+                decimation = int(parts[1])
+            except ValueError:
+                decimation = 0
+            if 1 <= decimation <= MAX_DECIMATION:
+                client.decimation = decimation
+                return
+        self.log.warning(f"Ignoring bad control line from client: {line!r}")
+
+
+async def serve(lpb, host: str, port: int, tick_sec: float = StreamServer.DEFAULT_TICK_SEC) -> None:
+    """Serve until cancelled."""
+    async with StreamServer(lpb, host, port, tick_sec):
+        await asyncio.Event().wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve LPB40B measurements to TCP subscribers")
+    parser.add_argument("--port", required=True, help="serial port")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--measurement-frequency-hz", type=int, default=None)
+    parser.add_argument("--listen-host", default="127.0.0.1")
+    parser.add_argument("--listen-port", type=int, default=4040)
+    parser.add_argument("--tick-ms", type=float, default=StreamServer.DEFAULT_TICK_SEC * 1000)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    with serial.Serial(args.port, baudrate=args.baudrate, timeout=1.0) as ser:
+        lpb = LPB40B(ser)
+        lpb.begin()
+        if args.measurement_frequency_hz:
+            lpb.set_measurement_frequency(args.measurement_frequency_hz)
+        try:
+            asyncio.run(serve(lpb, args.listen_host, args.listen_port, args.tick_ms / 1000))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
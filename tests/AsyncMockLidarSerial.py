@@ -0,0 +1,67 @@
+import asyncio
+
+from .MockLidarSerial import MockLidarSerial
+
+class AsyncMockLidarSerial(asyncio.Transport):
+    """asyncio transport stand-in wrapping MockLidarSerial's protocol logic.
+
+    Mirrors serial_asyncio.create_serial_connection() so AsyncLPB40B can be
+    driven without hardware.
+    """
+    def __init__(self, distance_mm=1234, stream_period_sec=0.002):
+        super().__init__()
+        self.mock = MockLidarSerial(distance_mm=distance_mm)
+        self.stream_period_sec = stream_period_sec
+
+        self._protocol = None
+        self._closing = False
+        self._stream_handle = None
+
+    @classmethod
+    async def create_serial_connection(cls, protocol_factory, **kwargs):
+        transport = cls(**kwargs)
+        protocol = protocol_factory()
+        transport._protocol = protocol
+        protocol.connection_made(transport)
+        return (transport, protocol)
+
+    # ---- asyncio.Transport interface ----
+    def write(self, data: bytes) -> None:
+        if self._closing:
+            raise ConnectionError("Transport is closed")
+        self.mock.write(data)
+
+        loop = asyncio.get_running_loop()
+        loop.call_soon(self._deliver_pending)
+
+        if self.mock.streaming and self._stream_handle is None:
+            self._stream_handle = loop.call_later(self.stream_period_sec, self._deliver_stream_frame)
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        if self._closing:
+            return
+        self._closing = True
+        if self._stream_handle is not None:
+            self._stream_handle.cancel()
+        asyncio.get_running_loop().call_soon(self._protocol.connection_lost, None)
+
+    # ---- Delivery to protocol ----
+    def _deliver_pending(self) -> None:
+        if self._closing:
+            return
+        waiting = self.mock.in_waiting
+        if waiting:
+            self._protocol.data_received(self.mock.read(waiting))
+
+    def _deliver_stream_frame(self) -> None:
+        self._stream_handle = None
+        if self._closing or not self.mock.streaming:
+            return
+        # Mock generates one measurement frame per read while streaming
+        self._protocol.data_received(self.mock.read(8))
+        self._stream_handle = asyncio.get_running_loop().call_later(
+            self.stream_period_sec, self._deliver_stream_frame
+        )
@@ -1,27 +1,82 @@
-import queue
+import time
 import struct
+import threading
+from collections import deque
+
+from src.crc import crc8
 
 class MockLidarSerial:
-    def __init__(self, distance_mm=1234):
+    """Duck-typed serial.Serial that behaves like an LPB40B on the other end.
+
+    By default bytes are handed back instantly. With realtime=True the mock
+    models wire time for the current baud rate (10 bits per byte) and read()
+    honors `timeout` the way pyserial does. Continuous mode measurements
+    complete at the set frequency, but every outgoing frame - stream frames
+    and query replies alike - takes its turn on one line. If the line is
+    still busy when measurements complete, the device sends only the newest
+    one and the rest are counted in stream_frames_dropped.
+
+    Above 500 Hz continuous mode sends high speed (0x0E) frames of 10
+    measurements each, as the device does.
+    """
+
+    # Baud rate codes from the set baud rate (0x12) command - 0x00 is adaptive
+    BAUD_RATE_CODES = {
+        0x01: 300, 0x02: 600, 0x03: 1200, 0x04: 2400, 0x05: 4800, 0x06: 9600,
+        0x07: 14400, 0x08: 19200, 0x09: 38400, 0x0A: 56000, 0x0B: 57600,
+        0x0C: 115200, 0x0D: 230400, 0x0E: 256000, 0x0F: 460800, 0x10: 921600,
+    }
+    MAX_MEASUREMENT_FREQUENCY_HZ = 2000
+    HIGH_SPEED_ABOVE_HZ = 500            # Above this continuous mode sends 0x0E frames
+    HIGH_SPEED_SAMPLES = 10              # Measurements per 0x0E frame
+    RX_BUFFER_LIMIT = 4096               # Host side driver buffer - overflow is dropped
+
+    def __init__(self, distance_mm=1234, realtime=False, baudrate=115200, measurement_frequency_hz=100):
 
         self.START_BYTE = bytes([0x55])
         self.STOP_BYTE = bytes([0xAA])
 
         # Mock interface
         self.is_open = True   # Faking an open serial port
+        self.timeout = None   # Same default as serial.Serial - block on read()
+        self.baudrate = baudrate   # Host side rate - must match device rate to talk
 
         # Internal state
         self.continuous_mode = False
+        self.streaming = False
         self.distance_mm = distance_mm
-
-        # Internal queue of bytes to return on read()
-        self._rx_queue = queue.Queue()
+        self.error_code = 0
+        self.temperature_c = 31.5
+        self.temperature_requests = 0
+        self.measurement_frequency_hz = measurement_frequency_hz
+        self.device_baud_rate = baudrate     # None means adaptive - follows the host
+        self.saved_settings = None
+        self.realtime = realtime
+
+        # Received bytes ready for read(), and frames still on the wire (ready_ns, frame, device rate)
+        self._rx_buffer = bytearray()
+        self._in_flight = deque()
+        self._line_free_ns = 0
+        self._request_arrival_ns = 0
+        self._stream_start_ns = 0
+        self._stream_next_frame = 0      # Index of the next stream frame to complete
+        self._stream_frames_sent = 0     # Stream frames put on the wire
+        self.stream_frames_dropped = 0   # Measurements superseded while the line was busy
+        self.overflowed_bytes = 0
+
+        # Guards all of the above - reader threads wait on it for new bytes
+        self._cond = threading.Condition()
 
         # Jump table of commands
         self._handlers = {
             0x01: self._handle_get_info,
+            0x02: self._handle_get_temperature,
+            0x03: self._handle_set_measurement_frequency,
             0x0D: self._handle_set_measurement_mode,
             0x05: self._handle_start_measurement,
+            0x06: self._handle_stop_measurement,
+            0x08: self._handle_save_settings,
+            0x12: self._handle_set_baud_rate,
         }
 
     def write(self, data: bytes):
@@ -29,54 +84,178 @@ class MockLidarSerial:
         if len(data) != 8:
             raise ValueError(f"Expected 8 bytes, got {len(data)}")
 
-        if data[0] != 0x55 or data[-1] != 0xAA:
-            raise ValueError("Bad frame: must start with 0x55 and end with 0xAA")
+        with self._cond:
+            if not self._link_matches():
+                # Device can't decode anything sent at the wrong baud rate
+                return len(data)
 
-        command = data[1]
-        payload = data[2:6]
-        crc = data[6]
+            if data[0] != 0x55 or data[-1] != 0xAA:
+                raise ValueError("Bad frame: must start with 0x55 and end with 0xAA")
 
-        # Calc CRC for message
-        expected_crc = self._calc_crc(data[1:6])
+            command = data[1]
+            payload = data[2:6]
+            crc = data[6]
 
-        if crc != expected_crc:
-            raise ValueError(f"CRC mismatch: expected {expected_crc:#x}, got {crc:#x}")
+            # Calc CRC for message
+            expected_crc = self._calc_crc(data[1:6])
 
-        # Dispatch to handler if known
-        handler = self._handlers.get(command)
-        if handler:
-            handler(payload)
-        else:
-            raise ValueError(f"Instruction had unimplemented/invalid command: {command}")
-            # Unknown command: ignore silently or could raise
-            pass
+            if crc != expected_crc:
+                raise ValueError(f"CRC mismatch: expected {expected_crc:#x}, got {crc:#x}")
+
+            # Request is only complete on the device once it has crossed the wire
+            if self.realtime:
+                self._request_arrival_ns = time.monotonic_ns() + len(data) * self._byte_time_ns()
+
+            # Dispatch to handler if known
+            handler = self._handlers.get(command)
+            if handler:
+                handler(payload)
+            else:
+                raise ValueError(f"Instruction had unimplemented/invalid command: {command}")
+
+            self._cond.notify_all()
+        return len(data)
 
     def read(self, size: int = 1) -> bytes:
-        """Read up to `size` bytes from queue. Returns fewer if queue is short."""
-        data = bytearray()
-        for _ in range(size):
-            try:
-                b = self._rx_queue.get_nowait()
-                data.append(b)
-            except queue.Empty:
-                break
-        return bytes(data)
-    
+        """Read up to `size` bytes. Returns fewer if nothing more arrives before timeout."""
+        with self._cond:
+            timeout = self.timeout
+            deadline_ns = None if timeout is None else time.monotonic_ns() + int(timeout * 1e9)
+            while True:
+                self._advance()
+                if len(self._rx_buffer) >= size or not self.realtime:
+                    break
+                wait_ns = self._next_event_ns()
+                if deadline_ns is not None:
+                    remaining_ns = deadline_ns - time.monotonic_ns()
+                    if remaining_ns <= 0:
+                        break
+                    wait_ns = remaining_ns if wait_ns is None else min(wait_ns, remaining_ns)
+                self._cond.wait(None if wait_ns is None else wait_ns / 1e9)
+
+            data = bytes(self._rx_buffer[:size])
+            del self._rx_buffer[:size]
+            return data
+
+    def readinto(self, buffer) -> int:
+        """Bulk read into a caller's buffer, same timeout rules as read()."""
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    @property
+    def in_waiting(self) -> int:
+        with self._cond:
+            self._advance()
+            return len(self._rx_buffer)
+
     def flush(self) -> None:
-        while not self._rx_queue.empty():
-            self._rx_queue.get_nowait()
+        self.reset_input_buffer()
+
+    def reset_input_buffer(self) -> None:
+        with self._cond:
+            self._advance()
+            self._rx_buffer.clear()
+
+    def close(self) -> None:
+        self.is_open = False
+
+    # ---- Wire model ----
+    def _link_matches(self) -> bool:
+        return self.device_baud_rate is None or self.device_baud_rate == self.baudrate
+
+    def _byte_time_ns(self) -> int:
+        # 8N1 - start bit, 8 data bits, stop bit
+        return 10 * 1_000_000_000 // self.baudrate
+
+    def _advance(self) -> None:
+        """Move bytes that have finished crossing the wire into the rx buffer."""
+        if not self.realtime:
+            if self.streaming and not self._rx_buffer:
+                # Instant mode - one frame on demand each time the reader runs dry
+                self._deliver(self._build_stream_frame())
+                self._stream_frames_sent += 1
+            return
+
+        now_ns = time.monotonic_ns()
+        self._schedule_stream(now_ns)
+        in_flight = self._in_flight
+        while in_flight and in_flight[0][0] <= now_ns:
+            (_, frame, sent_baud_rate) = in_flight.popleft()
+            self._deliver(frame, sent_baud_rate)
+
+    def _stream_timing(self) -> tuple:
+        """(ns from stream start until frame 0 is measured, ns between stream frames)."""
+        period_ns = 1_000_000_000 // self.measurement_frequency_hz
+        samples = self.HIGH_SPEED_SAMPLES if self._high_speed() else 1
+        return ((samples - 1) * period_ns, samples * period_ns)
+
+    def _schedule_stream(self, until_ns: int) -> None:
+        """Put stream frames measured by until_ns on the wire, sharing the line with replies."""
+        if not (self.realtime and self.streaming):
+            return
+        (first_ns, frame_period_ns) = self._stream_timing()
+        first_ns += self._stream_start_ns
+        frame = self._build_stream_frame()
+        frame_time_ns = len(frame) * self._byte_time_ns()
+
+        index = self._stream_next_frame
+        # After a long gap without reads, everything past the host buffer is lost anyway
+        max_frames = self.RX_BUFFER_LIMIT // len(frame) + 1
+        behind = (until_ns - max(first_ns + index * frame_period_ns, self._line_free_ns)) // max(
+            frame_period_ns, frame_time_ns)
+        if behind > max_frames:
+            skip_to_ns = until_ns - max_frames * max(frame_period_ns, frame_time_ns)
+            skipped = (skip_to_ns - first_ns) // frame_period_ns - index
+            if skipped > 0:
+                self.overflowed_bytes += skipped * len(frame)
+                index += skipped
+                self._line_free_ns = max(self._line_free_ns, skip_to_ns)
+
+        while True:
+            due_ns = first_ns + index * frame_period_ns
+            if due_ns > until_ns:
+                break
+            start_ns = max(due_ns, self._line_free_ns)
+            if start_ns > due_ns:
+                # Line still busy - measurements finished in the meantime replace this one
+                newest = (start_ns - first_ns) // frame_period_ns
+                self.stream_frames_dropped += newest - index
+                index = newest
+            self._line_free_ns = start_ns + frame_time_ns
+            self._in_flight.append((self._line_free_ns, frame, self.device_baud_rate))
+            self._stream_frames_sent += 1
+            index += 1
+        self._stream_next_frame = index
+
+    def _next_event_ns(self):
+        """Nanoseconds until more bytes could arrive, or None if nothing is coming."""
+        now_ns = time.monotonic_ns()
+        candidates = []
+        if self._in_flight:
+            candidates.append(self._in_flight[0][0] - now_ns)
+        if self.streaming:
+            (first_ns, frame_period_ns) = self._stream_timing()
+            candidates.append(self._stream_start_ns + first_ns + self._stream_next_frame * frame_period_ns - now_ns)
+        if not candidates:
+            return None
+        return max(0, min(candidates))
+
+    def _deliver(self, frame: bytes, sent_baud_rate=False) -> None:
+        """sent_baud_rate is the device rate the frame went out at, if it has changed since."""
+        if len(self._rx_buffer) + len(frame) > self.RX_BUFFER_LIMIT:
+            self.overflowed_bytes += len(frame)
+            return
+        if sent_baud_rate is False:
+            sent_baud_rate = self.device_baud_rate
+        if sent_baud_rate is not None and sent_baud_rate != self.baudrate:
+            # Baud mismatch shows up on the host as junk that never forms a frame
+            frame = bytes(len(frame))
+        self._rx_buffer += frame
 
     def _calc_crc(self, data: bytes) -> int:
         """Follows Sensor CRC spec (polynomial 31, start 0)"""
-        crc = 0
-        for b in data:
-            crc ^= b
-            for _ in range(8):
-                if crc & 0x80:
-                    crc = ((crc << 1) ^ 0x31) & 0xFF
-                else:
-                    crc = (crc << 1) & 0xFF
-        return crc
+        return crc8(data)
 
     # ---- Command Handlers ----
 
@@ -118,7 +297,7 @@ class MockLidarSerial:
             measurement_mode = bytes([0x00])
         else:
             measurement_mode = bytes([0x01])
-        measurement_frequency = bytes([0x00, 0x64]) # Adaptive - but should be in Mock state
+        measurement_frequency = struct.pack(">H", self.measurement_frequency_hz)
 
         response_2_payload = response_instruction + data_format + measurement_mode + measurement_frequency
         response_2_crc = bytes([self._calc_crc(response_2_payload)])
@@ -141,12 +320,85 @@ class MockLidarSerial:
 
     def _handle_start_measurement(self, payload: bytes) -> None:
         if self.continuous_mode:
-            raise NotImplementedError(f"Continuous mode Mocking not implmented yet.")
-        
+            # Frames are generated by _advance() until a stop arrives
+            self._schedule_stream(self._request_arrival_ns)
+            self.streaming = True
+            self._stream_start_ns = self._request_arrival_ns
+            self._stream_next_frame = 0
+            self._stream_frames_sent = 0
+            return
+
         # Else, queue up a measurement
+        self._enqueue_outgoing_frame(self._build_measurement_frame())
+
+    def _handle_stop_measurement(self, payload: bytes) -> None:
+        # Frames measured before the stop arrived still go out
+        self._schedule_stream(self._request_arrival_ns)
+        self.streaming = False
+        # No return data response - no enqueue
+
+    # 0x03 - Set measurement frequency, 4 byte big endian Hz
+    def _handle_set_measurement_frequency(self, payload: bytes) -> None:
+        frequency_hz = int.from_bytes(payload, byteorder="big")
+        if not 1 <= frequency_hz <= self.MAX_MEASUREMENT_FREQUENCY_HZ:
+            raise ValueError(f"Invalid measurement frequency: {frequency_hz}")
+        self._schedule_stream(self._request_arrival_ns)
+        self.measurement_frequency_hz = frequency_hz
+        if self.streaming:
+            self._stream_start_ns = self._request_arrival_ns
+            self._stream_next_frame = 0
+        # No return data response - no enqueue
 
+    # 0x02 - Get temperature, replies with a big endian float32 in degrees C
+    def _handle_get_temperature(self, payload: bytes) -> None:
+        self.temperature_requests += 1
+        reply_payload = bytes([0x02]) + struct.pack(">f", self.temperature_c)
+        reply_crc = bytes([self._calc_crc(reply_payload)])
+        self._enqueue_outgoing_frame(self.START_BYTE + reply_payload + reply_crc + self.STOP_BYTE)
+
+    # 0x08 - Save settings, replies with an all zero value on success.
+    #  Stores data format, mode and frequency only - the baud rate is always lost on power off.
+    def _handle_save_settings(self, payload: bytes) -> None:
+        self.saved_settings = {
+            "continuous_mode": self.continuous_mode,
+            "measurement_frequency_hz": self.measurement_frequency_hz,
+        }
+        reply_payload = bytes([0x08, 0x00, 0x00, 0x00, 0x00])
+        reply_crc = bytes([self._calc_crc(reply_payload)])
+        self._enqueue_outgoing_frame(self.START_BYTE + reply_payload + reply_crc + self.STOP_BYTE)
+
+    # 0x12 - Set baud rate, last value byte is the rate code
+    def _handle_set_baud_rate(self, payload: bytes) -> None:
+        rate_code = payload[3]
+        if rate_code != 0x00 and rate_code not in self.BAUD_RATE_CODES:
+            reply_code = 0xFF
+        else:
+            reply_code = rate_code
+
+        reply_payload = bytes([0x12, 0x00, 0x00, 0x00, reply_code])
+        reply_crc = bytes([self._calc_crc(reply_payload)])
+        # Reply goes out at the old rate, then the device switches
+        self._enqueue_outgoing_frame(self.START_BYTE + reply_payload + reply_crc + self.STOP_BYTE)
+
+        if reply_code == 0x00:
+            self.device_baud_rate = None
+        elif reply_code != 0xFF:
+            self.device_baud_rate = self.BAUD_RATE_CODES[reply_code]
+
+    def _high_speed(self) -> bool:
+        return self.measurement_frequency_hz > self.HIGH_SPEED_ABOVE_HZ
+
+    def _build_stream_frame(self) -> bytes:
+        """Next continuous mode frame - 0x07, or 0x0E carrying 10 measurements above 500 Hz."""
+        if not self._high_speed():
+            return self._build_measurement_frame()
+        value = bytes([self.error_code]) + struct.pack(">I", self.distance_mm)[1:]
+        payload = bytes([0x0E]) + value * self.HIGH_SPEED_SAMPLES
+        return self.START_BYTE + payload + bytes([self._calc_crc(payload)]) + self.STOP_BYTE
+
+    def _build_measurement_frame(self) -> bytes:
         ret_command = bytes([0x07])
-        ret_measurement_error_code = bytes([0x00])  # See 4 types of errors - could use for modeling situations
+        ret_measurement_error_code = bytes([self.error_code])  # See 4 types of errors in protocol doc
         ret_measurement = struct.pack(">I", self.distance_mm)
 
         # Yes, that's how it's done - 3 bytes for an int! (geez), first byte is the error code 
@@ -156,25 +408,24 @@ class MockLidarSerial:
         ret_crc = bytes([self._calc_crc(ret_payload)])
         
         ret_frame = self.START_BYTE + ret_payload + ret_crc + self.STOP_BYTE
+        return ret_frame
 
-        self._enqueue_outgoing_frame(ret_frame)
-
-
-    def _queue_measurement(self) -> None:
-        """Push a fake measurement frame into rx queue."""
-        dist_bytes = struct.pack(">I", self.distance_mm)  # 2 bytes little endian
-        frame = bytes([0x55, 0x81]) + dist_bytes + b"\x00\x00"  # payload (4 bytes)
-        crc = self._calc_crc(frame)
-        frame += bytes([crc, 0xAA])
-        for b in frame:
-            self._rx_queue.put(b)
 
     def _enqueue_outgoing_frame(self, outgoing_frame: bytes) -> None:
-        for curr_byte in outgoing_frame:
-            self._rx_queue.put(curr_byte)
+        if not self.realtime:
+            self._deliver(outgoing_frame)
+            return
+        # Stream frames measured before the request came in are ahead of the reply
+        self._schedule_stream(self._request_arrival_ns)
+        # Device sends one frame at a time - starts once the request is in and the line is free
+        start_ns = max(self._request_arrival_ns, self._line_free_ns)
+        ready_ns = start_ns + len(outgoing_frame) * self._byte_time_ns()
+        self._line_free_ns = ready_ns
+        # A set baud rate reply goes out at the old rate even though the device switches right after
+        self._in_flight.append((ready_ns, outgoing_frame, self.device_baud_rate))
 
     def __str__(self):
-        queued = list(self._rx_queue.queue)
+        queued = bytes(self._rx_buffer)
         return (f"<MockLidarSerial mode={'CONT' if self.continuous_mode else 'SINGLE'} "
                 f"distance={self.distance_mm}mm "
                 f"qsize={len(queued)} "
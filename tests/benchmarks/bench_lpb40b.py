@@ -0,0 +1,495 @@
+#
+#   LPB40B driver benchmarks against MockLidarSerial
+#
+#   Run with:  make bench
+#         or:  python -m tests.benchmarks.bench_lpb40b --output bench_results.json
+#
+# Reports single-shot rate and latency, streaming rate, CPU time per frame,
+#  CRC throughput and memory blocks allocated per measurement. The mock runs in
+#  realtime mode so wire time at each baud rate is part of the numbers.
+#  The mock runs in the same process, so CPU numbers include its work too -
+#  compare runs against each other, not against hardware.
+#  On POSIX the single-shot numbers are repeated through pyserial on a
+#  pseudo-terminal (tests/virtual_serial.py) to include syscall and tty costs.
+#
+
+
+import sys
+import json
+import time
+import argparse
+import os
+import random
+import platform
+import tempfile
+import gc
+import itertools
+
+import serial
+
+from src.lpb40b import LPB40B
+from src.crc import build_frame
+from src.log_decoder import decode_log
+from src.sensor_clock import SensorClock
+from src.filters import (
+    RunningMedian, OutlierRejector, ExponentialSmoothing, KalmanFilter1D, FilterChain,
+)
+from tests.MockLidarSerial import MockLidarSerial
+
+BAUD_RATES = (115200, 460800, 921600)
+PIPELINE_DEPTHS = (1, 2, 4, 8)
+MEASUREMENT_FREQUENCIES_HZ = (100, 250, 500)
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def make_lpb40(baudrate=115200, measurement_frequency_hz=100, realtime=True) -> LPB40B:
+    mock = MockLidarSerial(
+        distance_mm=2500, realtime=realtime, baudrate=baudrate,
+        measurement_frequency_hz=measurement_frequency_hz,
+    )
+    lpb40 = LPB40B(mock)
+    lpb40.begin()
+    return lpb40
+
+
+# ---------- Individual benchmarks ----------
+def bench_single_shot(baudrate: int, count: int) -> dict:
+    """Rate, latency percentiles and CPU per frame of get_measurement_mm()."""
+    lpb40 = make_lpb40(baudrate=baudrate)
+    latencies_ns = []
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(count):
+        start_ns = time.perf_counter_ns()
+        lpb40.get_measurement_mm()
+        latencies_ns.append(time.perf_counter_ns() - start_ns)
+    wall_elapsed = time.perf_counter() - wall_start
+    cpu_elapsed = time.process_time() - cpu_start
+
+    latencies_ns.sort()
+    return {
+        "baud_rate": baudrate,
+        "measurements": count,
+        "measurements_per_sec": count / wall_elapsed,
+        "latency_p50_us": percentile(latencies_ns, 0.50) / 1000,
+        "latency_p99_us": percentile(latencies_ns, 0.99) / 1000,
+        "cpu_us_per_frame": cpu_elapsed / count * 1e6,
+    }
+
+
+def bench_pipelined(baudrate: int, depth: int, count: int) -> dict:
+    """Rate of pipelined single shot requests with `depth` kept in flight."""
+    lpb40 = make_lpb40(baudrate=baudrate)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    lpb40.get_measurements_mm(count, depth=depth)
+    wall_elapsed = time.perf_counter() - wall_start
+    cpu_elapsed = time.process_time() - cpu_start
+
+    return {
+        "baud_rate": baudrate,
+        "depth": depth,
+        "measurements": count,
+        "measurements_per_sec": count / wall_elapsed,
+        "cpu_us_per_frame": cpu_elapsed / count * 1e6,
+    }
+
+
+def bench_streaming(baudrate: int, measurement_frequency_hz: int, duration_sec: float) -> dict:
+    """Frames per second and CPU per frame with the continuous mode reader."""
+    lpb40 = make_lpb40(baudrate=baudrate, measurement_frequency_hz=measurement_frequency_hz)
+
+    cpu_start = time.process_time()
+    stream = lpb40.start_streaming()
+    time.sleep(duration_sec)
+    frames = stream.frames_received
+    lpb40.stop_streaming()
+    cpu_elapsed = time.process_time() - cpu_start
+
+    return {
+        "baud_rate": baudrate,
+        "measurement_frequency_hz": measurement_frequency_hz,
+        "frames": frames,
+        "frames_per_sec": frames / duration_sec,
+        "cpu_us_per_frame": cpu_elapsed / max(frames, 1) * 1e6,
+    }
+
+
+def bench_pty_single_shot(baudrate: int, count: int) -> dict:
+    """get_measurement_mm() through pyserial and a pseudo-terminal - includes syscall and tty costs."""
+    # termios only exists on POSIX, so this can't be a module level import
+    from tests.virtual_serial import VirtualLidarDevice
+
+    with VirtualLidarDevice(distance_mm=2500, baudrate=baudrate) as device:
+        ser = serial.Serial(device.port, baudrate=baudrate, timeout=1.0)
+        try:
+            lpb40 = LPB40B(ser)
+            lpb40.begin()
+            latencies_ns = []
+            wall_start = time.perf_counter()
+            for _ in range(count):
+                start_ns = time.perf_counter_ns()
+                lpb40.get_measurement_mm()
+                latencies_ns.append(time.perf_counter_ns() - start_ns)
+            wall_elapsed = time.perf_counter() - wall_start
+        finally:
+            ser.close()
+
+    latencies_ns.sort()
+    return {
+        "baud_rate": baudrate,
+        "measurements_per_sec": count / wall_elapsed,
+        "latency_p50_us": percentile(latencies_ns, 0.50) / 1e3,
+        "latency_p99_us": percentile(latencies_ns, 0.99) / 1e3,
+    }
+
+
+def bench_crc(count: int) -> dict:
+    """gen_crc() throughput over 5 byte frame payloads."""
+    payloads = [bytes([0x07, 0x00, (i >> 16) & 0xFF, (i >> 8) & 0xFF, i & 0xFF]) for i in range(1024)]
+    rounds = max(1, count // len(payloads))
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for payload in payloads:
+            LPB40B.gen_crc(payload)
+    elapsed = time.perf_counter() - start
+
+    frames = rounds * len(payloads)
+    return {
+        "frames": frames,
+        "frames_per_sec": frames / elapsed,
+        "megabytes_per_sec": frames * 5 / elapsed / 1e6,
+    }
+
+
+def bench_allocations(measure, count: int) -> dict:
+    """Memory blocks allocated by one measurement call, averaged over count calls.
+
+    Blocks freed inside the call count too. A trace function reads
+    sys.getallocatedblocks() before every bytecode and adds up the rises,
+    so only what's allocated and freed within a single bytecode (e.g.
+    inside one C call) is missed. Tracing itself adds one block per
+    reading it keeps and one frame object per Python call - both are
+    taken off. Far slower than an untraced call, so time it separately.
+    """
+    blocks = sys.getallocatedblocks
+    readings = []
+    events = []
+
+    def tracer(frame, event, arg):
+        # Nothing allocated here but the reading itself
+        readings.append(blocks())
+        events.append(event)
+        frame.f_trace_opcodes = True
+        return tracer
+
+    # Warm up caches so one-time allocations don't count
+    for _ in range(10):
+        measure()
+
+    gc.collect()
+    gc.disable()
+    previous_trace = sys.gettrace()
+    try:
+        sys.settrace(tracer)
+        # repeat() rather than range() - the loop counter would be an allocation too
+        for _ in itertools.repeat(None, count):
+            measure()
+    finally:
+        sys.settrace(previous_trace)
+        gc.enable()
+
+    allocated = 0
+    for index in range(1, len(readings)):
+        rise = readings[index] - readings[index - 1] - 1 - (events[index] == "call")
+        if rise > 0:
+            allocated += rise
+
+    return {
+        "measurements": count,
+        "blocks_allocated_per_measurement": allocated / count,
+    }
+
+
+def legacy_get_measurement_mm(lpb40: LPB40B) -> int:
+    """The original v0.0.1 receive path, kept only as a baseline to compare against.
+
+    read(1) eight times into a fresh bytearray, ser.timeout set on every call,
+    slice-based decoding and an eagerly formatted debug log line.
+    """
+    payload = bytes([LPB40B.CMD_START_MEASUREMENT, 0x00, 0x00, 0x00, 0x00])
+    msg = bytes([LPB40B.START_BYTE]) + payload + bytes([LPB40B.gen_crc(payload), LPB40B.STOP_BYTE])
+    lpb40.log.debug(f"Sending to serial: {msg.hex(' ').upper()}")
+    lpb40.ser.write(msg)
+
+    lpb40.ser.timeout = 1.0
+    frame_bytes = bytearray()
+    while len(frame_bytes) < 8:
+        curr_byte = lpb40.ser.read(1)
+        if not curr_byte:
+            raise TimeoutError(f"Sensor did not return full frame. Bytes read: {frame_bytes}")
+        frame_bytes.extend(curr_byte)
+
+    frame_payload = frame_bytes[1:6]
+    if frame_payload[0] != LPB40B.CMD_MEASUREMENT_DATA:
+        raise ValueError(f"Measurement read invalid return data frame: {frame_bytes}")
+    return int.from_bytes(frame_payload[-3:], byteorder="big")
+
+
+class CannedSerial:
+    """Minimal serial stand-in that replays one reply per write from a preloaded buffer.
+
+    Keeps the mock's own bookkeeping out of the receive path comparison.
+    """
+    def __init__(self, reply: bytes):
+        self.is_open = True
+        self.timeout = None
+        self._reply = reply
+        self._data = memoryview(bytearray(len(reply)))
+        self._pos = self._end = 0
+
+    def write(self, data) -> int:
+        self._data[:len(self._reply)] = self._reply
+        self._pos = 0
+        self._end = len(self._reply)
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = bytes(self._data[self._pos:min(self._end, self._pos + size)])
+        self._pos += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        count = min(len(buffer), self._end - self._pos)
+        buffer[:count] = self._data[self._pos:self._pos + count]
+        self._pos += count
+        return count
+
+    @property
+    def in_waiting(self) -> int:
+        return self._end - self._pos
+
+    def flush(self) -> None:
+        pass
+
+
+def bench_receive_paths(count: int) -> dict:
+    """Time and blocks allocated per call of the legacy vs current get_measurement_mm()."""
+    reply = MockLidarSerial(distance_mm=2500)._build_measurement_frame()
+    results = {}
+    for (name, measure_factory) in (
+        ("legacy", lambda lpb40: (lambda: legacy_get_measurement_mm(lpb40))),
+        ("current", lambda lpb40: lpb40.get_measurement_mm),
+    ):
+        lpb40 = LPB40B(CannedSerial(reply))
+        measure = measure_factory(lpb40)
+        row = bench_allocations(measure, count)
+
+        start = time.perf_counter()
+        for _ in range(count):
+            measure()
+        row["us_per_measurement"] = (time.perf_counter() - start) / count * 1e6
+        results[name] = row
+    return results
+
+
+def bench_instrumentation(count: int) -> dict:
+    """get_measurement_mm() cost with instrumentation off and on (canned serial)."""
+    reply = MockLidarSerial(distance_mm=2500)._build_measurement_frame()
+    results = {}
+    for instrument in (False, True):
+        lpb40 = LPB40B(CannedSerial(reply), instrument=instrument)
+        start = time.perf_counter()
+        for _ in range(count):
+            lpb40.get_measurement_mm()
+        elapsed = time.perf_counter() - start
+        results["on" if instrument else "off"] = {"us_per_measurement": elapsed / count * 1e6}
+    return results
+
+
+def bench_log_decoder(size_mb: float) -> dict:
+    """Raw log decode throughput with one worker and with one per CPU."""
+    rng = random.Random(2)
+    frames = b"".join(
+        build_frame(LPB40B.CMD_MEASUREMENT_DATA, rng.randrange(40000).to_bytes(4, "big"))
+        for _ in range(4096)
+    )
+    repeats = max(1, int(size_mb * 1024 * 1024) // len(frames))
+    (handle, path) = tempfile.mkstemp(suffix=".log")
+    try:
+        with os.fdopen(handle, "wb") as log_file:
+            for _ in range(repeats):
+                log_file.write(frames)
+        results = {"megabytes": repeats * len(frames) / 1e6, "cpus": os.cpu_count()}
+        for (name, workers) in (("one_worker", 1), ("all_cpus", None)):
+            start = time.perf_counter()
+            decode_log(path, workers=workers, chunk_size=4 * 1024 * 1024)
+            results[f"{name}_mb_per_sec"] = results["megabytes"] / (time.perf_counter() - start)
+    finally:
+        os.remove(path)
+    return results
+
+
+def make_filters() -> dict:
+    return {
+        "median_5": RunningMedian(5),
+        "median_51": RunningMedian(51),
+        "outlier": OutlierRejector(),
+        "ema": ExponentialSmoothing(),
+        "kalman": KalmanFilter1D(),
+        "chain": FilterChain(OutlierRejector(), RunningMedian(5), KalmanFilter1D()),
+    }
+
+
+def bench_filters(count: int) -> dict:
+    """Per-sample update() cost and batch apply() throughput of each filter.
+
+    At 500 Hz a sample arrives every 2000 us, so update() should be a tiny
+    fraction of that.
+    """
+    rng = random.Random(1)
+    values = [2500 + rng.gauss(0, 10) for _ in range(count)]
+    results = {}
+    for (name, range_filter) in make_filters().items():
+        update = range_filter.update
+        start = time.perf_counter()
+        for value in values:
+            update(value)
+        update_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        range_filter.apply(values)
+        apply_elapsed = time.perf_counter() - start
+
+        results[name] = {
+            "update_us_per_sample": update_elapsed / count * 1e6,
+            "apply_samples_per_sec": count / apply_elapsed,
+        }
+    return results
+
+
+def bench_sensor_clock(count: int) -> dict:
+    """SensorClock.push() cost per sample on bursty 500 Hz arrivals, and the timestamp spread it leaves."""
+    rng = random.Random(3)
+    period_ns = 2_000_000
+    measured = [1_000_000_000 + index * period_ns for index in range(count)]
+    # 1 ms USB frames plus host scheduling delay
+    arrivals = [(t // 1_000_000 + 1) * 1_000_000 + int(rng.expovariate(1 / 300_000)) for t in measured]
+    clock = SensorClock(500)
+    push = clock.push
+    start = time.perf_counter()
+    samples = [push(arrival_ns, measured_ns) for (arrival_ns, measured_ns) in zip(arrivals, measured)]
+    elapsed = time.perf_counter() - start
+    samples = [sample for sample in samples if sample is not None] + clock.flush()
+    settled = samples[len(samples) // 4:]
+    corrected_errors = [sample.timestamp_ns - sample.item for sample in settled]
+    arrival_errors = [sample.arrival_ns - sample.item for sample in settled]
+    return {
+        "samples": count,
+        "us_per_sample": elapsed / count * 1e6,
+        "arrival_spread_us": (max(arrival_errors) - min(arrival_errors)) / 1e3,
+        "corrected_spread_us": (max(corrected_errors) - min(corrected_errors)) / 1e3,
+    }
+
+
+# ---------- Suite ----------
+def run_suite(quick: bool = False) -> dict:
+    single_count = 200 if quick else 2000
+    stream_duration_sec = 0.25 if quick else 2.0
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "single_shot": [bench_single_shot(baud, single_count) for baud in BAUD_RATES],
+        "pipelined": [
+            bench_pipelined(baud, depth, single_count)
+            for baud in BAUD_RATES
+            for depth in PIPELINE_DEPTHS
+        ],
+        "streaming": [
+            bench_streaming(baud, frequency_hz, stream_duration_sec)
+            for baud in BAUD_RATES
+            for frequency_hz in MEASUREMENT_FREQUENCIES_HZ
+        ],
+        "crc": bench_crc(20_000 if quick else 500_000),
+    }
+    # Pseudo-terminals need termios - POSIX only
+    if os.name == "posix":
+        results["pty_single_shot"] = [bench_pty_single_shot(baud, single_count) for baud in BAUD_RATES]
+
+    lpb40 = make_lpb40(realtime=False)
+    results["allocations"] = bench_allocations(lpb40.get_measurement_mm, 200 if quick else 2000)
+    results["receive_paths"] = bench_receive_paths(200 if quick else 2000)
+    results["instrumentation"] = bench_instrumentation(200 if quick else 20_000)
+    results["filters"] = bench_filters(2000 if quick else 100_000)
+    results["log_decoder"] = bench_log_decoder(1 if quick else 64)
+    results["sensor_clock"] = bench_sensor_clock(5000 if quick else 200_000)
+    return results
+
+
+def print_report(results: dict) -> None:
+    print(f"Python {results['python']} on {results['platform']}")
+    print("\nSingle shot get_measurement_mm()")
+    for row in results["single_shot"]:
+        print(f"  {row['baud_rate']:>7} baud: {row['measurements_per_sec']:8.1f} /s  "
+              f"p50 {row['latency_p50_us']:8.1f} us  p99 {row['latency_p99_us']:8.1f} us  "
+              f"cpu {row['cpu_us_per_frame']:6.1f} us/frame")
+    if "pty_single_shot" in results:
+        print("\nSingle shot through pyserial on a pseudo-terminal")
+        for row in results["pty_single_shot"]:
+            print(f"  {row['baud_rate']:>7} baud: {row['measurements_per_sec']:8.1f} /s  "
+                  f"p50 {row['latency_p50_us']:8.1f} us  p99 {row['latency_p99_us']:8.1f} us")
+    print("\nPipelined single shot")
+    for row in results["pipelined"]:
+        print(f"  {row['baud_rate']:>7} baud depth {row['depth']}: {row['measurements_per_sec']:8.1f} /s  "
+              f"cpu {row['cpu_us_per_frame']:6.1f} us/frame")
+    print("\nStreaming (continuous mode)")
+    for row in results["streaming"]:
+        print(f"  {row['baud_rate']:>7} baud @ {row['measurement_frequency_hz']:>3} Hz: "
+              f"{row['frames_per_sec']:8.1f} frames/s  cpu {row['cpu_us_per_frame']:6.1f} us/frame")
+    crc = results["crc"]
+    print(f"\nCRC: {crc['frames_per_sec']:,.0f} frames/s ({crc['megabytes_per_sec']:.2f} MB/s)")
+    allocations = results["allocations"]
+    print(f"Allocations: {allocations['blocks_allocated_per_measurement']:.1f} blocks/measurement")
+    print("\nReceive path, legacy v0.0.1 vs current (canned serial, no mock)")
+    for (name, row) in results["receive_paths"].items():
+        print(f"  {name:>7}: {row['us_per_measurement']:6.1f} us/measurement  "
+              f"{row['blocks_allocated_per_measurement']:5.1f} blocks allocated/measurement")
+    instrumentation = results["instrumentation"]
+    print(f"Instrumentation: off {instrumentation['off']['us_per_measurement']:.2f} us/measurement, "
+          f"on {instrumentation['on']['us_per_measurement']:.2f} us/measurement")
+    decoder = results["log_decoder"]
+    print(f"Log decoder ({decoder['megabytes']:.0f} MB): {decoder['one_worker_mb_per_sec']:.1f} MB/s one worker, "
+          f"{decoder['all_cpus_mb_per_sec']:.1f} MB/s on {decoder['cpus']} CPUs")
+    print("\nFilters")
+    for (name, row) in results["filters"].items():
+        print(f"  {name:>9}: update {row['update_us_per_sample']:6.2f} us/sample  "
+              f"apply {row['apply_samples_per_sec']:14,.0f} samples/s")
+    clock = results["sensor_clock"]
+    print(f"\nSensor clock: {clock['us_per_sample']:.2f} us/sample, timestamp spread "
+          f"{clock['arrival_spread_us']:.0f} us on arrival -> {clock['corrected_spread_us']:.0f} us corrected")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="LPB40B driver benchmarks")
+    parser.add_argument("--quick", action="store_true", help="short run for smoke testing")
+    parser.add_argument("--output", help="write machine readable results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run_suite(quick=args.quick)
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,9 @@
+import time
 import pytest
 from pprint import pprint
 
+from src.crc import crc8
+
 
 from .MockLidarSerial import MockLidarSerial
 
@@ -66,3 +69,127 @@ def test_get_single_measurement_default_2500mm(lidar):
     assert actual_measurement_mm == expected_measurement_mm
 
 
+
+def frame_for(command, value):
+    payload = bytes([command]) + value
+    return bytes([0x55]) + payload + bytes([crc8(payload), 0xAA])
+
+def test_set_measurement_frequency_in_get_info(lidar):
+    lidar.write(frame_for(0x03, (250).to_bytes(4, "big")))
+    lidar.write(VALID_GET_INFO_FRAME_CMD)
+    info_frame_1 = lidar.read(8)
+    info_frame_2 = lidar.read(8)
+
+    assert int.from_bytes(info_frame_2[4:6], byteorder="big") == 250
+
+def test_bulk_read_multiple_frames(lidar):
+    lidar.write(VALID_START_MEASUREMENT)
+    lidar.write(VALID_START_MEASUREMENT)
+
+    assert lidar.in_waiting == 16
+    assert len(lidar.read(16)) == 16
+
+def test_realtime_models_wire_time():
+    lidar = MockLidarSerial(distance_mm=2500, realtime=True, baudrate=9600)
+    lidar.timeout = 1.0
+
+    start = time.monotonic()
+    lidar.write(VALID_START_MEASUREMENT)
+    measurement_frame = lidar.read(8)
+    elapsed = time.monotonic() - start
+
+    # 8 bytes out, 8 bytes back, 10 bits per byte
+    assert elapsed >= 16 * 10 / 9600
+    assert int.from_bytes(measurement_frame[3:6], byteorder="big") == 2500
+
+def test_realtime_read_honors_timeout():
+    lidar = MockLidarSerial(realtime=True)
+    lidar.timeout = 0.05
+
+    start = time.monotonic()
+    data = lidar.read(8)
+    elapsed = time.monotonic() - start
+
+    assert data == b""
+    assert elapsed >= 0.05
+
+def test_realtime_continuous_mode_rate():
+    lidar = MockLidarSerial(distance_mm=2500, realtime=True, measurement_frequency_hz=200)
+    lidar.timeout = 0
+    lidar.write(VALID_SET_CONTINUOUS_MEASUREMENT_MODE_CMD)
+    lidar.write(VALID_START_MEASUREMENT)
+
+    time.sleep(0.1)
+    frame_count = lidar.in_waiting // 8
+
+    # ~20 frames at 200 Hz over 100 ms - leave room for a slow CI box
+    assert 15 <= frame_count <= 30
+
+def test_realtime_stream_is_capped_by_wire_throughput():
+    # 500 Hz of 8 byte frames needs 40000 baud - 9600 carries 120 frames/s
+    lidar = MockLidarSerial(distance_mm=2500, realtime=True, baudrate=9600, measurement_frequency_hz=500)
+    lidar.timeout = 0
+    lidar.write(VALID_SET_CONTINUOUS_MEASUREMENT_MODE_CMD)
+    lidar.write(VALID_START_MEASUREMENT)
+
+    time.sleep(0.25)
+    frame_count = lidar.in_waiting // 8
+
+    assert 20 <= frame_count <= 32
+    assert lidar.stream_frames_dropped > 60
+
+def test_realtime_replies_share_the_line_with_stream_frames():
+    # 100 Hz stream uses 83% of a 9600 baud line - replies have to wait their turn
+    lidar = MockLidarSerial(distance_mm=2500, realtime=True, baudrate=9600, measurement_frequency_hz=100)
+    lidar.timeout = 0
+    start = time.monotonic()
+    lidar.write(VALID_SET_CONTINUOUS_MEASUREMENT_MODE_CMD)
+    lidar.write(VALID_START_MEASUREMENT)
+    for _ in range(10):
+        lidar.write(VALID_GET_INFO_FRAME_CMD)
+
+    time.sleep(0.2)
+    received = lidar.in_waiting
+    elapsed = time.monotonic() - start
+    frames = [lidar.read(8) for _ in range(received // 8)]
+
+    assert received <= elapsed * 9600 / 10 + 8
+    assert all(frame[0] == 0x55 and frame[7] == 0xAA and crc8(frame[1:6]) == frame[6] for frame in frames)
+    assert [frame[1] for frame in frames].count(0x01) >= 10
+    assert lidar.stream_frames_dropped > 0
+
+def test_high_speed_frames_above_500_hz():
+    lidar = MockLidarSerial(distance_mm=2500, realtime=True, baudrate=921600)
+    lidar.timeout = 1.0
+    lidar.write(frame_for(0x03, (1000).to_bytes(4, byteorder="big")))
+    lidar.write(VALID_SET_CONTINUOUS_MEASUREMENT_MODE_CMD)
+    lidar.write(VALID_START_MEASUREMENT)
+
+    frame = lidar.read(44)
+
+    assert frame[:2] == bytes([0x55, 0x0E])
+    assert frame[-1] == 0xAA
+    assert frame[42] == crc8(frame[1:42])
+    assert [int.from_bytes(frame[value:value + 4], byteorder="big") for value in range(2, 42, 4)] == [2500] * 10
+
+def test_set_baud_rate_switches_device():
+    lidar = MockLidarSerial(distance_mm=2500)
+    lidar.write(frame_for(0x12, bytes([0x00, 0x00, 0x00, 0x0D])))
+
+    # Reply comes back at the old rate
+    assert lidar.read(8) == frame_for(0x12, bytes([0x00, 0x00, 0x00, 0x0D]))
+    assert lidar.device_baud_rate == 230400
+
+    # Host still at 115200 - device can't hear it
+    lidar.write(VALID_START_MEASUREMENT)
+    assert lidar.read(8) == b""
+
+    lidar.baudrate = 230400
+    lidar.write(VALID_START_MEASUREMENT)
+    assert lidar.read(8)[1] == 0x07
+
+def test_set_invalid_baud_rate_fails(lidar):
+    lidar.write(frame_for(0x12, bytes([0x00, 0x00, 0x00, 0x42])))
+
+    assert lidar.read(8)[5] == 0xFF
+    assert lidar.device_baud_rate == 115200
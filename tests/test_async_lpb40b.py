@@ -0,0 +1,82 @@
+
+import asyncio
+import pytest
+from contextlib import aclosing
+
+from src.async_lpb40b import AsyncLPB40B, LPB40BProtocol
+from .AsyncMockLidarSerial import AsyncMockLidarSerial
+
+CMD_GET_INFO = 0x01
+
+
+async def open_mock_lpb40(distance_mm=2500):
+    (transport, protocol) = await AsyncMockLidarSerial.create_serial_connection(
+        LPB40BProtocol, distance_mm=distance_mm
+    )
+    lpb40device = AsyncLPB40B(protocol)
+    await lpb40device.begin()
+    return (lpb40device, transport)
+
+
+# ** **********************************************************************************
+# ** Async driver tests ***************************************************************
+# ** **********************************************************************************
+def test_async_get_measurement_mm_2500():
+    async def scenario():
+        (lpb40, transport) = await open_mock_lpb40()
+        return await lpb40.get_measurement_mm()
+
+    assert asyncio.run(scenario()) == 2500
+
+def test_async_get_device_info():
+    async def scenario():
+        (lpb40, transport) = await open_mock_lpb40()
+        return await lpb40.get_device_info()
+
+    (info_frame_1, info_frame_2) = asyncio.run(scenario())
+
+    assert info_frame_1[1] == CMD_GET_INFO
+    assert info_frame_2[1] == CMD_GET_INFO
+
+def test_async_many_sensors_one_loop():
+    async def scenario():
+        devices = [await open_mock_lpb40(distance_mm=1000 + i) for i in range(8)]
+        return await asyncio.gather(*(lpb40.get_measurement_mm() for (lpb40, _) in devices))
+
+    assert asyncio.run(scenario()) == [1000 + i for i in range(8)]
+
+def test_async_concurrent_commands_on_one_sensor():
+    async def scenario():
+        (lpb40, transport) = await open_mock_lpb40()
+        return await asyncio.gather(lpb40.get_device_info(timeout=0.5), lpb40.get_measurement_mm(timeout=0.5))
+
+    ((info_frame_1, info_frame_2), distance_mm) = asyncio.run(scenario())
+
+    assert (info_frame_1[1], info_frame_2[1]) == (CMD_GET_INFO, CMD_GET_INFO)
+    assert distance_mm == 2500
+
+def test_async_stream():
+    async def scenario():
+        (lpb40, transport) = await open_mock_lpb40()
+        distances = []
+        async with aclosing(lpb40.stream()) as measurements:
+            async for measurement in measurements:
+                distances.append(measurement.distance_mm)
+                if len(distances) == 5:
+                    break
+        return (distances, transport.mock)
+
+    (distances, mock) = asyncio.run(scenario())
+
+    assert distances == [2500] * 5
+    assert not mock.streaming
+    assert not mock.continuous_mode
+
+def test_async_timeout_is_deadline():
+    async def scenario():
+        (lpb40, transport) = await open_mock_lpb40()
+        # Nothing is requested, so nothing comes back
+        await lpb40._read_frame(timeout=0.05)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(scenario())
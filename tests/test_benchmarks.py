@@ -0,0 +1,39 @@
+
+from .benchmarks import bench_lpb40b
+
+
+# ** **********************************************************************************
+# ** Benchmark smoke tests - keep the suite runnable, numbers aren't checked **********
+# ** **********************************************************************************
+def test_bench_single_shot_runs():
+    row = bench_lpb40b.bench_single_shot(921600, 20)
+
+    assert row["measurements_per_sec"] > 0
+    assert row["latency_p50_us"] <= row["latency_p99_us"]
+
+def test_bench_crc_runs():
+    assert bench_lpb40b.bench_crc(2048)["frames"] == 2048
+
+def test_bench_allocations_runs():
+    lpb40 = bench_lpb40b.make_lpb40(realtime=False)
+
+    assert bench_lpb40b.bench_allocations(lpb40.get_measurement_mm, 20)["measurements"] == 20
+
+def test_bench_receive_paths_counts_allocations():
+    results = bench_lpb40b.bench_receive_paths(50)
+
+    assert results["current"]["blocks_allocated_per_measurement"] < results["legacy"]["blocks_allocated_per_measurement"]
+
+def test_bench_filters_runs():
+    assert set(bench_lpb40b.bench_filters(200)) == set(bench_lpb40b.make_filters())
+
+def test_bench_instrumentation_runs():
+    assert set(bench_lpb40b.bench_instrumentation(50)) == {"off", "on"}
+
+def test_bench_log_decoder_runs():
+    assert bench_lpb40b.bench_log_decoder(0.1)["one_worker_mb_per_sec"] > 0
+
+def test_bench_sensor_clock_runs():
+    row = bench_lpb40b.bench_sensor_clock(2000)
+
+    assert row["corrected_spread_us"] < row["arrival_spread_us"]
@@ -0,0 +1,72 @@
+
+import pytest
+
+from src import crc
+from src.lpb40b import LPB40B
+
+VALID_GET_INFO_FRAME_CMD=bytes([0x55, 0x01, 0x00, 0x00, 0x00, 0x00, 0xD3, 0xAA])
+VALID_SET_SINGLE_MEASUREMENT_MODE_CMD=bytes([0x55, 0x0D, 0x00, 0x00, 0x00, 0x01, 0xC3, 0xAA])
+VALID_START_MEASUREMENT=bytes([0x55, 0x05, 0x00, 0x00, 0x00, 0x00, 0xCC, 0xAA])
+VALID_STOP_MEASUREMENT=bytes([0x55, 0x06, 0x00, 0x00, 0x00, 0x00, 0x88, 0xAA])
+MEASUREMENT_FRAME_1453MM = bytes([0x55, 0x07, 0x00, 0x00, 0x05, 0xAD, 0x9C, 0xAA])
+
+
+def bitwise_crc(msg_bytes: bytes) -> int:
+    """Reference implementation straight from the protocol PDF"""
+    crc = 0
+    for b in msg_bytes:
+        crc ^= b
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ 0x31) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+    return crc
+
+
+# ** **********************************************************************************
+# ** CRC tests ************************************************************************
+# ** **********************************************************************************
+def test_table_matches_bitwise_crc():
+    for value in range(256):
+        assert crc.crc8(bytes([value])) == bitwise_crc(bytes([value]))
+
+    payload = bytes(range(0, 250, 7))
+    assert crc.crc8(payload) == bitwise_crc(payload)
+
+@pytest.mark.parametrize("frame", [
+    VALID_GET_INFO_FRAME_CMD,
+    VALID_SET_SINGLE_MEASUREMENT_MODE_CMD,
+    VALID_START_MEASUREMENT,
+    VALID_STOP_MEASUREMENT,
+    MEASUREMENT_FRAME_1453MM,
+])
+def test_documented_frames_validate(frame):
+    assert crc.crc8(frame[1:6]) == frame[6]
+    assert crc.validate_frame(frame)
+
+def test_crc_many():
+    payloads = [VALID_START_MEASUREMENT[1:6], MEASUREMENT_FRAME_1453MM[1:6]]
+
+    assert crc.crc_many(payloads) == [0xCC, 0x9C]
+
+def test_validate_frames_run():
+    corrupt = bytearray(MEASUREMENT_FRAME_1453MM)
+    corrupt[5] ^= 0x01
+    run = VALID_START_MEASUREMENT + bytes(corrupt) + MEASUREMENT_FRAME_1453MM + b"\x55\x07"
+
+    assert crc.validate_frames(run) == [True, False, True]
+
+def test_build_frame_is_cached():
+    assert crc.build_frame(0x05) == VALID_START_MEASUREMENT
+    assert crc.build_frame(0x05) is crc.build_frame(0x05)
+
+def test_lpb40b_prebuilt_frames():
+    assert LPB40B.FRAME_START_MEASUREMENT == VALID_START_MEASUREMENT
+    assert LPB40B.FRAME_STOP_MEASUREMENT == VALID_STOP_MEASUREMENT
+    assert LPB40B.FRAME_SET_SINGLE_MODE == VALID_SET_SINGLE_MEASUREMENT_MODE_CMD
+    assert LPB40B.FRAME_GET_DEVICE_INFO == VALID_GET_INFO_FRAME_CMD
+
+def test_add_protocol_bytes_wrong_length():
+    with pytest.raises(ValueError):
+        crc.add_protocol_bytes(bytes(4))
@@ -0,0 +1,98 @@
+#
+#   Tests for the cached device state and temperature reads
+#
+
+import time
+
+import pytest
+
+from src.lpb40b import LPB40B
+from .MockLidarSerial import MockLidarSerial
+
+
+@pytest.fixture
+def mock_serial():
+    return MockLidarSerial(distance_mm=2500)
+
+@pytest.fixture
+def lpb40(mock_serial):
+    lpb40 = LPB40B(mock_serial)
+    lpb40.begin()
+    return lpb40
+
+
+# ** **********************************************************************************
+# ** Temperature
+# ** **********************************************************************************
+def test_get_temperature(lpb40, mock_serial):
+    mock_serial.temperature_c = 42.25
+    assert lpb40.get_temperature_c() == pytest.approx(42.25)
+
+def test_cached_temperature_expires(lpb40, mock_serial):
+    lpb40.device_state.temperature_ttl_sec = 0.05
+    assert lpb40.device_state.temperature_c() == pytest.approx(31.5)
+    mock_serial.temperature_c = 20.0
+
+    assert lpb40.device_state.temperature_c() == pytest.approx(31.5)
+    time.sleep(0.06)
+    assert lpb40.device_state.temperature_c() == pytest.approx(20.0)
+    assert mock_serial.temperature_requests == 2
+
+
+# ** **********************************************************************************
+# ** Device info
+# ** **********************************************************************************
+def test_device_info_is_cached(lpb40, mock_serial):
+    first = lpb40.device_state.device_info()
+    mock_serial._handlers[0x01] = lambda payload: None   # would time out if asked again
+
+    assert lpb40.device_state.device_info() is first
+    assert lpb40.device_state.hits == 1
+    assert first.firmware_version == "3.1.3"
+
+def test_config_commands_invalidate_info(lpb40):
+    assert lpb40.device_state.device_info().measurement_frequency_hz == 100
+    lpb40.set_measurement_frequency(250)
+
+    assert lpb40.device_state.invalidations == 1
+    assert lpb40.device_state.device_info().measurement_frequency_hz == 250
+
+def test_mode_change_invalidates_info(lpb40):
+    assert lpb40.device_state.device_info().mode_name == "single"
+    lpb40.set_continuous_measurement_mode()
+
+    assert lpb40.device_state.device_info().mode_name == "continuous (power on)"
+
+def test_measurements_do_not_invalidate(lpb40):
+    lpb40.device_state.device_info()
+    lpb40.get_measurements_mm(5)
+
+    assert lpb40.device_state.invalidations == 0
+
+
+# ** **********************************************************************************
+# ** Background refresh
+# ** **********************************************************************************
+def test_background_refresh_between_measurements(lpb40, mock_serial):
+    lpb40.device_state.start_temperature_refresh(interval_sec=0.005)
+    try:
+        deadline = time.monotonic() + 1.0
+        while mock_serial.temperature_requests < 3 and time.monotonic() < deadline:
+            assert lpb40.get_measurement_mm() == 2500
+    finally:
+        lpb40.device_state.stop_temperature_refresh()
+
+    assert mock_serial.temperature_requests >= 3
+    assert lpb40.skipped_frames == 0
+
+def test_background_refresh_while_streaming(lpb40, mock_serial):
+    stream = lpb40.start_streaming()
+    lpb40.device_state.start_temperature_refresh(interval_sec=0.005)
+    deadline = time.monotonic() + 1.0
+    while mock_serial.temperature_requests < 3 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    lpb40.device_state.stop_temperature_refresh()
+    lpb40.stop_streaming()
+
+    assert mock_serial.temperature_requests >= 3
+    assert stream.frames_received > 0
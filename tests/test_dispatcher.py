@@ -0,0 +1,113 @@
+#
+#   Tests for the response dispatcher and queries during streaming
+#
+
+import time
+import threading
+
+import pytest
+
+from src.lpb40b import LPB40B
+from src.dispatcher import ResponseDispatcher
+from .MockLidarSerial import MockLidarSerial
+
+
+def frame_for(cmd, value=bytes(4)):
+    return bytes([0x55, cmd]) + value + bytes([0x00, 0xAA])
+
+
+# ** **********************************************************************************
+# ** Dispatcher
+# ** **********************************************************************************
+def test_dispatch_completes_oldest_request():
+    dispatcher = ResponseDispatcher()
+    first = dispatcher.expect(0x02)
+    second = dispatcher.expect(0x02)
+
+    assert dispatcher.dispatch(frame_for(0x02, b"\x00\x00\x00\x01"))
+    assert first.result(0) == (frame_for(0x02, b"\x00\x00\x00\x01"),)
+    assert not second.done()
+
+def test_dispatch_multi_frame_reply():
+    dispatcher = ResponseDispatcher()
+    future = dispatcher.expect(0x01, frame_count=2)
+
+    dispatcher.dispatch(frame_for(0x01, b"\x01\x00\x00\x00"))
+    assert not future.done()
+    dispatcher.dispatch(frame_for(0x01, b"\x02\x00\x00\x00"))
+    assert [frame[2] for frame in future.result(0)] == [1, 2]
+
+def test_dispatch_unmatched_and_discard():
+    dispatcher = ResponseDispatcher()
+    future = dispatcher.expect(0x08)
+    dispatcher.discard(future)
+
+    assert not dispatcher.dispatch(frame_for(0x08))
+    assert dispatcher.frames_unmatched == 1
+    assert dispatcher.pending == 0
+
+def test_fail_all():
+    dispatcher = ResponseDispatcher()
+    future = dispatcher.expect(0x01, frame_count=2)
+    dispatcher.fail_all(ConnectionError("gone"))
+
+    with pytest.raises(ConnectionError):
+        future.result(0)
+
+
+# ** **********************************************************************************
+# ** Queries while streaming
+# ** **********************************************************************************
+@pytest.fixture
+def streaming_lpb40():
+    mock = MockLidarSerial(distance_mm=2500, realtime=True, measurement_frequency_hz=500)
+    lpb40 = LPB40B(mock)
+    lpb40.begin()
+    lpb40.start_streaming(buffer_size=4096)
+    yield (lpb40, mock)
+    lpb40.stop_streaming()
+
+def test_device_info_while_streaming(streaming_lpb40):
+    (lpb40, mock) = streaming_lpb40
+    info = lpb40.get_device_info(decode=True)
+
+    assert info.mode_name == "continuous (power on)"
+    assert info.measurement_frequency_hz == 500
+    assert lpb40.stream.running
+
+def test_queries_do_not_lose_samples(streaming_lpb40):
+    (lpb40, mock) = streaming_lpb40
+    for _ in range(5):
+        lpb40.get_temperature_c()
+        lpb40.get_device_info()
+        lpb40.save_settings()
+    time.sleep(0.05)
+    stream = lpb40.stream
+
+    # Everything the device has sent so far arrived, bar what's still on the wire
+    assert stream.frames_received >= mock._stream_frames_sent - 2
+    assert lpb40.skipped_frames == 0
+    assert all(entry.distance_mm == 2500 for entry in stream.drain())
+
+def test_query_timeout_while_streaming(streaming_lpb40):
+    (lpb40, mock) = streaming_lpb40
+    mock._handlers[0x02] = lambda payload: None
+
+    with pytest.raises(TimeoutError):
+        lpb40.get_temperature_c(timeout=0.05)
+    assert lpb40.dispatcher.pending == 0
+
+def test_queries_from_several_threads(streaming_lpb40):
+    (lpb40, mock) = streaming_lpb40
+    results = []
+
+    def worker():
+        results.append(lpb40.get_temperature_c())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [pytest.approx(31.5)] * 4
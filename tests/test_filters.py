@@ -0,0 +1,136 @@
+#
+#   Tests for streaming range filters
+#
+
+import time
+import random
+import statistics
+
+import numpy as np
+import pytest
+
+from src.lpb40b import LPB40B
+from src.filters import (
+    RunningMedian, OutlierRejector, ExponentialSmoothing, KalmanFilter1D, FilterChain,
+)
+from .MockLidarSerial import MockLidarSerial
+
+
+def noisy_values(count=300, seed=7):
+    rng = random.Random(seed)
+    values = [2500 + rng.gauss(0, 20) for _ in range(count)]
+    for i in range(10, count, 37):
+        values[i] += 800        # spikes
+    return values
+
+def streamed(range_filter, values):
+    range_filter.reset()
+    return [range_filter.update(value) for value in values]
+
+
+# ** **********************************************************************************
+# ** Running median
+# ** **********************************************************************************
+@pytest.mark.parametrize("window", [1, 2, 5, 8])
+def test_running_median_matches_statistics(window):
+    values = [random.Random(3).randint(0, 20) for _ in range(1)] + noisy_values(200)
+    values = [round(value) % 50 for value in values]   # plenty of duplicates
+    median = RunningMedian(window)
+
+    for (i, value) in enumerate(values):
+        expected = statistics.median(values[max(0, i - window + 1):i + 1])
+        assert median.update(value) == expected
+
+def test_running_median_memory_is_bounded():
+    median = RunningMedian(5)
+    for value in noisy_values(2000):
+        median.update(value)
+
+    assert len(median._values) == 5
+    assert len(median._low) + len(median._high) <= 2 * 5
+
+def test_running_median_rejects_bad_window():
+    with pytest.raises(ValueError):
+        RunningMedian(0)
+
+
+# ** **********************************************************************************
+# ** Individual filters
+# ** **********************************************************************************
+def test_outlier_rejector_removes_spikes():
+    rejector = OutlierRejector(max_deviation_mm=200, window=5)
+    out = streamed(rejector, noisy_values())
+
+    assert max(out) < 2700
+    assert rejector.rejected == len(range(10, 300, 37))
+
+def test_outlier_rejector_follows_step_change():
+    out = streamed(OutlierRejector(max_deviation_mm=100, window=5), [1000] * 10 + [3000] * 10)
+    assert out[-1] == 3000
+
+def test_exponential_smoothing():
+    ema = ExponentialSmoothing(alpha=0.5)
+
+    assert ema.update(100) == 100
+    assert ema.update(200) == 150
+    assert ema.update(200) == 175
+
+def test_kalman_converges_and_smooths():
+    values = noisy_values()
+    out = streamed(KalmanFilter1D(process_variance=0.5, measurement_variance=400), values)
+
+    assert abs(out[-1] - 2500) < 50
+    assert np.std(np.diff(out)) < np.std(np.diff(values))
+
+
+# ** **********************************************************************************
+# ** Batch form matches streaming
+# ** **********************************************************************************
+@pytest.mark.parametrize("range_filter", [
+    RunningMedian(5),
+    RunningMedian(4),
+    OutlierRejector(max_deviation_mm=150, window=7),
+    ExponentialSmoothing(alpha=0.1),
+    ExponentialSmoothing(alpha=0.001),
+    KalmanFilter1D(process_variance=1.0, measurement_variance=100.0),
+    FilterChain(OutlierRejector(), RunningMedian(3), KalmanFilter1D()),
+], ids=lambda range_filter: type(range_filter).__name__)
+def test_apply_matches_update(range_filter):
+    values = noisy_values(5000)
+    np.testing.assert_allclose(range_filter.apply(values), streamed(range_filter, values), rtol=1e-9)
+
+def test_apply_short_and_empty_inputs():
+    for range_filter in (RunningMedian(5), ExponentialSmoothing(), KalmanFilter1D()):
+        assert len(range_filter.apply([])) == 0
+        np.testing.assert_allclose(range_filter.apply([7.0]), [7.0])
+
+
+# ** **********************************************************************************
+# ** Stream stage
+# ** **********************************************************************************
+def test_stream_sets_filtered_mm():
+    mock = MockLidarSerial(distance_mm=2500)
+    lpb40 = LPB40B(mock)
+    stream = lpb40.start_streaming(filters=FilterChain(RunningMedian(3), ExponentialSmoothing()))
+    while lpb40.latest() is None:
+        time.sleep(0.001)
+    lpb40.stop_streaming()
+
+    entries = stream.drain()
+    assert entries
+    assert all(entry.filtered_mm == 2500 for entry in entries)
+
+def test_stream_skips_filters_for_invalid_measurements():
+    mock = MockLidarSerial(distance_mm=0)
+    mock.error_code = 0x03
+    lpb40 = LPB40B(mock)
+    rejector = OutlierRejector()
+    lpb40.start_streaming(filters=rejector)
+    while lpb40.latest() is None:
+        time.sleep(0.001)
+    latest = lpb40.latest()
+    lpb40.stop_streaming()
+
+    assert not latest.valid
+    assert latest.filtered_mm is None
+    assert len(rejector._median._values) == 0
@@ -0,0 +1,101 @@
+
+import pytest
+
+from src.frame_parser import FrameParser
+
+MEASUREMENT_FRAME_1453MM = bytes([0x55, 0x07, 0x00, 0x00, 0x05, 0xAD, 0x9C, 0xAA])
+GET_INFO_FRAME = bytes([0x55, 0x01, 0x89, 0x03, 0x01, 0x03, 0xC8, 0xAA])
+
+
+@pytest.fixture
+def parser():
+    return FrameParser()
+
+
+# ** **********************************************************************************
+# ** Frame parser tests ***************************************************************
+# ** **********************************************************************************
+def test_single_frame(parser):
+    parser.feed(MEASUREMENT_FRAME_1453MM)
+
+    assert parser.next_frame() == MEASUREMENT_FRAME_1453MM
+    assert parser.next_frame() is None
+    assert parser.dropped_bytes == 0
+
+def test_frame_split_across_feeds(parser):
+    parser.feed(MEASUREMENT_FRAME_1453MM[:3])
+    assert parser.next_frame() is None
+
+    parser.feed(MEASUREMENT_FRAME_1453MM[3:])
+    assert parser.next_frame() == MEASUREMENT_FRAME_1453MM
+
+def test_multiple_frames_in_one_feed(parser):
+    parser.feed(GET_INFO_FRAME + MEASUREMENT_FRAME_1453MM)
+
+    assert parser.next_frame() == GET_INFO_FRAME
+    assert parser.next_frame() == MEASUREMENT_FRAME_1453MM
+    assert parser.frames_parsed == 2
+
+def test_resync_after_garbage(parser):
+    parser.feed(bytes([0x00, 0x12, 0xAA]) + MEASUREMENT_FRAME_1453MM)
+
+    assert parser.next_frame() == MEASUREMENT_FRAME_1453MM
+    assert parser.dropped_bytes == 3
+    assert parser.resync_count == 1
+
+def test_resync_after_dropped_byte(parser):
+    # Lose a byte from the first frame - second frame must still come through
+    truncated = MEASUREMENT_FRAME_1453MM[:4] + MEASUREMENT_FRAME_1453MM[5:]
+    parser.feed(truncated + MEASUREMENT_FRAME_1453MM)
+
+    assert parser.next_frame() == MEASUREMENT_FRAME_1453MM
+    assert parser.next_frame() is None
+    assert parser.dropped_bytes == len(truncated)
+
+def test_crc_failure_rejected(parser):
+    corrupt = bytearray(MEASUREMENT_FRAME_1453MM)
+    corrupt[4] ^= 0xFF
+    parser.feed(bytes(corrupt))
+
+    assert parser.next_frame() is None
+    assert parser.crc_failures == 1
+
+def test_find_frame_decodes_in_place(parser):
+    parser.feed(bytes([0x00]) + MEASUREMENT_FRAME_1453MM)
+
+    offset = parser.find_frame()
+    assert parser.buffer[offset:offset + 8] == MEASUREMENT_FRAME_1453MM
+
+    parser.consume_frame()
+    assert parser.buffered == 0
+    assert parser.frames_parsed == 1
+
+class ChunkSerial:
+    def __init__(self, data):
+        self._data = data
+
+    def readinto(self, buffer):
+        count = min(len(buffer), len(self._data))
+        buffer[:count] = self._data[:count]
+        self._data = self._data[count:]
+        return count
+
+def test_fill_from_grows_for_large_bursts():
+    parser = FrameParser(capacity=16)
+    burst = MEASUREMENT_FRAME_1453MM * 10
+
+    assert parser.fill_from(ChunkSerial(burst), len(burst)) == len(burst)
+    frames = [parser.next_frame() for _ in range(10)]
+
+    assert frames == [MEASUREMENT_FRAME_1453MM] * 10
+    assert parser.next_frame() is None
+
+def test_partial_frame_kept_across_compaction():
+    parser = FrameParser(capacity=16)
+    parser.feed(MEASUREMENT_FRAME_1453MM + MEASUREMENT_FRAME_1453MM[:5])
+    assert parser.next_frame() == MEASUREMENT_FRAME_1453MM
+
+    # Needs room past the end of the buffer - partial frame moves to the front
+    parser.feed(MEASUREMENT_FRAME_1453MM[5:] + GET_INFO_FRAME)
+    assert parser.next_frame() == MEASUREMENT_FRAME_1453MM
+    assert parser.next_frame() == GET_INFO_FRAME
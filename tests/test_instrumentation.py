@@ -0,0 +1,133 @@
+#
+#   Tests for driver instrumentation and the Prometheus exporter
+#
+
+import time
+
+import pytest
+
+from src.lpb40b import LPB40B
+from src.instrumentation import (
+    LatencyHistogram, Instrumentation, format_prometheus, write_prometheus_file,
+    PrometheusFileExporter,
+)
+from .MockLidarSerial import MockLidarSerial
+
+
+@pytest.fixture
+def mock_serial():
+    return MockLidarSerial(distance_mm=2500)
+
+@pytest.fixture
+def lpb40(mock_serial):
+    return LPB40B(mock_serial, instrument=True)
+
+
+# ** **********************************************************************************
+# ** Histogram
+# ** **********************************************************************************
+def test_histogram_buckets():
+    histogram = LatencyHistogram(bucket_bounds_us=(100, 1000))
+    for latency_ns in (50_000, 100_000, 500_000, 5_000_000):
+        histogram.observe(latency_ns)
+    snapshot = histogram.snapshot()
+
+    assert snapshot.bucket_counts == (2, 1, 1)
+    assert snapshot.count == 4
+    assert snapshot.percentile_us(0.5) == 100
+    assert snapshot.percentile_us(1.0) == float("inf")
+
+def test_latency_pairs_reply_with_oldest_request():
+    instrumentation = Instrumentation()
+    instrumentation.sent(0x05)
+    instrumentation.sent(0x05)
+    instrumentation.received(0x07)
+
+    assert instrumentation.latency.count == 1
+    assert len(instrumentation._pending[0x05]) == 1
+
+
+# ** **********************************************************************************
+# ** Driver counters
+# ** **********************************************************************************
+def test_stats_counts_round_trips(lpb40):
+    lpb40.begin()
+    lpb40.reset_stats()
+    for _ in range(5):
+        lpb40.get_measurement_mm()
+    stats = lpb40.stats()
+
+    assert stats.instrumented
+    assert stats.frames_sent == 5
+    assert stats.frames_received == 5
+    assert stats.latency.count == 5
+    assert stats.timeouts == 0
+
+def test_stats_counts_timeouts(lpb40, mock_serial):
+    mock_serial._handlers[0x05] = lambda payload: None
+    with pytest.raises(TimeoutError):
+        lpb40.get_measurement_mm()
+
+    assert lpb40.stats().timeouts == 1
+
+def test_stats_counts_crc_failures_and_unexpected(lpb40, mock_serial):
+    lpb40.begin()
+    bad_crc = bytearray(mock_serial._build_measurement_frame())
+    bad_crc[6] ^= 0xFF
+    mock_serial._rx_buffer += bytes(bad_crc) + bytes([0x55, 0x08, 0, 0, 0, 0, 0x00, 0xAA])
+    mock_serial._rx_buffer[-2] = mock_serial._calc_crc(bytes([0x08, 0, 0, 0, 0]))
+    lpb40.get_measurement_mm()
+    stats = lpb40.stats()
+
+    assert stats.crc_failures >= 1
+    assert stats.unexpected_commands == 1
+
+def test_uninstrumented_stats(mock_serial):
+    lpb40 = LPB40B(mock_serial)
+    lpb40.get_measurement_mm()
+    stats = lpb40.stats()
+
+    assert lpb40.instrumentation is None
+    assert not stats.instrumented
+    assert stats.frames_sent == 0
+    assert stats.latency.count == 0
+
+
+# ** **********************************************************************************
+# ** Prometheus export
+# ** **********************************************************************************
+def test_format_prometheus(lpb40):
+    lpb40.get_measurement_mm()
+    text = format_prometheus({"front": lpb40.stats()})
+
+    assert "# TYPE lpb40b_frames_sent_total counter" in text
+    assert 'lpb40b_frames_sent_total{sensor="front"} 1' in text
+    assert 'lpb40b_request_latency_seconds_bucket{sensor="front",le="+Inf"} 1' in text
+    assert 'lpb40b_request_latency_seconds_count{sensor="front"} 1' in text
+
+def test_write_prometheus_file(lpb40, tmp_path):
+    path = tmp_path / "lpb40b.prom"
+    write_prometheus_file(path, {"front": lpb40})
+
+    assert "lpb40b_timeouts_total" in path.read_text()
+    assert not (tmp_path / "lpb40b.prom.tmp").exists()
+
+def test_exporter_writes_on_stop(lpb40, tmp_path):
+    path = tmp_path / "lpb40b.prom"
+    exporter = PrometheusFileExporter(path, {"front": lpb40}, interval_sec=60)
+    exporter.start()
+    lpb40.get_measurement_mm()
+    exporter.stop()
+
+    assert 'lpb40b_frames_received_total{sensor="front"} 1' in path.read_text()
+
+def test_stats_ignores_idle_stream_polls():
+    lpb40 = LPB40B(MockLidarSerial(distance_mm=2500, realtime=True), instrument=True)
+    lpb40.begin()
+    lpb40.set_measurement_frequency(2)
+    lpb40.start_streaming()
+    time.sleep(0.35)
+    lpb40.stop_streaming()
+
+    # The reader polled several times between frames - none of that is a timeout
+    assert lpb40.stats().timeouts == 0
@@ -0,0 +1,118 @@
+#
+#   Tests for the offline raw log decoder
+#
+
+import random
+
+import numpy as np
+import pytest
+
+from src.crc import build_frame
+from src.frame_parser import FrameParser
+from src import log_decoder
+from src.log_decoder import decode_log, decode_array, chunk_bounds
+
+
+def measurement_frame(distance_mm, error_code=0):
+    return build_frame(0x07, bytes([error_code]) + distance_mm.to_bytes(3, "big"))
+
+def noisy_log(frame_count=5000, seed=11) -> bytes:
+    """Measurement frames with junk, torn frames and corrupted CRCs mixed in."""
+    rng = random.Random(seed)
+    log = bytearray()
+    for index in range(frame_count):
+        frame = bytearray(measurement_frame(rng.randrange(0, 40000), rng.choice([0, 0, 0, 3])))
+        roll = rng.random()
+        if roll < 0.02:
+            frame[6] ^= 0x5A                          # bad CRC
+        elif roll < 0.04:
+            frame = frame[:rng.randrange(1, 8)]        # torn frame
+        elif roll < 0.06:
+            log += bytes(rng.randrange(256) for _ in range(rng.randrange(1, 12)))
+        log += frame
+    return bytes(log)
+
+def parse_sequentially(data: bytes) -> list:
+    parser = FrameParser()
+    parser.feed(data)
+    frames = []
+    while (frame := parser.next_frame()) is not None:
+        frames.append(frame)
+    return frames
+
+
+# ** **********************************************************************************
+# ** Vectorized decode
+# ** **********************************************************************************
+def test_decode_array_fields():
+    data = np.frombuffer(measurement_frame(2500) + measurement_frame(0, 3), np.uint8)
+    (offsets, commands, distances, error_codes, crc_valid) = decode_array(data)
+
+    assert offsets.tolist() == [0, 8]
+    assert commands.tolist() == [7, 7]
+    assert distances.tolist() == [2500, 0]
+    assert error_codes.tolist() == [0, 3]
+    assert crc_valid.all()
+
+def test_valid_frames_match_frame_parser():
+    data = noisy_log()
+    (offsets, _, distances, _, crc_valid) = decode_array(np.frombuffer(data, np.uint8))
+    expected = parse_sequentially(data)
+
+    valid_offsets = offsets[crc_valid]
+    assert [data[offset:offset + 8] for offset in valid_offsets.tolist()] == expected
+
+def test_crc_failures_are_flagged():
+    frame = bytearray(measurement_frame(1234))
+    frame[6] ^= 0xFF
+    data = np.frombuffer(measurement_frame(1) + bytes(frame) + measurement_frame(2), np.uint8)
+    (offsets, _, distances, _, crc_valid) = decode_array(data)
+
+    assert offsets.tolist() == [0, 8, 16]
+    assert crc_valid.tolist() == [True, False, True]
+    assert distances[1] == 1234
+
+
+# ** **********************************************************************************
+# ** Chunked, parallel decode
+# ** **********************************************************************************
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / "raw.log"
+    path.write_bytes(noisy_log(20000))
+    return path
+
+def test_chunk_bounds_start_on_frames(log_path):
+    data = log_path.read_bytes()
+    bounds = chunk_bounds(log_path, chunk_size=10_000)
+
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(data)
+    for (start, _) in bounds[1:]:
+        assert data[start] == 0x55 and data[start + 7] == 0xAA
+
+def test_parallel_matches_single_process(log_path):
+    single = decode_log(log_path, workers=1)
+    parallel = decode_log(log_path, workers=2, chunk_size=7_001)
+
+    for (name, column) in single._asdict().items():
+        np.testing.assert_array_equal(column, getattr(parallel, name), err_msg=name)
+
+def test_timestamps_from_frequency(tmp_path):
+    path = tmp_path / "raw.log"
+    path.write_bytes(b"".join(measurement_frame(distance) for distance in range(10)))
+    decoded = decode_log(path, workers=1, start_ns=1000, measurement_frequency_hz=100)
+
+    assert decoded.timestamps_ns.tolist() == [1000 + index * 10_000_000 for index in range(10)]
+    assert len(decoded.measurements().distances_mm) == 10
+
+def test_empty_log(tmp_path):
+    path = tmp_path / "raw.log"
+    path.write_bytes(b"")
+    assert len(decode_log(path).byte_offsets) == 0
+
+def test_main_writes_npz(log_path, tmp_path):
+    output = tmp_path / "decoded.npz"
+    assert log_decoder.main([str(log_path), "--output", str(output), "--workers", "1"]) == 0
+
+    with np.load(output) as decoded:
+        assert set(decoded.files) == set(log_decoder.DecodedLog._fields)
@@ -1,4 +1,6 @@
+import time
 import pytest
+import concurrent.futures
 import serial
 from typing import cast
 
@@ -37,3 +39,148 @@ def test_get_measurement_mm_2500(lpb40):
     actual_measurement_mm = lpb40.get_measurement_mm()
 
     assert actual_measurement_mm == expected_measurment_mm
+
+def test_get_measurement_skips_extra_info_frames(lpb40):
+    # Device bug (see RELEASES): get info sometimes returns four frames instead of two
+    lpb40.begin()
+    lpb40.get_device_info()
+    lpb40.ser._handle_get_info(bytes(4))
+
+    assert lpb40.get_measurement_mm() == 2500
+    assert lpb40.skipped_frames == 2
+
+def test_set_baud_rate(lpb40):
+    lpb40.begin()
+    lpb40.set_baud_rate(921600)
+
+    assert lpb40.ser.baudrate == 921600
+    assert lpb40.ser.device_baud_rate == 921600
+    assert lpb40.get_measurement_mm() == 2500
+
+def test_save_settings_does_not_keep_baud_rate(lpb40):
+    lpb40.begin()
+    lpb40.set_baud_rate(460800)
+    lpb40.save_settings()
+
+    assert lpb40.ser.saved_settings == {"continuous_mode": False, "measurement_frequency_hz": 100}
+
+def test_set_baud_rate_unsupported(lpb40):
+    lpb40.begin()
+    with pytest.raises(ValueError):
+        lpb40.set_baud_rate(12345)
+
+def test_set_baud_rate_falls_back_when_link_fails(lpb40):
+    lpb40.begin()
+    # Device acknowledges but then never actually switches
+    mock = lpb40.ser
+    handle_set_baud_rate = mock._handle_set_baud_rate
+    def acknowledge_only(payload):
+        device_baud_rate = mock.device_baud_rate
+        handle_set_baud_rate(payload)
+        mock.device_baud_rate = device_baud_rate
+    mock._handlers[0x12] = acknowledge_only
+
+    with pytest.raises(ConnectionError):
+        lpb40.set_baud_rate(921600, timeout=0.05)
+
+    assert mock.baudrate == 115200
+    assert lpb40.get_measurement_mm() == 2500
+
+def test_probe_baud_rate(lpb40):
+    lpb40.ser.device_baud_rate = 460800
+
+    assert lpb40.probe_baud_rate(timeout=0.01) == 460800
+    assert lpb40.ser.baudrate == 460800
+
+def test_begin_probes_baud_rate(lpb40):
+    lpb40.ser.device_baud_rate = 921600
+    lpb40.begin(probe_baud_rate=True)
+
+    assert lpb40.get_measurement_mm() == 2500
+
+def test_get_device_info_decoded(lpb40):
+    lpb40.begin()
+    device_info = lpb40.get_device_info(decode=True)
+
+    assert device_info.device_model == 0x89
+    assert device_info.firmware_version == "3.1.3"
+    assert device_info.measurement_mode == 0x01
+    assert device_info.measurement_frequency_hz == 100
+
+def test_set_measurement_frequency(lpb40):
+    lpb40.begin()
+    lpb40.set_measurement_frequency(250)
+
+    assert lpb40.get_device_info(decode=True).measurement_frequency_hz == 250
+
+@pytest.mark.parametrize("frequency_hz", [0, 501, 2000])
+def test_set_measurement_frequency_out_of_range(lpb40, frequency_hz):
+    lpb40.begin()
+    with pytest.raises(ValueError):
+        lpb40.set_measurement_frequency(frequency_hz)
+
+def test_measure_achieved_rate():
+    mock_serial = cast(serial.Serial, MockLidarSerial(distance_mm=2500, realtime=True))
+    lpb40 = LPB40B(mock_serial)
+    lpb40.begin()
+    lpb40.set_measurement_frequency(200)
+
+    achieved = lpb40.measure_achieved_rate(window_sec=0.3)
+
+    assert achieved.requested_hz == 200
+    assert 0.9 < achieved.ratio < 1.1
+    assert lpb40.get_measurement_mm() == 2500
+
+def test_get_measurements_pipelined(lpb40):
+    lpb40.begin()
+
+    assert lpb40.get_measurements_mm(10, depth=4) == [2500] * 10
+
+def test_pipelined_keeps_depth_in_flight(lpb40):
+    lpb40.begin()
+    pipeline = lpb40.iter_measurements_pipelined(10, depth=3)
+
+    assert next(pipeline) == 2500
+    # One request topped up - three outstanding plus the reply just yielded,
+    #  which stays in the parser until the next step
+    assert lpb40.parser.buffered + lpb40.ser.in_waiting == 4 * 8
+
+def test_pipelined_closed_early_drops_outstanding_replies(lpb40):
+    lpb40.begin()
+    lpb40.ser.distance_mm = 1000
+    pipeline = lpb40.iter_measurements_pipelined(10, depth=4)
+
+    assert next(pipeline) == 1000
+    pipeline.close()
+    lpb40.ser.distance_mm = 2000
+
+    assert [lpb40.get_measurement_mm() for _ in range(5)] == [2000] * 5
+    # io_lock is free for other threads again
+    acquired = concurrent.futures.ThreadPoolExecutor(1).submit(lpb40.io_lock.acquire, blocking=False).result()
+    assert acquired
+
+def test_pipelined_break_on_last_reply(lpb40):
+    lpb40.begin()
+    for (index, distance_mm) in enumerate(lpb40.iter_measurements_pipelined(3, depth=2)):
+        if index == 2:
+            break
+    lpb40.ser.distance_mm = 2000
+
+    assert lpb40.get_measurement_mm() == 2000
+
+def test_pipelined_timeout_discards_pipeline(lpb40):
+    lpb40.begin()
+    lpb40.ser._handlers[0x05] = lambda payload: None
+
+    with pytest.raises(TimeoutError):
+        lpb40.get_measurements_mm(5, timeout=0.05)
+
+def test_settle_time_only_waits_when_needed(lpb40):
+    lpb40.begin()
+    lpb40.get_measurement_mm()
+    assert lpb40.scheduler.waits == 1
+
+    lpb40.set_single_measurement_mode()
+    time.sleep(0.02)
+    lpb40.get_measurement_mm()
+    assert lpb40.scheduler.waits == 1
@@ -0,0 +1,73 @@
+#
+#   Tests for structured measurement records
+#
+
+import pytest
+
+from src.lpb40b import LPB40B
+from src.measurement import ErrorCode, Measurement, MeasurementBatch, error_code_from_byte
+from .MockLidarSerial import MockLidarSerial
+
+
+@pytest.fixture
+def mock_serial():
+    return MockLidarSerial(distance_mm=2500)
+
+@pytest.fixture
+def lpb40(mock_serial):
+    return LPB40B(mock_serial)
+
+
+# ** **********************************************************************************
+# ** Decoding
+# ** **********************************************************************************
+def test_from_frame_decodes_fields():
+    frame = bytes([0x55, 0x07, 0x00, 0x00, 0x09, 0xC4, 0x00, 0xAA])
+    measurement = Measurement.from_frame(frame, 42)
+
+    assert measurement.distance_mm == 2500
+    assert measurement.error_code is ErrorCode.OK
+    assert measurement.frame == frame
+    assert measurement.timestamp_ns == 42
+    assert measurement.valid
+
+def test_error_code_is_decoded():
+    frame = bytes([0x55, 0x07, 0x03, 0x00, 0x00, 0x00, 0x00, 0xAA])
+    measurement = Measurement.from_frame(frame, 0)
+
+    assert measurement.error_code is ErrorCode.OUT_OF_RANGE
+    assert not measurement.valid
+
+def test_undocumented_error_code_stays_int():
+    assert error_code_from_byte(0x02) is ErrorCode.SIGNAL_TOO_STRONG
+    assert error_code_from_byte(0x7F) == 0x7F
+    assert not isinstance(error_code_from_byte(0x7F), ErrorCode)
+
+def test_measurement_has_no_instance_dict():
+    measurement = Measurement(1, ErrorCode.OK, b"", 0)
+    assert not hasattr(measurement, "__dict__")
+
+
+# ** **********************************************************************************
+# ** Driver
+# ** **********************************************************************************
+def test_get_measurement(lpb40, mock_serial):
+    mock_serial.error_code = ErrorCode.SIGNAL_TOO_WEAK
+    measurement = lpb40.get_measurement()
+
+    assert measurement.error_code is ErrorCode.SIGNAL_TOO_WEAK
+    assert measurement.frame[1] == LPB40B.CMD_MEASUREMENT_DATA
+    assert measurement.timestamp_ns > 0
+
+def test_get_measurements_batch(lpb40, mock_serial):
+    batch = lpb40.get_measurements(6, depth=3)
+
+    assert isinstance(batch, MeasurementBatch)
+    assert list(batch.distances_mm) == [2500] * 6
+    assert list(batch.error_codes) == [0] * 6
+    assert list(batch.timestamps_ns) == sorted(batch.timestamps_ns)
+    assert batch.valid_distances() == [2500] * 6
+
+def test_decode_measurement_rejects_other_commands():
+    with pytest.raises(ValueError):
+        LPB40B.decode_measurement(bytes([0x55, 0x01, 0, 0, 0, 0, 0, 0xAA]), 0)
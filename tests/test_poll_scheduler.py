@@ -0,0 +1,98 @@
+#
+#   Tests for the deadline based polling scheduler
+#
+
+import time
+
+import pytest
+
+from src.lpb40b import LPB40B
+from src.poll_scheduler import PollScheduler
+from .MockLidarSerial import MockLidarSerial
+
+
+def make_lpb40(distance_mm=2500):
+    lpb40 = LPB40B(MockLidarSerial(distance_mm=distance_mm))
+    lpb40.begin()
+    return lpb40
+
+
+# ** **********************************************************************************
+# ** Deadlines
+# ** **********************************************************************************
+def test_slots_follow_absolute_deadlines():
+    scheduler = PollScheduler({"front": make_lpb40()}, rate_hz=200)
+    readings = list(scheduler.readings(count=40))
+
+    # A busy test machine may cost the odd slot - it's skipped, never run late
+    slots = [reading.slot for reading in readings]
+    assert slots == sorted(set(slots))
+    assert {reading.deadline_ns - scheduler.epoch_ns - reading.slot * 5_000_000 for reading in readings} == {0}
+    assert all(reading.measurement.distance_mm == 2500 for reading in readings)
+    stats = scheduler.stats()["front"]
+    assert (stats.slots_run, stats.failures) == (40, 0)
+    assert stats.slots_run + stats.slots_skipped == slots[-1] + 1
+    assert stats.lateness.count == 40
+    assert stats.max_lateness_us <= 2500
+
+def test_missed_slots_are_skipped_not_bunched():
+    scheduler = PollScheduler({"front": make_lpb40()}, rate_hz=100)
+    slots = []
+    for reading in scheduler.readings(count=6):
+        slots.append(reading.slot)
+        if len(slots) == 4:
+            time.sleep(0.032)   # overruns the next two slots
+
+    # Those two are never run late. A busy test machine may cost other slots too.
+    assert slots[4] >= slots[3] + 3
+    assert slots == sorted(set(slots))
+    assert scheduler.stats()["front"].slots_skipped == slots[-1] + 1 - 6
+
+def test_duration_and_stop():
+    scheduler = PollScheduler({"front": make_lpb40()}, rate_hz=100)
+    assert 5 <= len(list(scheduler.readings(duration_sec=0.1))) <= 10
+
+    seen = []
+    def callback(reading):
+        seen.append(reading)
+        if len(seen) == 3:
+            scheduler.stop()
+    scheduler.run(callback)
+    assert len(seen) == 3
+
+
+# ** **********************************************************************************
+# ** Several sensors
+# ** **********************************************************************************
+def test_sensors_take_turns_at_phase_offsets():
+    scheduler = PollScheduler({"left": make_lpb40(1000), "right": make_lpb40(2000)}, rate_hz=100)
+    readings = list(scheduler.readings(count=10))
+
+    # Every slot sits at its sensor's phase - a skipped slot on a busy machine doesn't shift them
+    phase_ns = {"left": 0, "right": 5_000_000}
+    assert {reading.deadline_ns - scheduler.epoch_ns - reading.slot * 10_000_000 - phase_ns[reading.name]
+            for reading in readings} == {0}
+    assert [reading.deadline_ns for reading in readings] == sorted(reading.deadline_ns for reading in readings)
+    assert {reading.name: reading.measurement.distance_mm for reading in readings} == {"left": 1000, "right": 2000}
+
+def test_custom_phases():
+    sensors = {"left": make_lpb40(), "right": make_lpb40()}
+    scheduler = PollScheduler(sensors, rate_hz=100, phases={"left": 0.5, "right": 0.0})
+    readings = list(scheduler.readings(count=4))
+
+    phase_ns = {"left": 5_000_000, "right": 0}
+    assert {reading.deadline_ns - scheduler.epoch_ns - reading.slot * 10_000_000 - phase_ns[reading.name]
+            for reading in readings} == {0}
+    with pytest.raises(ValueError):
+        PollScheduler(sensors, rate_hz=100, phases={"left": 1.0})
+
+def test_failed_sensor_does_not_stop_the_others():
+    sensors = {"good": make_lpb40(), "bad": make_lpb40()}
+    sensors["bad"].ser._handlers[0x05] = lambda payload: None
+    scheduler = PollScheduler(sensors, rate_hz=20, timeout=0.01)
+    readings = list(scheduler.readings(count=4))
+
+    assert [reading.ok for reading in readings] == [True, False, True, False]
+    assert isinstance(readings[1].error, TimeoutError)
+    assert scheduler.stats()["bad"].failures == 2
+    assert scheduler.stats()["good"].failures == 0
@@ -0,0 +1,84 @@
+
+import time
+import pytest
+import serial
+import numpy as np
+from typing import cast
+
+from src.lpb40b import LPB40B
+from src.sample_buffer import SampleBuffer
+from .MockLidarSerial import MockLidarSerial
+
+
+@pytest.fixture
+def buffer():
+    return SampleBuffer(capacity=8)
+
+
+# ** **********************************************************************************
+# ** Sample buffer tests **************************************************************
+# ** **********************************************************************************
+def test_latest_before_full(buffer):
+    for i in range(5):
+        buffer.append(1000 + i, 200 + i, 0)
+
+    samples = buffer.latest()
+    assert len(samples) == 5
+    assert list(samples["distance_mm"]) == [200, 201, 202, 203, 204]
+    assert list(buffer.latest(2)["timestamp_ns"]) == [1003, 1004]
+
+def test_latest_wraps_without_copy(buffer):
+    for i in range(21):
+        buffer.append(1000 + i, i, i % 5)
+
+    samples = buffer.latest()
+    assert len(samples) == 8
+    assert list(samples["distance_mm"]) == list(range(13, 21))
+    assert list(samples["error_code"]) == [i % 5 for i in range(13, 21)]
+    # Zero copy - a view onto the buffer's own storage
+    assert np.shares_memory(samples, buffer._data)
+
+def test_window(buffer):
+    for i in range(12):
+        buffer.append(1000 + 10 * i, i)
+
+    window = buffer.window(1055, 1095)
+    assert list(window["distance_mm"]) == [6, 7, 8, 9]
+    assert list(buffer.window(1100)["distance_mm"]) == [10, 11]
+
+def test_extend_matches_append(buffer):
+    appended = SampleBuffer(capacity=8)
+    for i in range(11):
+        appended.append(i, 10 * i, i % 3)
+    buffer.extend(np.arange(3), np.arange(3) * 10, np.arange(3) % 3)
+    buffer.extend(np.arange(3, 11), np.arange(3, 11) * 10, np.arange(3, 11) % 3)
+
+    assert np.array_equal(buffer.latest(), appended.latest())
+    assert buffer.total_written == 11
+
+def test_extend_larger_than_capacity(buffer):
+    buffer.extend(np.arange(20), np.arange(20))
+
+    assert list(buffer.distances_mm) == list(range(12, 20))
+
+def test_measure_into():
+    lpb40 = LPB40B(cast(serial.Serial, MockLidarSerial(distance_mm=2500)))
+    lpb40.begin()
+    samples = SampleBuffer(capacity=16)
+
+    lpb40.measure_into(samples, 4)
+
+    assert list(samples.distances_mm) == [2500] * 4
+    assert np.all(np.diff(samples.timestamps_ns) >= 0)
+
+def test_stream_fills_sample_buffer():
+    lpb40 = LPB40B(cast(serial.Serial, MockLidarSerial(distance_mm=2500)))
+    lpb40.begin()
+    samples = SampleBuffer(capacity=64)
+
+    lpb40.start_streaming(sample_buffer=samples)
+    while len(samples) < 10:
+        time.sleep(0.001)
+    lpb40.stop_streaming()
+
+    assert np.all(samples.distances_mm == 2500)
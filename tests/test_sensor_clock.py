@@ -0,0 +1,123 @@
+#
+#   Tests for sensor clock reconstruction
+#
+
+import time
+import random
+
+import numpy as np
+import pytest
+
+from src.lpb40b import LPB40B
+from src.sample_buffer import SampleBuffer
+from src.sensor_clock import SensorClock, ClockCorrectedBuffer
+from .MockLidarSerial import MockLidarSerial
+
+
+def usb_arrivals(count, period_ns=2_000_000, ppm=100, lost=(), seed=1):
+    """(index, measured_ns, arrival_ns) as a USB serial adapter would deliver them.
+
+    Frames are polled out on 1 ms USB frames with some host scheduling
+    delay, and now and then the host stalls for up to 16 ms.
+    """
+    rng = random.Random(seed)
+    true_period_ns = period_ns * (1 + ppm * 1e-6)
+    release = {}
+    last_release = 0
+    arrivals = []
+    for index in range(count):
+        measured_ns = 1_000_000_000 + index * true_period_ns
+        usb_frame = int((measured_ns + 700_000) // 1_000_000) + 1
+        if usb_frame not in release:
+            arrival_ns = usb_frame * 1_000_000 + rng.expovariate(1 / 300_000)
+            if rng.random() < 0.01:
+                arrival_ns += rng.uniform(0, 16_000_000)
+            last_release = release[usb_frame] = max(arrival_ns, last_release)
+        if index not in lost:
+            arrivals.append((index, measured_ns, int(release[usb_frame])))
+    return arrivals
+
+def reconstruct(clock, arrivals):
+    samples = [clock.push(arrival_ns, (index, measured_ns)) for (index, measured_ns, arrival_ns) in arrivals]
+    return [sample for sample in samples if sample is not None] + clock.flush()
+
+
+# ** **********************************************************************************
+# ** Timeline reconstruction
+# ** **********************************************************************************
+def test_timestamps_follow_the_sensor_clock():
+    clock = SensorClock(500)
+    samples = reconstruct(clock, usb_arrivals(20_000, ppm=-5000))
+
+    errors = np.array([sample.timestamp_ns - sample.item[1] for sample in samples])[5000:]
+    arrival_errors = np.array([sample.arrival_ns - sample.item[1] for sample in samples])[5000:]
+    assert np.ptp(arrival_errors) > 10_000_000
+    # A constant offset (the adapter's minimum latency) can't be seen - the spread can
+    assert np.ptp(errors) < 300_000
+    assert clock.period_ns == pytest.approx(2_000_000 * (1 - 5000e-6), abs=20)
+
+def test_period_fit_sees_through_delay_sweep():
+    # 500 Hz against 1 ms USB frames - the delay sweeps slowly and hides the drift
+    clock = SensorClock(500)
+    reconstruct(clock, usb_arrivals(20_000, ppm=100))
+
+    assert clock.period_ns == pytest.approx(2_000_200, abs=5)
+
+def test_lost_frames_are_flagged():
+    clock = SensorClock(500)
+    samples = reconstruct(clock, usb_arrivals(8000, lost={3000, 5000, 5001, 5002}))
+
+    assert [(sample.item[0], sample.lost_before) for sample in samples if sample.lost_before] == [
+        (3001, 1), (5003, 3),
+    ]
+    assert all(sample.sample_index == sample.item[0] for sample in samples)
+    assert (clock.frames_lost, clock.gaps, clock.samples) == (4, 2, 7996)
+
+def test_output_lags_by_the_lookahead():
+    clock = SensorClock(100, lookahead_sec=0.05)
+    outputs = [clock.push(1_000_000 + index * 10_000_000) for index in range(8)]
+
+    assert outputs[:5] == [None] * 5
+    assert [sample.sample_index for sample in outputs[5:]] == [0, 1, 2]
+    assert len(clock.flush()) == 5
+
+def test_reset():
+    clock = SensorClock(500)
+    reconstruct(clock, usb_arrivals(1000))
+    clock.reset()
+
+    assert clock.period_ns == clock.nominal_period_ns
+    assert clock.push(5) is None
+    assert clock.flush()[0].timestamp_ns == 5
+
+
+# ** **********************************************************************************
+# ** Live stream
+# ** **********************************************************************************
+def test_corrects_a_live_stream():
+    lpb40 = LPB40B(MockLidarSerial(distance_mm=2500, realtime=True, measurement_frequency_hz=500))
+    lpb40.begin()
+    samples = SampleBuffer(2048)
+    # Lookahead longer than a stall of the reader thread on a busy test machine
+    corrected = ClockCorrectedBuffer(samples, SensorClock(500, lookahead_sec=0.5))
+
+    lpb40.start_streaming(buffer_size=0, sample_buffer=corrected)
+    time.sleep(1.0)
+    lpb40.stop_streaming()
+    corrected.flush()
+
+    timestamps = samples.timestamps_ns
+    assert len(timestamps) > 300
+    assert set(samples.distances_mm.tolist()) == {2500}
+    assert np.all(np.diff(timestamps) > 0)
+    assert list(corrected.gaps) == []
+
+def test_late_final_burst_is_not_a_gap():
+    clock = SensorClock(500)
+    arrivals = [(index, 0, 1_000_000 + index * 2_000_000) for index in range(1000)]
+    # The reader stalls for 20 ms right before the stream stops
+    arrivals[-10:] = [(index, 0, arrivals[-10][2] + 20_000_000 + index) for (index, _, _) in arrivals[-10:]]
+    samples = reconstruct(clock, arrivals)
+
+    assert clock.gaps == 0
+    assert len(samples) == 1000
@@ -0,0 +1,71 @@
+
+import pytest
+import serial
+from typing import cast
+
+from src.lpb40b import LPB40B
+from src.sensor_group import SensorGroup
+from .MockLidarSerial import MockLidarSerial
+
+
+def make_lpb40(distance_mm):
+    return LPB40B(cast(serial.Serial, MockLidarSerial(distance_mm=distance_mm)))
+
+@pytest.fixture
+def group():
+    sensors = {f"sensor{i}": make_lpb40(1000 + i) for i in range(8)}
+    sensor_group = SensorGroup(sensors, timeout=0.05)
+    sensor_group.begin()
+    yield sensor_group
+    sensor_group.close()
+
+
+# ** **********************************************************************************
+# ** Sensor group tests ***************************************************************
+# ** **********************************************************************************
+def test_poll_returns_aligned_readings(group):
+    cycle = group.poll()
+
+    assert [reading.name for reading in cycle.readings] == [f"sensor{i}" for i in range(8)]
+    assert [reading.distance_mm for reading in cycle.readings] == [1000 + i for i in range(8)]
+    assert all(cycle.start_ns <= reading.timestamp_ns <= cycle.end_ns for reading in cycle.readings)
+    assert cycle.failures == ()
+
+def test_poll_counts_cycles(group):
+    group.poll()
+    cycle = group.poll()
+
+    assert cycle.cycle == 1
+
+def test_poll_reports_failed_sensor(group):
+    # Sensor 3 stops answering measurement requests
+    group.sensors["sensor3"].ser._handlers[0x05] = lambda payload: None
+
+    cycle = group.poll()
+
+    assert [reading.name for reading in cycle.failures] == ["sensor3"]
+    assert isinstance(cycle.failures[0].error, TimeoutError)
+    assert cycle.readings[3].distance_mm is None
+    assert cycle.readings[4].distance_mm == 1004
+
+def test_poll_reports_sensor_that_cannot_write(group):
+    def write(data):
+        raise serial.SerialException("write failed: device disconnected")
+    group.sensors["sensor5"].ser.write = write
+
+    cycle = group.poll()
+
+    assert [reading.name for reading in cycle.failures] == ["sensor5"]
+    assert isinstance(cycle.failures[0].error, serial.SerialException)
+    assert [reading.distance_mm for reading in cycle.readings if reading.ok] == [1000 + i for i in range(8) if i != 5]
+
+def test_poll_refuses_streaming_sensor(group):
+    stream = group.sensors["sensor2"].start_streaming()
+    try:
+        with pytest.raises(RuntimeError):
+            group.poll()
+        assert stream.get(timeout=1.0).distance_mm == 1002
+    finally:
+        group.sensors["sensor2"].stop_streaming()
+
+    assert group.poll().failures == ()
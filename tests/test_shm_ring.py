@@ -0,0 +1,130 @@
+#
+#   Tests for the shared memory sample ring
+#
+
+import time
+import threading
+import multiprocessing
+
+import pytest
+
+from src.lpb40b import LPB40B
+from src.shm_ring import ShmPublisher, ShmSubscriber, publish
+from .MockLidarSerial import MockLidarSerial
+
+
+@pytest.fixture
+def publisher():
+    with ShmPublisher(capacity=16) as publisher:
+        yield publisher
+
+
+# ** **********************************************************************************
+# ** Ring semantics
+# ** **********************************************************************************
+def test_read_new_samples(publisher):
+    subscriber = ShmSubscriber(publisher.name)
+    for index in range(5):
+        publisher.append(1000 + index, 2500 + index, 0)
+    samples = subscriber.read()
+
+    assert samples["timestamp_ns"].tolist() == [1000, 1001, 1002, 1003, 1004]
+    assert samples["distance_mm"].tolist() == [2500, 2501, 2502, 2503, 2504]
+    assert len(subscriber.read()) == 0
+    subscriber.close()
+
+def test_subscriber_starts_at_next_sample(publisher):
+    publisher.append(1, 10)
+    late = ShmSubscriber(publisher.name)
+    from_oldest = ShmSubscriber(publisher.name, from_oldest=True)
+    publisher.append(2, 20)
+
+    assert late.read()["distance_mm"].tolist() == [20]
+    assert from_oldest.read()["distance_mm"].tolist() == [10, 20]
+    late.close()
+    from_oldest.close()
+
+def test_overrun_is_detected(publisher):
+    subscriber = ShmSubscriber(publisher.name)
+    for index in range(40):
+        publisher.append(index, index)
+    samples = subscriber.read()
+
+    assert subscriber.overruns == 40 - 16
+    assert samples["distance_mm"].tolist() == list(range(24, 40))
+    subscriber.close()
+
+def test_torn_slot_is_dropped(publisher):
+    subscriber = ShmSubscriber(publisher.name)
+    publisher.append(1, 10)
+    publisher.append(2, 20)
+    publisher._seq[1] += 1      # looks like the writer is mid-way through the slot
+
+    assert subscriber.read()["distance_mm"].tolist() == [10]
+    assert subscriber.overruns == 1
+    subscriber.close()
+
+def test_latest_and_wait(publisher):
+    subscriber = ShmSubscriber(publisher.name)
+    assert subscriber.latest() is None
+    assert not subscriber.wait(timeout=0.01)
+
+    publisher.append(5, 55, 3)
+    assert subscriber.wait(timeout=0.01)
+    assert subscriber.latest() == (5, 55, 3)
+    subscriber.close()
+
+def test_attach_to_wrong_block():
+    from multiprocessing import shared_memory
+    block = shared_memory.SharedMemory(create=True, size=64)
+    try:
+        with pytest.raises(ValueError):
+            ShmSubscriber(block.name)
+    finally:
+        block.close()
+        block.unlink()
+
+
+# ** **********************************************************************************
+# ** Across processes, fed by the driver
+# ** **********************************************************************************
+def count_samples(name, wanted, results):
+    subscriber = ShmSubscriber(name, from_oldest=True)
+    distances = []
+    deadline = time.monotonic() + 5.0
+    while len(distances) < wanted and time.monotonic() < deadline:
+        subscriber.wait(timeout=0.1)
+        distances.extend(subscriber.read()["distance_mm"].tolist())
+    results.put((len(distances), set(distances), subscriber.overruns))
+    subscriber.close()
+
+def test_driver_publishes_to_many_processes():
+    lpb40 = LPB40B(MockLidarSerial(distance_mm=2500, realtime=True, measurement_frequency_hz=500))
+    lpb40.begin()
+    stop_event = threading.Event()
+    publisher_thread = threading.Thread(
+        target=publish, args=(lpb40, "lpb40b_test_ring", 4096, stop_event), daemon=True
+    )
+    publisher_thread.start()
+    deadline = time.monotonic() + 2.0
+    while lpb40.stream is None and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    readers = [context.Process(target=count_samples, args=("lpb40b_test_ring", 50, results))
+               for _ in range(3)]
+    try:
+        for reader in readers:
+            reader.start()
+        outcomes = [results.get(timeout=10) for _ in readers]
+    finally:
+        for reader in readers:
+            reader.join(timeout=5)
+        stop_event.set()
+        publisher_thread.join(timeout=2)
+
+    for (count, distances, overruns) in outcomes:
+        assert count >= 50
+        assert distances == {2500}
+        assert overruns == 0
@@ -0,0 +1,97 @@
+#
+#   Tests for the batched sample output sinks
+#
+
+import json
+
+import numpy as np
+import pytest
+
+from src.sample_buffer import SAMPLE_DTYPE
+from src.sinks import CsvSink, NdjsonSink, BinarySink, open_sink, format_for_path
+
+SAMPLES = [(1000, 2500, 0), (2000, 2501, 1), (3000, 0, 3)]
+
+
+def write_samples(sink):
+    with sink:
+        for sample in SAMPLES:
+            sink.append(*sample)
+    return sink
+
+
+# ** **********************************************************************************
+# ** Formats
+# ** **********************************************************************************
+def test_csv(tmp_path):
+    path = tmp_path / "samples.csv"
+    write_samples(CsvSink(path))
+
+    assert path.read_text().splitlines() == [
+        "timestamp_ns,distance_mm,error_code", "1000,2500,0", "2000,2501,1", "3000,0,3",
+    ]
+
+def test_ndjson(tmp_path):
+    path = tmp_path / "samples.ndjson"
+    write_samples(NdjsonSink(path))
+
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert rows[1] == {"timestamp_ns": 2000, "distance_mm": 2501, "error_code": 1}
+
+def test_binary_reads_back_as_sample_dtype(tmp_path):
+    path = tmp_path / "samples.bin"
+    write_samples(BinarySink(path))
+
+    samples = np.fromfile(path, dtype=SAMPLE_DTYPE)
+    assert samples.tolist() == SAMPLES
+
+def test_format_from_extension(tmp_path):
+    assert format_for_path("run.JSONL") == "ndjson"
+    assert format_for_path("run.bin") == "binary"
+    assert format_for_path("run.txt") == "csv"
+    assert isinstance(open_sink(tmp_path / "run.bin"), BinarySink)
+    with pytest.raises(ValueError):
+        open_sink(tmp_path / "run.csv", "xml")
+
+
+# ** **********************************************************************************
+# ** Batching
+# ** **********************************************************************************
+def test_writes_whole_batches(tmp_path):
+    path = tmp_path / "samples.csv"
+    sink = CsvSink(path, batch_size=2)
+    for sample in SAMPLES:
+        sink.append(*sample)
+
+    assert sink.samples_written == 2
+    assert sink.sample_count == 3
+    sink.close()
+    assert sink.samples_written == 3
+
+def test_max_samples_sets_done(tmp_path):
+    sink = CsvSink(tmp_path / "samples.csv", max_samples=2)
+    for sample in SAMPLES:
+        sink.append(*sample)
+    sink.close()
+
+    assert sink.done.is_set()
+    assert sink.sample_count == 2
+    assert (sink.first_timestamp_ns, sink.last_timestamp_ns) == (1000, 2000)
+
+class ClosedPipe:
+    def write(self, data):
+        raise BrokenPipeError("reader went away")
+
+    def flush(self):
+        pass
+
+def test_write_failure_stops_the_sink(tmp_path):
+    sink = CsvSink(tmp_path / "samples.csv", batch_size=1)
+    sink._file.close()
+    sink._file = ClosedPipe()
+    sink.append(1, 2, 0)
+    sink.append(3, 4, 0)
+
+    assert isinstance(sink.error, BrokenPipeError)
+    assert sink.done.is_set()
+    assert sink.samples_written == 0
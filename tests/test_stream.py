@@ -0,0 +1,141 @@
+
+import time
+import pytest
+import serial
+from typing import cast
+
+from src.lpb40b import LPB40B
+from src.sample_buffer import SampleBuffer
+from .MockLidarSerial import MockLidarSerial
+
+
+@pytest.fixture
+def mock_serial():
+    return MockLidarSerial(distance_mm=2500)
+
+@pytest.fixture
+def lpb40(mock_serial):
+    lpb40device = LPB40B(cast(serial.Serial, mock_serial))
+    lpb40device.begin()
+    yield lpb40device
+    lpb40device.stop_streaming()
+
+
+# ** **********************************************************************************
+# ** Streaming tests ******************************************************************
+# ** **********************************************************************************
+def test_start_streaming_sets_continuous_mode(lpb40, mock_serial):
+    lpb40.start_streaming()
+
+    assert mock_serial.continuous_mode
+    assert mock_serial.streaming
+
+def test_stream_iterator_yields_measurements(lpb40):
+    stream = lpb40.start_streaming()
+
+    distances = []
+    for measurement in stream:
+        distances.append(measurement.distance_mm)
+        if len(distances) == 10:
+            break
+
+    assert distances == [2500] * 10
+
+def test_stream_latest_and_drain(lpb40):
+    lpb40.start_streaming(buffer_size=16)
+    while lpb40.latest() is None:
+        time.sleep(0.001)
+
+    latest = lpb40.latest()
+    assert latest.distance_mm == 2500
+    assert latest.valid
+
+    entries = lpb40.drain()
+    assert 0 < len(entries) <= 16
+    assert all(entry.distance_mm == 2500 for entry in entries)
+
+def test_stream_ring_buffer_is_bounded(lpb40):
+    stream = lpb40.start_streaming(buffer_size=4)
+    while stream.frames_received < 50:
+        time.sleep(0.001)
+
+    assert len(stream) <= 4
+    assert stream.frames_overwritten > 0
+
+def test_stop_streaming_returns_to_single_mode(lpb40, mock_serial):
+    lpb40.start_streaming()
+    lpb40.stop_streaming()
+
+    assert not mock_serial.streaming
+    assert not mock_serial.continuous_mode
+    assert lpb40.get_measurement_mm() == 2500
+
+def test_latest_without_stream_raises(lpb40):
+    with pytest.raises(RuntimeError):
+        lpb40.latest()
+
+def test_single_measurements_refused_while_streaming(lpb40):
+    stream = lpb40.start_streaming()
+
+    for measure in (lpb40.get_measurement_mm, lpb40.get_measurement,
+                    lambda: lpb40.get_measurements_mm(3), lambda: lpb40.get_measurements(3),
+                    lambda: lpb40.measure_into(None, 3)):
+        with pytest.raises(RuntimeError):
+            measure()
+    assert stream.running
+    assert stream.get(timeout=1.0).distance_mm == 2500
+
+
+# ** **********************************************************************************
+# ** Reader failure *******************************************************************
+# ** **********************************************************************************
+def unplug(mock_serial):
+    def readinto(buffer):
+        raise serial.SerialException("device reports readiness to read but returned no data")
+    mock_serial.readinto = readinto
+
+def test_reader_failure_reaches_get_and_iteration(lpb40, mock_serial):
+    stream = lpb40.start_streaming()
+    unplug(mock_serial)
+
+    with pytest.raises(serial.SerialException):
+        for _ in stream:
+            pass
+    assert not stream.running
+    with pytest.raises(serial.SerialException):
+        stream.get()
+    with pytest.raises(serial.SerialException):
+        lpb40.stop_streaming()
+
+def test_reader_failure_raised_by_stop(lpb40, mock_serial):
+    stream = lpb40.start_streaming()
+    unplug(mock_serial)
+    while stream.running:
+        time.sleep(0.001)
+
+    with pytest.raises(serial.SerialException):
+        lpb40.stop_streaming()
+    assert lpb40.stream is None
+
+
+# ** **********************************************************************************
+# ** Sink-only streams ****************************************************************
+# ** **********************************************************************************
+def test_sink_only_stream_fills_sample_buffer(lpb40):
+    sample_buffer = SampleBuffer(64)
+    stream = lpb40.start_streaming(buffer_size=0, sample_buffer=sample_buffer)
+    while stream.frames_received < 10:
+        time.sleep(0.001)
+
+    assert len(stream) == 0
+    assert lpb40.latest() is None
+    assert set(sample_buffer.distances_mm.tolist()) == {2500}
+    assert set(sample_buffer.error_codes.tolist()) == {0}
+    with pytest.raises(RuntimeError):
+        stream.get()
+
+def test_sink_only_stream_needs_a_sample_buffer(lpb40, mock_serial):
+    with pytest.raises(ValueError):
+        lpb40.start_streaming(buffer_size=0)
+
+    assert not mock_serial.continuous_mode
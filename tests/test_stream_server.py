@@ -0,0 +1,174 @@
+#
+#   Tests for the measurement fan-out server
+#
+
+import socket
+import asyncio
+
+import numpy as np
+
+from src.lpb40b import LPB40B
+from src.stream_server import (StreamServer, build_packets, decode_packet, read_packet,
+                               subscribe, MAX_PACKET_SAMPLES)
+from .MockLidarSerial import MockLidarSerial
+
+
+def sample_run(count, first_ns=1_000_000, period_ns=2_000_000):
+    timestamps = first_ns + np.arange(count, dtype=np.int64) * period_ns
+    distances = 2000 + np.arange(count, dtype=np.uint32)
+    errors = (np.arange(count) % 5 == 0).astype(np.uint8)
+    return (timestamps, distances, errors)
+
+
+# ** **********************************************************************************
+# ** Packets
+# ** **********************************************************************************
+def test_packet_round_trip():
+    (timestamps, distances, errors) = sample_run(10)
+    [packet] = build_packets(100, timestamps, distances, errors)
+    (header, samples) = decode_packet(packet)
+
+    assert len(packet) == 24 + 10 * 9
+    assert header.count == 10
+    assert header.first_sample_index == 100
+    assert samples["timestamp_ns"].tolist() == timestamps.tolist()
+    assert samples["distance_mm"].tolist() == distances.tolist()
+    assert samples["error_code"].tolist() == errors.tolist()
+
+def test_decimation_keeps_global_multiples():
+    (timestamps, distances, errors) = sample_run(10)
+    [packet] = build_packets(7, timestamps, distances, errors, decimation=4)
+    (header, samples) = decode_packet(packet)
+
+    # Indexes 7..16 -> 8, 12 and 16 are kept
+    assert header.first_sample_index == 8
+    assert header.decimation == 4
+    assert samples["distance_mm"].tolist() == [2001, 2005, 2009]
+
+def test_large_runs_are_split():
+    (timestamps, distances, errors) = sample_run(MAX_PACKET_SAMPLES + 5, period_ns=1000)
+    packets = build_packets(0, timestamps, distances, errors)
+
+    assert [decode_packet(packet)[0].count for packet in packets] == [MAX_PACKET_SAMPLES, 5]
+    assert decode_packet(packets[1])[0].first_sample_index == MAX_PACKET_SAMPLES
+
+def test_long_stall_is_split_by_offset_range():
+    timestamps = np.array([0, 1, 5_000_000_000], dtype=np.int64)
+    packets = build_packets(0, timestamps, np.zeros(3, np.uint32), np.zeros(3, np.uint8))
+
+    assert [decode_packet(packet)[0].count for packet in packets] == [2, 1]
+    assert decode_packet(packets[1])[1]["timestamp_ns"].tolist() == [5_000_000_000]
+
+
+# ** **********************************************************************************
+# ** Server fan-out
+# ** **********************************************************************************
+def test_clients_get_their_decimation():
+    async def scenario():
+        async with StreamServer(tick_sec=3600) as server:
+            clients = [await subscribe("127.0.0.1", server.port, decimation) for decimation in (1, 3)]
+            while server.client_count < 2:
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.05)
+            for index in range(10):
+                server.append(index * 1000, index, 0)
+            server.flush()
+            results = [await read_packet(reader) for (reader, _) in clients]
+            for (_, writer) in clients:
+                writer.close()
+            return results
+
+    ((full_header, full), (decimated_header, decimated)) = asyncio.run(scenario())
+    assert full["distance_mm"].tolist() == list(range(10))
+    assert decimated_header.decimation == 3
+    assert decimated["distance_mm"].tolist() == [0, 3, 6, 9]
+
+def test_slow_client_is_dropped_not_waited_on():
+    async def scenario():
+        async with StreamServer(tick_sec=3600, max_buffered_bytes=4096) as server:
+            # A client that never reads, with a small receive window
+            sock = socket.socket()
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            sock.connect(("127.0.0.1", server.port))
+            (fast_reader, fast_writer) = await subscribe("127.0.0.1", server.port)
+            while server.client_count < 2:
+                await asyncio.sleep(0.001)
+
+            received = 0
+            (timestamps, distances, errors) = sample_run(1000)
+            for tick in range(400):
+                for (ts, dist, err) in zip(timestamps.tolist(), distances.tolist(), errors.tolist()):
+                    server.append(ts, dist, err)
+                server.flush()
+                (header, samples) = await read_packet(fast_reader)
+                assert header.first_sample_index == received
+                received += header.count
+            sock.close()
+            fast_writer.close()
+            return (server, received)
+
+    (server, received) = asyncio.run(scenario())
+    assert received == 400 * 1000
+    assert server.packets_dropped > 0
+
+def test_bad_control_line_is_ignored():
+    async def scenario():
+        async with StreamServer(tick_sec=3600) as server:
+            (reader, writer) = await subscribe("127.0.0.1", server.port)
+            writer.write(b"DECIMATE zero\nDECIMATE 0\n")
+            await writer.drain()
+            await asyncio.sleep(0.05)
+            [client] = list(server._clients)
+            writer.close()
+            return client.decimation
+
+    assert asyncio.run(scenario()) == 1
+
+
+# ** **********************************************************************************
+# ** Load - hundreds of local clients on one mock sensor
+# ** **********************************************************************************
+def test_many_clients_from_mock_sensor():
+    CLIENTS = 300
+    DECIMATIONS = (1, 2, 5, 10)
+    lpb40 = LPB40B(MockLidarSerial(distance_mm=2500, realtime=True, measurement_frequency_hz=500))
+    lpb40.begin()
+
+    async def client(port, decimation):
+        (reader, writer) = await subscribe("127.0.0.1", port, decimation)
+        indexes = []
+        distances = set()
+        while True:
+            try:
+                (header, samples) = await read_packet(reader)
+            except asyncio.IncompleteReadError:
+                break       # server closed
+            if header.decimation != decimation:
+                continue    # sent before the server saw our DECIMATE line
+            indexes.extend(range(header.first_sample_index,
+                                 header.first_sample_index + header.count * header.decimation,
+                                 header.decimation))
+            distances.update(samples["distance_mm"].tolist())
+        writer.close()
+        return (decimation, indexes, distances)
+
+    async def scenario():
+        async with StreamServer(lpb40, tick_sec=0.02) as server:
+            tasks = [asyncio.create_task(client(server.port, DECIMATIONS[n % len(DECIMATIONS)]))
+                     for n in range(CLIENTS)]
+            while server.client_count < CLIENTS:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(1.0)
+        results = await asyncio.gather(*tasks)
+        return (server, results)
+
+    (server, results) = asyncio.run(scenario())
+    assert server.clients_served == CLIENTS
+    assert server.packets_dropped == 0
+    assert server.samples_published > 200
+    for (decimation, indexes, distances) in results:
+        assert len(indexes) > 10
+        assert all(index % decimation == 0 for index in indexes)
+        # No gaps once subscribed
+        assert np.all(np.diff(indexes) == decimation)
+        assert distances == {2500}
@@ -0,0 +1,66 @@
+#
+#   Tests for the PTY backed virtual device - real pyserial, real tty layer
+#
+
+import time
+
+import pytest
+
+termios = pytest.importorskip("termios")
+serial = pytest.importorskip("serial")
+
+from src.lpb40b import LPB40B
+from .virtual_serial import VirtualLidarDevice, open_virtual_devices
+
+
+@pytest.fixture
+def device():
+    with VirtualLidarDevice(distance_mm=2500, measurement_frequency_hz=500) as device:
+        yield device
+
+@pytest.fixture
+def lpb40(device):
+    ser = serial.Serial(device.port, baudrate=115200, timeout=1.0)
+    lpb40 = LPB40B(ser)
+    lpb40.begin()
+    yield lpb40
+    ser.close()
+
+
+# ** **********************************************************************************
+# ** End to end through pyserial
+# ** **********************************************************************************
+def test_single_measurement(lpb40):
+    assert lpb40.get_measurement_mm() == 2500
+    assert lpb40.get_device_info(decode=True).firmware_version == "3.1.3"
+
+def test_pipelined_measurements(lpb40):
+    assert lpb40.get_measurements_mm(20, depth=4) == [2500] * 20
+
+def test_streaming_rate(lpb40):
+    stream = lpb40.start_streaming()
+    time.sleep(0.2)
+    lpb40.stop_streaming()
+
+    # 500 Hz for 0.2 s, with slack for a loaded CI box
+    assert 50 <= stream.frames_received <= 110
+
+def test_baud_rate_change_follows_termios(lpb40, device):
+    lpb40.set_baud_rate(921600)
+
+    assert device.mock.device_baud_rate == 921600
+    assert device.mock.baudrate == 921600
+    assert lpb40.get_measurement_mm() == 2500
+
+def test_several_devices():
+    devices = open_virtual_devices(3, distance_mm=777)
+    ports = []
+    try:
+        ports = [serial.Serial(device.port, baudrate=115200, timeout=1.0) for device in devices]
+        assert [LPB40B(port).get_measurement_mm() for port in ports] == [777] * 3
+        assert len({device.port for device in devices}) == 3
+    finally:
+        for port in ports:
+            port.close()
+        for device in devices:
+            device.close()
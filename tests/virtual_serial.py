@@ -0,0 +1,249 @@
+#
+#   PTY backed virtual LPB40B devices
+#
+#   Author: Aaron S. Crandall <acrandal@gmail.com>
+#   Copyright: 2025
+#   License: GPL v3.0
+#
+# Serves the MockLidarSerial protocol on a Linux pseudo-terminal, so an
+#  unmodified serial.Serial("/dev/pts/N") + LPB40B goes through pyserial,
+#  termios and the kernel tty layer just like with real hardware.
+#
+# The mock always runs in realtime mode here - frames are paced at the
+#  modeled wire time for the baud rate and at the set measurement
+#  frequency. The host's baud rate is read back from the pty's termios
+#  settings, so a host/device baud mismatch behaves like it does on a
+#  real wire.
+#
+# Run with:  python -m tests.virtual_serial --count 2 --measurement-frequency-hz 500
+#
+
+
+import os
+import sys
+import tty
+import time
+import errno
+import select
+import signal
+import termios
+import argparse
+import logging
+import threading
+
+from .MockLidarSerial import MockLidarSerial
+
+
+# termios speed constant -> baud rate, for the rates this platform knows about
+TERMIOS_BAUD_RATES = {
+    getattr(termios, f"B{rate}"): rate
+    for rate in (300, 600, 1200, 2400, 4800, 9600, 19200, 38400, 57600,
+                 115200, 230400, 460800, 921600)
+    if hasattr(termios, f"B{rate}")
+}
+
+
+class VirtualLidarDevice:
+    READ_CHUNK = 4096
+    IDLE_POLL_SEC = 0.05
+    # Don't pull more from the mock while this much is still waiting for the pty
+    MAX_PENDING_BYTES = 4096
+
+    def __init__(self, distance_mm: int = 1234, baudrate: int = 115200,
+                 measurement_frequency_hz: int = 100):
+        self.mock = MockLidarSerial(
+            distance_mm=distance_mm, realtime=True, baudrate=baudrate,
+            measurement_frequency_hz=measurement_frequency_hz,
+        )
+        self.mock.timeout = 0
+
+        (self._master_fd, self._slave_fd) = os.openpty()
+        # No echo, no line editing, no newline translation - bytes pass through untouched
+        tty.setraw(self._slave_fd)
+        self._set_termios_baud(baudrate)
+        self.port = os.ttyname(self._slave_fd)
+        os.set_blocking(self._master_fd, False)
+
+        self._from_host = bytearray()
+        self._to_host = bytearray()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.frames_from_host = 0
+        self.bad_frames_from_host = 0
+        self.bytes_to_host = 0
+
+        self.log = logging.getLogger(name=__class__.__name__)
+
+    # ---------- Lifecycle ----------
+    def start(self) -> "VirtualLidarDevice":
+        if self._thread is not None:
+            raise RuntimeError("Virtual device already running")
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"LPB40B-virtual-{self.port}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+        # Our copy of the slave fd keeps the pty alive between host opens - close it last
+        for fd in (self._master_fd, self._slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---------- Serving ----------
+    def _run(self) -> None:
+        master_fd = self._master_fd
+        while not self._stop_event.is_set():
+            wait_ns = self._sync_host_baud_and_poll()
+            timeout = self.IDLE_POLL_SEC if wait_ns is None else min(self.IDLE_POLL_SEC, wait_ns / 1e9)
+            write_fds = [master_fd] if self._to_host else []
+            (readable, writable, _) = select.select([master_fd], write_fds, [], timeout)
+
+            if readable:
+                self._read_from_host()
+            self._pull_from_mock()
+            if self._to_host:
+                self._write_to_host()
+
+    def _sync_host_baud_and_poll(self):
+        """Copy the host's termios speed onto the mock, return ns until the mock has output."""
+        self._sync_host_baud()
+        mock = self.mock
+        with mock._cond:
+            mock._advance()
+            if mock._rx_buffer:
+                return 0
+            return mock._next_event_ns()
+
+    def _sync_host_baud(self) -> None:
+        # Master and slave share termios settings, so this sees what the host's pyserial set
+        host_baud_rate = TERMIOS_BAUD_RATES.get(termios.tcgetattr(self._slave_fd)[5])
+        if host_baud_rate is not None and host_baud_rate != self.mock.baudrate:
+            with self.mock._cond:
+                self.mock.baudrate = host_baud_rate
+
+    def _read_from_host(self) -> None:
+        try:
+            data = os.read(self._master_fd, self.READ_CHUNK)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            # EIO - no one has the slave open right now
+            if e.errno != errno.EIO:
+                raise
+            time.sleep(self.IDLE_POLL_SEC)
+            return
+        self._from_host += data
+        # The host changes speed right before writing at the new rate - check it per read
+        self._sync_host_baud()
+
+        buffer = self._from_host
+        while len(buffer) >= 8:
+            start = buffer.find(0x55)
+            if start < 0:
+                self.bad_frames_from_host += 1
+                buffer.clear()
+                return
+            if start:
+                del buffer[:start]
+                continue
+            if len(buffer) < 8:
+                return
+            if buffer[7] != 0xAA:
+                # Misaligned - slide past this start byte
+                self.bad_frames_from_host += 1
+                del buffer[:1]
+                continue
+            frame = bytes(buffer[:8])
+            del buffer[:8]
+            try:
+                self.mock.write(frame)
+                self.frames_from_host += 1
+            except ValueError as e:
+                self.bad_frames_from_host += 1
+                self.log.warning(f"{self.port}: device rejected {frame.hex(' ').upper()}: {e}")
+
+    def _pull_from_mock(self) -> None:
+        if len(self._to_host) >= self.MAX_PENDING_BYTES:
+            return
+        waiting = self.mock.in_waiting
+        if waiting:
+            self._to_host += self.mock.read(waiting)
+
+    def _write_to_host(self) -> None:
+        try:
+            written = os.write(self._master_fd, self._to_host)
+        except BlockingIOError:
+            return
+        del self._to_host[:written]
+        self.bytes_to_host += written
+
+    def _set_termios_baud(self, baudrate: int) -> None:
+        speed = getattr(termios, f"B{baudrate}", None)
+        if speed is None:
+            return
+        attributes = termios.tcgetattr(self._slave_fd)
+        attributes[4] = attributes[5] = speed
+        termios.tcsetattr(self._slave_fd, termios.TCSANOW, attributes)
+
+
+def open_virtual_devices(count: int, **kwargs) -> list:
+    """Start count independent virtual devices - close() each when done."""
+    devices = []
+    try:
+        for _ in range(count):
+            devices.append(VirtualLidarDevice(**kwargs).start())
+    except Exception:
+        for device in devices:
+            device.close()
+        raise
+    return devices
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve virtual LPB40B devices on pseudo-terminals")
+    parser.add_argument("--count", type=int, default=1, help="number of devices")
+    parser.add_argument("--distance-mm", type=int, default=1234)
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--measurement-frequency-hz", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    devices = open_virtual_devices(
+        args.count, distance_mm=args.distance_mm, baudrate=args.baudrate,
+        measurement_frequency_hz=args.measurement_frequency_hz,
+    )
+    for device in devices:
+        print(device.port, flush=True)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        while not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for device in devices:
+            device.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())